@@ -1,10 +1,1089 @@
-import tkinter as tk
-from tkinter import ttk, font
+try:
+    import tkinter as tk
+    from tkinter import ttk, font, filedialog
+except ImportError:
+    # Консольные киоски без Tk - доступен только терминальный режим
+    tk = None
+try:
+    import curses
+except ImportError:
+    # В Windows curses нет - там только окно Tk
+    curses = None
+import locale
 import time
+import math
 import datetime
+import zoneinfo
+import socket
+import struct
+import threading
+import argparse
+import csv
+from array import array
+from collections import deque
 
-class PrecisionClock:
+# Единица отображения - миллисекунда
+DISPLAY_UNIT_NS = 1_000_000
+NS_PER_SECOND = 1_000_000_000
+
+# Периоды обновления (мс), на которые секунда делится без остатка:
+# тогда смена секунды всегда совпадает с тиком
+REFRESH_PERIODS_MS = (1, 2, 4, 5, 8, 10, 20, 25, 40, 50, 100, 125, 200, 250, 500, 1000)
+REFRESH_RATES_HZ = (1, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def refresh_period_ns(refresh_hz):
+    """Период обновления для заданной частоты: ближайший делитель секунды из REFRESH_PERIODS_MS"""
+    target_ms = 1000.0 / refresh_hz
+    return min(REFRESH_PERIODS_MS, key=lambda ms: abs(ms - target_ms)) * DISPLAY_UNIT_NS
+
+
+# Пороги контроля системных часов
+STEP_THRESHOLD_NS = 20 * DISPLAY_UNIT_NS   # скачок между соседними сверками - перевод часов
+RESYNC_THRESHOLD_NS = 5 * DISPLAY_UNIT_NS  # накопленное плавное расхождение - переякорение
+TIME_CHECK_HISTORY = 60                    # сверок для оценки скорости расхождения
+
+
+class TimeSource:
+    """Отображаемое время по монотонному счётчику с однократной привязкой к настенным часам.
+    
+    Чтение - одно обращение к perf_counter_ns(), поэтому соседние тики не расходятся
+    и не прыгают вместе с системными часами. check() раз в секунду сверяется с
+    time.time_ns(): резкий скачок считается переводом часов (step), постепенный
+    уход - подстройкой частоты (slew); в обоих случаях привязка обновляется.
+    """
+    
+    def __init__(self, step_threshold_ns=STEP_THRESHOLD_NS, resync_ns=RESYNC_THRESHOLD_NS,
+                 history=TIME_CHECK_HISTORY):
+        self.step_threshold_ns = step_threshold_ns
+        self.resync_ns = resync_ns
+        self.checks = deque(maxlen=history)  # (perf_ns, расхождение с системными часами)
+        self.events = deque(maxlen=20)       # (время, 'step'/'slew', величина в нс)
+        self.slew_ppm = 0.0
+        self.anchors = 0
+        self.anchor()
+    
+    def anchor(self, tries=5):
+        """Привязка к настенным часам по самому узкому из нескольких замеров"""
+        best = None
+        for _ in range(tries):
+            before = time.perf_counter_ns()
+            wall = time.time_ns()
+            after = time.perf_counter_ns()
+            if best is None or after - before < best[0]:
+                best = (after - before, wall - (before + after) // 2)
+        # Показания time_ns() известны с точностью до половины окна замера
+        self.uncertainty_ns = best[0] // 2 + 1
+        self.wall_offset_ns = best[1]
+        self.anchors += 1
+    
+    def now_ns(self):
+        return time.perf_counter_ns() + self.wall_offset_ns
+    
+    def check(self):
+        """Сверка с системными часами; возвращает 'step', 'slew' или None"""
+        perf = time.perf_counter_ns()
+        drift = time.time_ns() - (perf + self.wall_offset_ns)
+        previous = self.checks[-1][1] if self.checks else 0
+        
+        if abs(drift - previous) > self.step_threshold_ns:
+            self.events.append((time.time(), 'step', drift - previous))
+            self.checks.clear()
+            self.anchor()
+            return 'step'
+        
+        self.checks.append((perf, drift))
+        self.slew_ppm = self.drift_rate()
+        if abs(drift) > self.resync_ns:
+            self.events.append((time.time(), 'slew', drift))
+            self.checks.clear()
+            self.anchor()
+            return 'slew'
+        return None
+    
+    def drift_rate(self):
+        """Скорость расхождения с системными часами (ppm), МНК по истории сверок"""
+        count = len(self.checks)
+        if count < 3:
+            return 0.0
+        mean_t = sum(t for t, _ in self.checks) / count
+        mean_d = sum(d for _, d in self.checks) / count
+        spread = sum((t - mean_t) ** 2 for t, _ in self.checks)
+        if not spread:
+            return 0.0
+        slope = sum((t - mean_t) * (d - mean_d) for t, d in self.checks) / spread
+        return slope * 1e6
+
+
+# SNTP (RFC 4330): эпоха NTP - 1900 год, метки - 32.32 с фиксированной точкой
+NTP_EPOCH_DELTA = 2_208_988_800
+NTP_PACKET = struct.Struct("!BBbb11I")
+NTP_PORT = 123
+SNTP_SAMPLES = 8
+
+
+def ns_to_ntp(ns):
+    """Наносекунды UNIX-времени -> (секунды, доли) NTP"""
+    seconds, rest = divmod(ns, NS_PER_SECOND)
+    return seconds + NTP_EPOCH_DELTA, (rest << 32) // NS_PER_SECOND
+
+
+def ntp_to_ns(seconds, fraction):
+    return (seconds - NTP_EPOCH_DELTA) * NS_PER_SECOND + ((fraction * NS_PER_SECOND) >> 32)
+
+
+def parse_address(address, default_port=NTP_PORT):
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+class SNTPClient:
+    """Фоновый замер смещения отображаемого времени относительно SNTP-сервера.
+    
+    Опрос раз в interval секунд; из последних замеров берётся тот, у которого
+    наименьшая задержка (как в фильтре часов NTP) - его смещение меньше всего
+    искажено асимметрией сети. Разброс - СКО смещений в окне.
+    """
+    
+    def __init__(self, server, time_source, interval=16.0, samples=SNTP_SAMPLES, timeout=1.0):
+        self.address = parse_address(server)
+        self.time_source = time_source
+        self.interval = interval
+        self.timeout = timeout
+        self.samples = deque(maxlen=samples)  # (смещение, задержка) в нс
+        self.lock = threading.Lock()
+        self.last_error = None
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def query(self):
+        """Один обмен с сервером: (смещение, задержка) в нс"""
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(self.timeout)
+            t1 = self.time_source.now_ns()
+            seconds, fraction = ns_to_ntp(t1)
+            # LI=0, VN=4, Mode=3 (клиент); метка отправки - наше время
+            request = NTP_PACKET.pack(0x23, 0, 0, 0, *([0] * 9), seconds, fraction)
+            sock.sendto(request, self.address)
+            while True:
+                data, _ = sock.recvfrom(512)
+                t4 = self.time_source.now_ns()
+                if len(data) < NTP_PACKET.size:
+                    continue
+                fields = NTP_PACKET.unpack_from(data)
+                # Ответ на наш запрос несёт нашу метку отправки как originate
+                if fields[9:11] == (seconds, fraction):
+                    break
+        
+        if fields[0] & 0x07 != 4 or fields[1] == 0:
+            raise ValueError("сервер не готов (kiss-o'-death или неверный режим)")
+        t2 = ntp_to_ns(fields[11], fields[12])
+        t3 = ntp_to_ns(fields[13], fields[14])
+        offset = ((t2 - t1) + (t3 - t4)) // 2
+        delay = (t4 - t1) - (t3 - t2)
+        return offset, delay
+    
+    def poll(self):
+        try:
+            sample = self.query()
+        except (OSError, ValueError) as e:
+            self.last_error = str(e) or type(e).__name__
+            return None
+        with self.lock:
+            self.samples.append(sample)
+        self.last_error = None
+        return sample
+    
+    def reset(self):
+        """Сброс окна - после переякорения старые смещения больше не верны"""
+        with self.lock:
+            self.samples.clear()
+    
+    def stats(self):
+        """Отфильтрованные (смещение, задержка, разброс) в нс или None до первого ответа"""
+        with self.lock:
+            samples = list(self.samples)
+        if not samples:
+            return None
+        offset, delay = min(samples, key=lambda s: s[1])
+        mean = sum(s[0] for s in samples) / len(samples)
+        jitter = (sum((s[0] - mean) ** 2 for s in samples) / len(samples)) ** 0.5
+        return offset, delay, jitter
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+    
+    def run(self):
+        # Первые замеры чаще, чтобы фильтру было из чего выбирать
+        for _ in range(self.samples.maxlen // 2):
+            if self.stop_event.is_set():
+                return
+            self.poll()
+            self.stop_event.wait(1.0)
+        while not self.stop_event.is_set():
+            self.poll()
+            self.stop_event.wait(self.interval)
+
+
+class SNTPServer:
+    """Локальный SNTP-сервер-заглушка по системным часам (с необязательным смещением)"""
+    
+    def __init__(self, host="127.0.0.1", port=0, offset_ns=0):
+        self.offset_ns = offset_ns
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = "%s:%d" % self.sock.getsockname()
+        self.thread = None
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.sock.close()
+    
+    def serve(self):
+        while True:
+            try:
+                data, client = self.sock.recvfrom(512)
+            except OSError:
+                return
+            received = time.time_ns() + self.offset_ns
+            if len(data) < NTP_PACKET.size:
+                continue
+            request = NTP_PACKET.unpack_from(data)
+            # LI=0, VN - как у клиента, Mode=4 (сервер), stratum 1, точность 2^-20 с
+            version = request[0] & 0x38
+            ref = ns_to_ntp(received)
+            reply = NTP_PACKET.pack(
+                version | 4, 1, 6, -20, 0, 0, int.from_bytes(b"LOCL", "big"),
+                *ref, request[13], request[14], *ns_to_ntp(received),
+                *ns_to_ntp(time.time_ns() + self.offset_ns)
+            )
+            try:
+                self.sock.sendto(reply, client)
+            except OSError:
+                return
+
+
+def describe_accuracy(time_source, sntp):
+    """Строки (погрешность, SNTP): по SNTP, если есть замеры, иначе - по привязке"""
+    stats = sntp.stats() if sntp is not None else None
+    if stats is None:
+        error_ms = time_source.uncertainty_ns / DISPLAY_UNIT_NS
+        if sntp is None:
+            status = "не используется"
+        else:
+            status = sntp.last_error or "ожидание ответа"
+        return f"±{error_ms:.3f} мс (привязка)", status
+    
+    offset, delay, jitter = stats
+    # Истинное смещение лежит в пределах половины задержки от измеренного
+    error_ms = (abs(offset) + delay / 2) / DISPLAY_UNIT_NS
+    return (f"±{error_ms:.3f} мс (SNTP)",
+            f"{offset / DISPLAY_UNIT_NS:+.3f} мс, RTT {delay / DISPLAY_UNIT_NS:.3f} мс, "
+            f"разброс {jitter / DISPLAY_UNIT_NS:.3f} мс")
+
+
+# Гистограмма опозданий тиков: линейные корзины до LAG_RANGE_NS, дальше - переполнение
+LAG_BUCKET_NS = 10_000
+LAG_RANGE_NS = 100 * DISPLAY_UNIT_NS
+LAG_BUCKETS = LAG_RANGE_NS // LAG_BUCKET_NS
+LAG_LOG_TICKS = 65536
+LAG_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class TickLagRecorder:
+    """Опоздания тиков в заранее выделенных массивах: гистограмма и кольцо последних тиков.
+    
+    record() - несколько целочисленных операций без создания объектов, поэтому его
+    можно вызывать на каждом тике. Простой (stall) - самый длинный промежуток между
+    соседними выполненными тиками.
+    """
+    
+    def __init__(self, log_ticks=LAG_LOG_TICKS):
+        self.histogram = array('q', bytes(8 * (LAG_BUCKETS + 1)))
+        # Кольцо (срок, факт, пропущено) по тику - для выгрузки в CSV
+        self.log = array('q', bytes(8 * 3 * log_ticks))
+        self.log_ticks = log_ticks
+        self.reset()
+    
+    def reset(self):
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+        self.count = 0
+        self.missed = 0
+        self.max_lag = 0
+        self.max_stall = 0
+        self.stall_at = 0
+        self.last_run = None
+    
+    def resume(self):
+        """Разрыв последовательности (пауза, смена частоты) - не считаем его простоем"""
+        self.last_run = None
+    
+    def record(self, due_ns, run_ns, skipped):
+        lag = run_ns - due_ns
+        self.histogram[min(lag // LAG_BUCKET_NS, LAG_BUCKETS)] += 1
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self.missed += skipped
+        if self.last_run is not None and run_ns - self.last_run > self.max_stall:
+            self.max_stall = run_ns - self.last_run
+            self.stall_at = run_ns
+        self.last_run = run_ns
+        
+        slot = self.count % self.log_ticks * 3
+        self.log[slot] = due_ns
+        self.log[slot + 1] = run_ns
+        self.log[slot + 2] = skipped
+        self.count += 1
+    
+    def percentiles(self, points=LAG_PERCENTILES):
+        """Опоздание (нс) для каждого процентиля - верхняя граница корзины"""
+        result = []
+        if not self.count:
+            return [0] * len(points)
+        targets = iter(sorted(points))
+        target = next(targets)
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            while target is not None and seen * 100 >= target * self.count:
+                # В корзине переполнения точнее максимума ничего не знаем
+                result.append(self.max_lag if bucket == LAG_BUCKETS
+                              else min((bucket + 1) * LAG_BUCKET_NS, self.max_lag))
+                target = next(targets, None)
+            if target is None:
+                break
+        return result
+    
+    def recent(self):
+        """Тики из кольца от старых к новым: (срок, факт, пропущено)"""
+        stored = min(self.count, self.log_ticks)
+        start = self.count - stored
+        for i in range(start, self.count):
+            slot = i % self.log_ticks * 3
+            yield self.log[slot], self.log[slot + 1], self.log[slot + 2]
+    
+    def export_csv(self, path, wall_offset_ns):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["due_unix_ns", "run_unix_ns", "lag_us", "missed"])
+            for due, run, skipped in self.recent():
+                writer.writerow([due + wall_offset_ns, run + wall_offset_ns,
+                                 f"{(run - due) / 1000:.1f}", skipped])
+
+
+class TickScheduler:
+    """Планировщик тиков по дедлайнам.
+    
+    Следующий срок отсчитывается от сетки периода на настенных часах, а не от конца
+    предыдущего тика, поэтому время обработки не копится в дрейф. Ожидание - один
+    таймер Tk до срока, без опроса каждую миллисекунду.
+    """
+    
+    def __init__(self, root, callback, time_source, refresh_hz=50):
+        self.root = root
+        self.callback = callback
+        self.period_ns = refresh_period_ns(refresh_hz)
+        # Сетка выравнивается по той же привязке, что и отображаемое время
+        self.time_source = time_source
+        self.lag = TickLagRecorder()
+        self.due_ns = None
+        self.after_id = None
+        
+        # Статистика опозданий с последнего вызова stats()
+        self.ticks = 0
+        self.missed = 0
+        self.lateness_sum = 0
+        self.lateness_max = 0
+    
+    def set_rate(self, refresh_hz):
+        self.period_ns = refresh_period_ns(refresh_hz)
+        if self.after_id is not None:
+            self.stop()
+            self.start()
+    
+    def start(self):
+        self.lag.resume()
+        self.due_ns = self.next_due(time.perf_counter_ns())
+        self.arm()
+    
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+    
+    def resync(self):
+        """Новая привязка времени: пересчитать срок по новой сетке, не трогая таймер"""
+        self.lag.resume()
+        self.due_ns = self.next_due(time.perf_counter_ns())
+    
+    def next_due(self, now_ns):
+        """Ближайшая будущая граница периода (по perf_counter_ns)"""
+        wall_offset = self.time_source.wall_offset_ns
+        wall = now_ns + wall_offset
+        return (wall // self.period_ns + 1) * self.period_ns - wall_offset
+    
+    def arm(self):
+        # Таймеры Tk миллисекундные: округляем вверх, чтобы не проснуться раньше срока
+        delay_ns = self.due_ns - time.perf_counter_ns()
+        delay_ms = max(0, -(-delay_ns // DISPLAY_UNIT_NS))
+        self.after_id = self.root.after(delay_ms, self.fire)
+    
+    def fire(self):
+        now = time.perf_counter_ns()
+        if now < self.due_ns:
+            self.arm()
+            return
+        
+        lateness = now - self.due_ns
+        self.ticks += 1
+        self.lateness_sum += lateness
+        self.lateness_max = max(self.lateness_max, lateness)
+        # При задержке больше периода пропущенные тики не догоняем
+        skipped = lateness // self.period_ns
+        self.missed += skipped
+        self.lag.record(self.due_ns, now, skipped)
+        
+        due = self.due_ns
+        fired_id = self.after_id
+        try:
+            self.callback(due, now)
+        finally:
+            # Таймер взводится и после исключения в колбэке, иначе часы встанут навсегда;
+            # само исключение уходит дальше - Tk выводит его через report_callback_exception.
+            # Колбэк мог остановить планировщик или перезапустить его (смена частоты) -
+            # тогда таймер уже взведён заново или не нужен, второй цепочки не заводим
+            if self.after_id == fired_id:
+                # После resync() срок уже указывает на новую сетку
+                if self.due_ns == due:
+                    self.due_ns += (skipped + 1) * self.period_ns
+                self.arm()
+    
+    def stats(self):
+        """(тиков, среднее и максимальное опоздание в мс, пропущено) с прошлого вызова"""
+        ticks = self.ticks
+        result = (ticks,
+                  self.lateness_sum / ticks / DISPLAY_UNIT_NS if ticks else 0.0,
+                  self.lateness_max / DISPLAY_UNIT_NS,
+                  self.missed)
+        self.ticks = self.missed = self.lateness_sum = self.lateness_max = 0
+        return result
+
+
+# Смещение пояса меняется только на границах четверти часа (переходы на летнее время)
+OFFSET_CHECK_NS = 15 * 60 * NS_PER_SECOND
+DAY_SECONDS = 24 * 60 * 60
+EPOCH_DATE = datetime.date(1970, 1, 1)
+
+
+class ClockFormatter:
+    """Строки для отображения с кэшем до ближайшей смены: секунды, часа, суток, смещения пояса.
+    
+    update() правит строки на месте и возвращает только изменившиеся поля,
+    поэтому strftime вызывается раз в сутки, а не на каждом тике.
+    """
+    
+    FIELDS = ('time', 'unix', 'date', 'date_iso', 'date_full', 'tz', 'hour')
+    
+    def __init__(self):
+        self.values = dict.fromkeys(self.FIELDS)
+        self.offset_s = 0  # смещение местного времени от UTC, с
+        self.offset_until = 0  # сроки действия кэшей, нс UNIX-времени
+        self.second_until = 0
+        self.day_until = 0
+        self.second_prefix = ""
+        self.last_ms = None
+    
+    def update(self, wall_ns):
+        """Пересчёт на момент wall_ns (нс UNIX-времени); возвращает список изменившихся полей"""
+        changed = []
+        values = self.values
+        
+        if wall_ns >= self.offset_until:
+            self.refresh_offset(wall_ns, changed)
+        
+        if wall_ns >= self.second_until:
+            local_s = wall_ns // NS_PER_SECOND + self.offset_s
+            if wall_ns >= self.day_until:
+                self.refresh_date(local_s, changed)
+            
+            second_of_day = local_s % DAY_SECONDS
+            hour, rest = divmod(second_of_day, 3600)
+            self.second_prefix = "%02d:%02d:%02d." % (hour, rest // 60, rest % 60)
+            self.second_until = (wall_ns // NS_PER_SECOND + 1) * NS_PER_SECOND
+            self.last_ms = None
+            if hour != values['hour']:
+                values['hour'] = hour
+                changed.append('hour')
+        
+        ms = wall_ns // DISPLAY_UNIT_NS % 1000
+        if ms != self.last_ms:
+            self.last_ms = ms
+            values['time'] = self.second_prefix + "%03d" % ms
+            values['unix'] = "%d.%03d" % (wall_ns // NS_PER_SECOND, ms)
+            changed += ('time', 'unix')
+        return changed
+    
+    def refresh_offset(self, wall_ns, changed):
+        local = time.localtime(wall_ns // NS_PER_SECOND)
+        if local.tm_gmtoff != self.offset_s:
+            # Сменилось смещение - границы секунд и суток надо пересчитать
+            self.offset_s = local.tm_gmtoff
+            self.second_until = self.day_until = 0
+        if local.tm_zone != self.values['tz']:
+            self.values['tz'] = local.tm_zone
+            changed.append('tz')
+        self.offset_until = (wall_ns // OFFSET_CHECK_NS + 1) * OFFSET_CHECK_NS
+    
+    def refresh_date(self, local_s, changed):
+        day_start = local_s - local_s % DAY_SECONDS
+        date = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=day_start)
+        for field, text in (('date', date.strftime("%d %B %Y года")),
+                            ('date_iso', date.strftime("%Y-%m-%d")),
+                            ('date_full', date.strftime("%A, %d %B %Y"))):
+            if text != self.values[field]:
+                self.values[field] = text
+                changed.append(field)
+        self.day_until = (day_start + DAY_SECONDS - self.offset_s) * NS_PER_SECOND
+
+
+# Пояса панели мирового времени
+WORLD_ZONES = (
+    "Pacific/Midway", "Pacific/Honolulu", "America/Anchorage", "America/Los_Angeles",
+    "America/Vancouver", "America/Phoenix", "America/Denver", "America/Mexico_City",
+    "America/Chicago", "America/Toronto", "America/New_York", "America/Havana",
+    "America/Caracas", "America/Halifax", "America/Santiago", "America/St_Johns",
+    "America/Sao_Paulo", "America/Argentina/Buenos_Aires", "America/Nuuk", "Atlantic/South_Georgia",
+    "Atlantic/Azores", "Atlantic/Reykjavik", "Europe/London", "Europe/Lisbon",
+    "Africa/Lagos", "Europe/Paris", "Europe/Berlin", "Europe/Warsaw",
+    "Africa/Cairo", "Africa/Johannesburg", "Europe/Kyiv", "Asia/Jerusalem",
+    "Europe/Istanbul", "Europe/Moscow", "Africa/Nairobi", "Asia/Riyadh",
+    "Asia/Tehran", "Asia/Dubai", "Europe/Samara", "Asia/Kabul",
+    "Asia/Karachi", "Asia/Yekaterinburg", "Asia/Kolkata", "Asia/Kathmandu",
+    "Asia/Dhaka", "Asia/Omsk", "Asia/Yangon", "Asia/Bangkok",
+    "Asia/Novosibirsk", "Asia/Shanghai", "Asia/Singapore", "Asia/Irkutsk",
+    "Asia/Tokyo", "Asia/Seoul", "Australia/Adelaide", "Australia/Sydney",
+    "Asia/Vladivostok", "Pacific/Noumea", "Asia/Magadan", "Pacific/Auckland",
+    "Asia/Kamchatka", "Pacific/Chatham", "Pacific/Tongatapu", "Pacific/Kiritimati",
+)
+# Переходы ищутся шагами по неделе не дальше горизонта; без перехода - перепроверка на горизонте
+ZONE_SCAN_STEP_S = 7 * DAY_SECONDS
+ZONE_HORIZON_S = 366 * DAY_SECONDS
+WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+
+def zone_state(zone, utc_s):
+    """(смещение от UTC в секундах, аббревиатура) пояса в момент utc_s"""
+    moment = datetime.datetime.fromtimestamp(utc_s, zone)
+    return int(moment.utcoffset().total_seconds()), moment.tzname()
+
+
+def next_transition(zone, utc_s, state, horizon=ZONE_HORIZON_S):
+    """Первая секунда после utc_s, в которую состояние пояса отличается от state"""
+    low = utc_s
+    while low < utc_s + horizon:
+        high = low + ZONE_SCAN_STEP_S
+        if zone_state(zone, high) != state:
+            # Переход внутри недели - уточняем делением пополам до секунды
+            while high - low > 1:
+                middle = (low + high) // 2
+                if zone_state(zone, middle) == state:
+                    low = middle
+                else:
+                    high = middle
+            return high
+        low = high
+    return utc_s + horizon
+
+
+class ZoneOffset:
+    """Смещение и подписи пояса, действительные до его следующего перехода"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.zone = zoneinfo.ZoneInfo(name)
+        self.city = name.rsplit("/", 1)[-1].replace("_", " ")
+        self.offset_s = 0
+        self.abbr = ""
+        self.label = ""
+        self.until_s = 0
+    
+    def refresh(self, utc_s):
+        self.offset_s, self.abbr = zone_state(self.zone, utc_s)
+        self.until_s = next_transition(self.zone, utc_s, (self.offset_s, self.abbr))
+        sign = "+" if self.offset_s >= 0 else "-"
+        hours, minutes = divmod(abs(self.offset_s) // 60, 60)
+        self.label = f"UTC{sign}{hours:02d}:{minutes:02d} {self.abbr}"
+
+
+class WorldClock:
+    """Время в наборе поясов: на тике - только местное время плюс кэшированное смещение.
+    
+    Строка времени строится один раз на каждое различное смещение (поясов с одним
+    смещением много), дата - при смене суток в поясе, смещение - при переходе.
+    """
+    
+    def __init__(self, names=WORLD_ZONES):
+        self.zones = []
+        self.missing = []  # пояса без данных (в Windows - без пакета tzdata)
+        for name in names:
+            try:
+                self.zones.append(ZoneOffset(name))
+            except zoneinfo.ZoneInfoNotFoundError:
+                self.missing.append(name)
+        self.times = [""] * len(self.zones)
+        self.dates = [""] * len(self.zones)
+        self.days = [None] * len(self.zones)
+        self.last_s = None
+    
+    def update(self, wall_ns):
+        """Пересчёт на момент wall_ns; None, если секунда не сменилась,
+        иначе - индексы поясов, у которых сменились дата или смещение"""
+        utc_s = wall_ns // NS_PER_SECOND
+        if utc_s == self.last_s:
+            return None
+        self.last_s = utc_s
+        
+        texts = {}
+        changed = []
+        for i, zone in enumerate(self.zones):
+            if utc_s >= zone.until_s:
+                zone.refresh(utc_s)
+                self.days[i] = None
+            offset = zone.offset_s
+            text = texts.get(offset)
+            if text is None:
+                second_of_day = (utc_s + offset) % DAY_SECONDS
+                hour, rest = divmod(second_of_day, 3600)
+                text = texts[offset] = "%02d:%02d:%02d" % (hour, rest // 60, rest % 60)
+            self.times[i] = text
+            
+            day = (utc_s + offset) // DAY_SECONDS
+            if day != self.days[i]:
+                self.days[i] = day
+                date = EPOCH_DATE + datetime.timedelta(days=day)
+                self.dates[i] = "%s %02d.%02d" % (WEEKDAYS[date.weekday()], date.day, date.month)
+                changed.append(i)
+        return changed
+
+
+class WorldClockPanel:
+    """Окно мирового времени: пояса в несколько колонок"""
+    
+    ROWS = 16
+    
+    def __init__(self, root, names=WORLD_ZONES):
+        self.root = root
+        self.names = names
+        self.window = None
+        self.world = None
+    
+    def open(self):
+        if self.window is not None:
+            self.window.lift()
+            return
+        # Пояса загружаются до создания окна: окно без них tick() не обслужит
+        world = WorldClock(self.names)
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Мировое время")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.world = world
+        
+        cell_font = font.Font(family="Consolas", size=10)
+        time_font = font.Font(family="Consolas", size=12, weight="bold")
+        self.time_labels = []
+        self.info_labels = []
+        for i, zone in enumerate(self.world.zones):
+            column, row = divmod(i, self.ROWS)
+            column *= 3
+            tk.Label(self.window, text=zone.city, font=cell_font, anchor=tk.W).grid(
+                row=row, column=column, sticky=tk.W, padx=(10, 5))
+            time_label = tk.Label(self.window, font=time_font)
+            time_label.grid(row=row, column=column + 1)
+            info_label = tk.Label(self.window, font=cell_font, fg="gray40", anchor=tk.W)
+            info_label.grid(row=row, column=column + 2, sticky=tk.W, padx=(5, 10))
+            self.time_labels.append(time_label)
+            self.info_labels.append(info_label)
+        if world.missing:
+            tk.Label(self.window, text=f"Нет данных о поясах ({len(world.missing)}): {', '.join(world.missing)}. "
+                                       f"Установите пакет tzdata.",
+                     font=cell_font, fg="firebrick", wraplength=900, justify=tk.LEFT).grid(
+                row=self.ROWS, column=0, columnspan=max(3, -(-len(world.zones) // self.ROWS) * 3),
+                sticky=tk.W, padx=10, pady=(5, 10))
+    
+    def close(self):
+        self.window.destroy()
+        self.window = None
+        self.world = None
+    
+    def tick(self, wall_ns):
+        """Вызывается на каждом тике часов; работа - только при смене секунды"""
+        if self.window is None:
+            return
+        changed = self.world.update(wall_ns)
+        if changed is None:
+            return
+        times = self.world.times
+        for label, text in zip(self.time_labels, times):
+            label.config(text=text)
+        for i in changed:
+            zone = self.world.zones[i]
+            self.info_labels[i].config(text=f"{self.world.dates[i]}  {zone.label}")
+
+
+class TickCost:
+    """Разбивка стоимости тика по этапам: суммы за интервал между отчётами"""
+    
+    def __init__(self, stages):
+        self.stages = stages
+        self.totals = dict.fromkeys(stages, 0)
+        self.widget_updates = 0
+        self.ticks = 0
+    
+    def add(self, stage, ns):
+        self.totals[stage] += ns
+    
+    def report(self):
+        """Средние мкс на тик по этапам и среднее число обновлённых виджетов; сброс сумм"""
+        ticks = max(1, self.ticks)
+        result = ({stage: total / ticks / 1000 for stage, total in self.totals.items()},
+                  self.widget_updates / ticks)
+        self.totals = dict.fromkeys(self.stages, 0)
+        self.widget_updates = 0
+        self.ticks = 0
+        return result
+
+
+class LagPanel:
+    """Окно диагностики тиков: процентили опоздания, пропуски, простой, гистограмма"""
+    
+    BARS = 100
+    
+    def __init__(self, root, scheduler, time_source):
+        self.root = root
+        self.scheduler = scheduler
+        self.time_source = time_source
+        self.window = None
+    
+    def open(self):
+        if self.window is not None:
+            self.window.lift()
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Диагностика тиков")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        frame = ttk.Frame(self.window, padding=10)
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.values = {}
+        rows = [("ticks", "Тиков:")]
+        rows += [(f"p{p:g}", f"p{p:g}:") for p in LAG_PERCENTILES]
+        rows += [("max", "Максимум:"), ("missed", "Пропущено сроков:"), ("stall", "Самый долгий простой:")]
+        for row, (key, text) in enumerate(rows):
+            ttk.Label(frame, text=text).grid(row=row, column=0, sticky=tk.W)
+            self.values[key] = ttk.Label(frame, text="", width=24)
+            self.values[key].grid(row=row, column=1, sticky=tk.W, padx=(10, 0))
+        
+        self.canvas = tk.Canvas(frame, width=3 * self.BARS, height=120, bg="white")
+        self.canvas.grid(row=len(rows), column=0, columnspan=2, pady=(10, 0))
+        self.axis = ttk.Label(frame, text="")
+        self.axis.grid(row=len(rows) + 1, column=0, columnspan=2)
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=len(rows) + 2, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(buttons, text="Сброс", command=self.reset).grid(row=0, column=0, padx=5)
+        ttk.Button(buttons, text="Экспорт CSV", command=self.export).grid(row=0, column=1, padx=5)
+        self.refresh()
+    
+    def close(self):
+        self.window.destroy()
+        self.window = None
+    
+    def reset(self):
+        self.scheduler.lag.reset()
+        self.refresh()
+    
+    def export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window, defaultextension=".csv", filetypes=[("CSV", "*.csv")]
+        )
+        if path:
+            self.scheduler.lag.export_csv(path, self.time_source.wall_offset_ns)
+    
+    def refresh(self):
+        """Обновление окна (если открыто); вызывается раз в секунду"""
+        if self.window is None:
+            return
+        lag = self.scheduler.lag
+        ms = DISPLAY_UNIT_NS
+        self.values["ticks"].config(text=str(lag.count))
+        for p, value in zip(LAG_PERCENTILES, lag.percentiles()):
+            self.values[f"p{p:g}"].config(text=f"{value / ms:.2f} мс")
+        self.values["max"].config(text=f"{lag.max_lag / ms:.2f} мс")
+        self.values["missed"].config(text=str(lag.missed))
+        if lag.max_stall:
+            at = time.strftime("%H:%M:%S", time.localtime(
+                (lag.stall_at + self.time_source.wall_offset_ns) // NS_PER_SECOND))
+            self.values["stall"].config(text=f"{lag.max_stall / ms:.2f} мс в {at}")
+        else:
+            self.values["stall"].config(text="-")
+        self.draw_histogram(lag)
+    
+    def draw_histogram(self, lag):
+        # Шкала - до удвоенного p99 (не меньше периода), столбцы - логарифм числа тиков
+        p99 = lag.percentiles((99,))[0]
+        span = max(2 * p99, self.scheduler.period_ns, LAG_BUCKET_NS * self.BARS)
+        buckets = min(LAG_BUCKETS, -(-span // LAG_BUCKET_NS))
+        per_bar = -(-buckets // self.BARS)
+        counts = [sum(lag.histogram[i:i + per_bar]) for i in range(0, buckets, per_bar)]
+        # Всё, что за шкалой, - в последний столбец
+        counts[-1] += sum(lag.histogram[buckets:])
+        
+        self.canvas.delete("all")
+        top = math.log10(max(counts) + 1) or 1
+        height = int(self.canvas["height"])
+        for i, count in enumerate(counts):
+            if count:
+                bar = height * math.log10(count + 1) / top
+                self.canvas.create_rectangle(3 * i, height - bar, 3 * i + 2, height,
+                                             fill="#2980B9", width=0)
+        self.axis.config(text=f"0 ... {buckets * LAG_BUCKET_NS / DISPLAY_UNIT_NS:g} мс "
+                              f"(последний столбец - всё дальше)")
+
+
+def format_duration(ns, digits=3):
+    """Длительность в виде Ч:ММ:СС с долями секунды (digits знаков)"""
+    seconds, rest = divmod(ns, NS_PER_SECOND)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    fraction = rest // 10 ** (9 - digits)
+    return "%d:%02d:%02d.%0*d" % (hours, minutes, seconds, digits, fraction)
+
+
+class LapTimer:
+    """Секундомер с кругами по perf_counter_ns.
+    
+    Круги и отсечки хранятся в массивах array('q') - без объекта на круг, а min/max,
+    среднее и СКО обновляются при каждом круге по Велфорду, без пересчёта по всем.
+    """
+    
+    def __init__(self):
+        self.laps = array('q')    # длительности кругов, нс
+        self.splits = array('q')  # время от старта на конце круга, нс
+        self.reset()
+    
+    def reset(self):
+        del self.laps[:]
+        del self.splits[:]
+        self.running = False
+        self.started_ns = 0
+        self.accumulated_ns = 0
+        self.lap_start_ns = 0  # отсечка начала текущего круга
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_ns = None
+        self.max_ns = None
+    
+    def elapsed_ns(self, now_ns=None):
+        if not self.running:
+            return self.accumulated_ns
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        return self.accumulated_ns + now_ns - self.started_ns
+    
+    def start(self):
+        if not self.running:
+            self.started_ns = time.perf_counter_ns()
+            self.running = True
+    
+    def stop(self):
+        if self.running:
+            self.accumulated_ns += time.perf_counter_ns() - self.started_ns
+            self.running = False
+    
+    def lap(self):
+        """Закрыть текущий круг; возвращает его длительность"""
+        split = self.elapsed_ns()
+        duration = split - self.lap_start_ns
+        self.lap_start_ns = split
+        self.laps.append(duration)
+        self.splits.append(split)
+        
+        count = len(self.laps)
+        delta = duration - self.mean
+        self.mean += delta / count
+        self.m2 += delta * (duration - self.mean)
+        if self.min_ns is None or duration < self.min_ns:
+            self.min_ns = duration
+        if self.max_ns is None or duration > self.max_ns:
+            self.max_ns = duration
+        return duration
+    
+    def stddev(self):
+        count = len(self.laps)
+        return (self.m2 / (count - 1)) ** 0.5 if count > 1 else 0.0
+    
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["lap", "lap_ns", "split_ns"])
+            writer.writerows(zip(range(1, len(self.laps) + 1), self.laps, self.splits))
+
+
+class StopwatchPanel:
+    """Окно секундомера. Список кругов виртуальный: на холсте только видимые строки,
+    их тексты переписываются при прокрутке и новых кругах, сколько бы кругов ни было."""
+    
+    ROW_HEIGHT = 18
+    VISIBLE_ROWS = 15
+    
     def __init__(self, root):
+        self.root = root
+        self.timer = LapTimer()
+        self.window = None
+        self.first = 0  # первая видимая строка (строка 0 - последний круг)
+    
+    def open(self):
+        if self.window is not None:
+            self.window.lift()
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Секундомер")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        frame = ttk.Frame(self.window, padding=10)
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.elapsed_label = tk.Label(frame, text="", font=("Consolas", 32, "bold"))
+        self.elapsed_label.grid(row=0, column=0, columnspan=2)
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=1, column=0, columnspan=2, pady=(5, 10))
+        self.start_button = ttk.Button(buttons, text="Старт", command=self.toggle, width=12)
+        self.start_button.grid(row=0, column=0, padx=5)
+        ttk.Button(buttons, text="Круг", command=self.lap, width=12).grid(row=0, column=1, padx=5)
+        ttk.Button(buttons, text="Сброс", command=self.reset, width=12).grid(row=0, column=2, padx=5)
+        ttk.Button(buttons, text="Экспорт CSV", command=self.export, width=12).grid(row=0, column=3, padx=5)
+        
+        self.stats_label = ttk.Label(frame, text="", font=("Consolas", 10))
+        self.stats_label.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+        
+        # Виртуальный список: фиксированный набор текстовых строк и своя полоса прокрутки
+        height = self.ROW_HEIGHT * self.VISIBLE_ROWS
+        self.canvas = tk.Canvas(frame, width=420, height=height, bg="white", highlightthickness=0)
+        self.canvas.grid(row=3, column=0, pady=(10, 0))
+        self.scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.scroll)
+        self.scrollbar.grid(row=3, column=1, sticky=(tk.N, tk.S), pady=(10, 0))
+        self.rows = [
+            self.canvas.create_text(5, i * self.ROW_HEIGHT + 2, anchor=tk.NW, font=("Consolas", 10))
+            for i in range(self.VISIBLE_ROWS)
+        ]
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll("scroll", -e.delta // 120, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll("scroll", 1, "units"))
+        
+        self.window.bind("<space>", lambda e: self.toggle())
+        self.window.bind("<Return>", lambda e: self.lap())
+        self.window.bind("<Escape>", lambda e: self.reset())
+        self.show_state()
+    
+    def close(self):
+        self.window.destroy()
+        self.window = None
+    
+    def toggle(self):
+        if self.timer.running:
+            self.timer.stop()
+        else:
+            self.timer.start()
+        self.show_state()
+    
+    def lap(self):
+        if not self.timer.running:
+            return
+        self.timer.lap()
+        # Прокрученный вниз список остаётся на тех же кругах
+        if self.first:
+            self.first += 1
+        self.show_stats()
+        self.draw_rows()
+    
+    def reset(self):
+        self.timer.reset()
+        self.first = 0
+        self.show_state()
+    
+    def export(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.window, defaultextension=".csv", filetypes=[("CSV", "*.csv")]
+        )
+        if path:
+            self.timer.export_csv(path)
+    
+    def scroll(self, action, amount, unit=None):
+        """Команда полосы прокрутки: moveto доля | scroll n units/pages"""
+        count = len(self.timer.laps)
+        if action == "moveto":
+            first = int(float(amount) * count)
+        else:
+            step = self.VISIBLE_ROWS if unit == "pages" else 1
+            first = self.first + int(amount) * step
+        self.first = max(0, min(first, count - self.VISIBLE_ROWS))
+        self.draw_rows()
+    
+    def show_state(self):
+        self.start_button.config(text="Стоп" if self.timer.running else "Старт")
+        self.elapsed_label.config(text=format_duration(self.timer.elapsed_ns()))
+        self.show_stats()
+        self.draw_rows()
+    
+    def show_stats(self):
+        timer = self.timer
+        if not timer.laps:
+            self.stats_label.config(text="Кругов нет")
+            return
+        self.stats_label.config(
+            text=f"Кругов: {len(timer.laps)}  мин {format_duration(timer.min_ns, 6)}  "
+                 f"макс {format_duration(timer.max_ns, 6)}\n"
+                 f"среднее {format_duration(int(timer.mean), 6)}  "
+                 f"СКО {timer.stddev() / NS_PER_SECOND:.6f} с"
+        )
+    
+    def draw_rows(self):
+        laps = self.timer.laps
+        splits = self.timer.splits
+        count = len(laps)
+        for row, item in enumerate(self.rows):
+            index = count - 1 - (self.first + row)
+            if index >= 0:
+                text = "%7d   %s   %s" % (index + 1, format_duration(laps[index], 6),
+                                          format_duration(splits[index], 6))
+            else:
+                text = ""
+            self.canvas.itemconfig(item, text=text)
+        if count > self.VISIBLE_ROWS:
+            self.scrollbar.set(self.first / count, (self.first + self.VISIBLE_ROWS) / count)
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def tick(self):
+        """Вызывается на каждом тике часов: бегущее время, пока секундомер идёт"""
+        if self.window is not None and self.timer.running:
+            self.elapsed_label.config(text=format_duration(self.timer.elapsed_ns()))
+
+
+class PrecisionClock:
+    def __init__(self, root, refresh_hz=50, ntp_server=None):
         self.root = root
         self.root.title("Часы высокой точности")
         self.root.geometry("650x450")
@@ -16,8 +1095,22 @@ class PrecisionClock:
         # Создание интерфейса
         self.create_widgets()
         
-        # Запуск обновления времени
-        self.update_time()
+        # Отображаемое время - монотонный счётчик с привязкой к настенным часам
+        self.time_source = TimeSource()
+        self.sntp = None
+        if ntp_server:
+            self.sntp = SNTPClient(ntp_server, self.time_source)
+            self.sntp.start()
+        self.show_precision()
+        
+        # Запуск обновления времени по дедлайнам
+        self.scheduler = TickScheduler(self.root, self.update_time, self.time_source, refresh_hz)
+        self.lag_panel = LagPanel(self.root, self.scheduler, self.time_source)
+        self.world_panel = WorldClockPanel(self.root)
+        self.stopwatch = StopwatchPanel(self.root)
+        self.refresh_var.set(str(refresh_hz))
+        self.show_refresh_rate()
+        self.scheduler.start()
         
     def setup_styles(self):
         """Настройка стилей элементов"""
@@ -111,16 +1204,23 @@ class PrecisionClock:
         update_label = ttk.Label(right_info, text="Обновление:", font=self.info_font)
         update_label.grid(row=1, column=0, sticky=tk.W, pady=5)
         
-        self.update_freq = ttk.Label(right_info, text="1 мс", font=self.info_font)
+        self.update_freq = ttk.Label(right_info, text="", font=self.info_font)
         self.update_freq.grid(row=1, column=1, sticky=tk.W, padx=(10, 0), pady=5)
         
         # Точность
         precision_label = ttk.Label(right_info, text="Точность:", font=self.info_font)
         precision_label.grid(row=2, column=0, sticky=tk.W, pady=5)
         
-        self.precision = ttk.Label(right_info, text="±1 мс", font=self.info_font)
+        self.precision = ttk.Label(right_info, text="", font=self.info_font)
         self.precision.grid(row=2, column=1, sticky=tk.W, padx=(10, 0), pady=5)
         
+        # Смещение относительно SNTP-сервера
+        sntp_label = ttk.Label(right_info, text="SNTP:", font=self.info_font)
+        sntp_label.grid(row=3, column=0, sticky=tk.W, pady=5)
+        
+        self.sntp_info = ttk.Label(right_info, text="", font=self.info_font)
+        self.sntp_info.grid(row=3, column=1, sticky=tk.W, padx=(10, 0), pady=5)
+        
         # Кнопки управления
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=3, column=0, columnspan=2, pady=(20, 0))
@@ -152,10 +1252,50 @@ class PrecisionClock:
         )
         exit_button.grid(row=0, column=2, padx=5)
         
+        # Целевая частота обновления
+        ttk.Label(button_frame, text="Гц:").grid(row=0, column=3, padx=(15, 2))
+        self.refresh_var = tk.StringVar()
+        refresh_box = ttk.Combobox(
+            button_frame,
+            textvariable=self.refresh_var,
+            values=REFRESH_RATES_HZ,
+            width=6
+        )
+        refresh_box.grid(row=0, column=4, padx=5)
+        refresh_box.bind("<<ComboboxSelected>>", self.change_refresh_rate)
+        refresh_box.bind("<Return>", self.change_refresh_rate)
+        
+        # Окно диагностики тиков
+        diagnostics_button = ttk.Button(
+            button_frame,
+            text="Диагностика",
+            command=lambda: self.lag_panel.open(),
+            width=15
+        )
+        diagnostics_button.grid(row=1, column=0, padx=5, pady=(5, 0))
+        
+        # Окно мирового времени
+        world_button = ttk.Button(
+            button_frame,
+            text="Мировое время",
+            command=lambda: self.world_panel.open(),
+            width=15
+        )
+        world_button.grid(row=1, column=1, padx=5, pady=(5, 0))
+        
+        # Секундомер с кругами
+        stopwatch_button = ttk.Button(
+            button_frame,
+            text="Секундомер",
+            command=lambda: self.stopwatch.open(),
+            width=15
+        )
+        stopwatch_button.grid(row=1, column=2, padx=5, pady=(5, 0))
+        
         # Статусная строка
         self.status_bar = ttk.Label(
             main_frame,
-            text="Часы активны. Обновление каждую миллисекунду.",
+            text="Часы активны.",
             relief="sunken",
             anchor=tk.W,
             padding=5
@@ -165,74 +1305,83 @@ class PrecisionClock:
         # Переменные состояния
         self.is_paused = False
         self.dark_theme = False
-        self.last_update = time.time()
-        self.update_count = 0
-        
-    def get_precise_time(self):
-        """Получение точного времени с миллисекундами"""
-        now = datetime.datetime.now()
-        milliseconds = now.microsecond // 1000
-        
-        # Форматирование времени
-        time_str = now.strftime(f"%H:%M:%S.{milliseconds:03d}")
-        
-        # Форматирование даты
-        date_str = now.strftime("%d %B %Y года")
-        date_iso = now.strftime("%Y-%m-%d")
-        date_full = now.strftime("%A, %d %B %Y")
-        
-        # UNIX время с миллисекундами
-        unix_time = time.time()
-        
-        return {
-            'time': time_str,
-            'date': date_str,
-            'date_iso': date_iso,
-            'date_full': date_full,
-            'unix': unix_time,
-            'tz': time.tzname[0],
-            'hour': now.hour,
-            'minute': now.minute,
-            'second': now.second,
-            'ms': milliseconds
+        self.last_status_ns = time.perf_counter_ns()
+        
+        # Форматирование с кэшем и виджеты, которые оно обновляет
+        self.formatter = ClockFormatter()
+        self.tick_cost = TickCost(('format', 'widgets'))
+        self.field_labels = {
+            'time': self.clock_label,
+            'date': self.date_label,
+            'tz': self.tz_value,
+            'date_iso': self.date_iso,
+            'date_full': self.date_full,
+            'unix': self.unix_time,
         }
-    
-    def update_time(self):
-        """Обновление отображения времени"""
-        if not self.is_paused:
-            # Получаем точное время
-            time_data = self.get_precise_time()
-            
-            # Обновляем основные часы
-            self.clock_label.config(text=time_data['time'])
-            
-            # Обновляем дату
-            self.date_label.config(text=time_data['date'])
-            
-            # Обновляем дополнительную информацию
-            self.tz_value.config(text=time_data['tz'])
-            self.date_iso.config(text=time_data['date_iso'])
-            self.date_full.config(text=time_data['date_full'])
-            self.unix_time.config(text=f"{time_data['unix']:.3f}")
-            
+        
+    def update_time(self, due_ns, now_ns):
+        """Обновление отображения времени (вызывается планировщиком в срок due_ns)"""
+        if self.is_paused:
+            return
+        
+        # Строки пересчитываются только при смене секунды, суток или пояса
+        started = time.perf_counter_ns()
+        wall_ns = self.time_source.now_ns()
+        changed = self.formatter.update(wall_ns)
+        formatted = time.perf_counter_ns()
+        
+        # В Tk уходят только изменившиеся значения
+        values = self.formatter.values
+        for field in changed:
+            label = self.field_labels.get(field)
+            if label is not None:
+                label.config(text=values[field])
+        if 'hour' in changed:
             # Меняем цвет в зависимости от времени суток
-            self.update_clock_color(time_data['hour'])
-            
-            # Обновляем статусную строку
-            current_time = time.time()
-            if self.update_count % 100 == 0:  # Каждые 100 обновлений
-                elapsed = current_time - self.last_update
-                freq = 100 / elapsed if elapsed > 0 else 0
-                self.status_bar.config(
-                    text=f"Часы активны. Частота обновления: ~{freq:.1f} Гц. Время: {time_data['time']}"
-                )
-                self.last_update = current_time
-                self.update_count = 0
-            
-            self.update_count += 1
+            self.update_clock_color(values['hour'])
+        self.world_panel.tick(wall_ns)
+        self.stopwatch.tick()
+        finished = time.perf_counter_ns()
+        
+        cost = self.tick_cost
+        cost.add('format', formatted - started)
+        cost.add('widgets', finished - formatted)
+        cost.widget_updates += len(changed)
+        cost.ticks += 1
         
-        # Планируем следующее обновление
-        self.root.after(1, self.update_time)
+        # Обновляем статусную строку раз в секунду
+        elapsed = now_ns - self.last_status_ns
+        if elapsed >= NS_PER_SECOND:
+            self.check_time_source()
+            self.lag_panel.refresh()
+            ticks, mean_late, max_late, missed = self.scheduler.stats()
+            stages, widgets = cost.report()
+            freq = ticks * NS_PER_SECOND / elapsed
+            self.status_bar.config(
+                text=f"Часы активны. Частота обновления: ~{freq:.1f} Гц. "
+                     f"Опоздание тика: ср. {mean_late:.2f} мс, макс. {max_late:.2f} мс, пропущено {missed}\n"
+                     f"Тик: формат {stages['format']:.1f} мкс, виджеты {stages['widgets']:.1f} мкс "
+                     f"({widgets:.1f} обновл.)\n"
+                     f"Системные часы: уход {self.time_source.slew_ppm:+.1f} ppm, "
+                     f"привязок {self.time_source.anchors}"
+            )
+            self.last_status_ns = now_ns
+    
+    def check_time_source(self):
+        """Сверка с системными часами и обновление оценки погрешности"""
+        event = self.time_source.check()
+        if event is not None:
+            # Привязка сдвинулась: сетку тиков и окно SNTP строим заново
+            self.scheduler.resync()
+            if self.sntp is not None:
+                self.sntp.reset()
+        self.show_precision()
+    
+    def show_precision(self):
+        """Погрешность отображаемого времени и замеры SNTP"""
+        precision, sntp = describe_accuracy(self.time_source, self.sntp)
+        self.precision.config(text=precision)
+        self.sntp_info.config(text=sntp)
     
     def update_clock_color(self, hour):
         """Изменение цвета часов в зависимости от времени суток"""
@@ -250,16 +1399,38 @@ class PrecisionClock:
         
         self.clock_label.config(bg=bg_color, fg=fg_color)
     
+    def change_refresh_rate(self, event=None):
+        """Смена целевой частоты обновления"""
+        try:
+            refresh_hz = float(self.refresh_var.get())
+        except ValueError:
+            return
+        if refresh_hz <= 0:
+            return
+        self.scheduler.set_rate(refresh_hz)
+        self.scheduler.stats()
+        self.last_status_ns = time.perf_counter_ns()
+        self.show_refresh_rate()
+    
+    def show_refresh_rate(self):
+        period_ms = self.scheduler.period_ns / DISPLAY_UNIT_NS
+        self.update_freq.config(text=f"{period_ms:g} мс ({1000 / period_ms:g} Гц)")
+    
     def toggle_pause(self):
         """Пауза/продолжение обновления времени"""
         self.is_paused = not self.is_paused
         
         if self.is_paused:
+            # На паузе тики не нужны вовсе
+            self.scheduler.stop()
             self.pause_button.config(text="Продолжить")
             self.status_bar.config(text="Часы на паузе. Время остановлено.")
         else:
+            self.scheduler.stats()
+            self.last_status_ns = time.perf_counter_ns()
+            self.scheduler.start()
             self.pause_button.config(text="Пауза")
-            self.status_bar.config(text="Часы активны. Обновление каждую миллисекунду.")
+            self.status_bar.config(text="Часы активны.")
     
     def toggle_theme(self):
         """Переключение между светлой и темной темами"""
@@ -273,9 +1444,255 @@ class PrecisionClock:
             self.root.configure(bg="SystemButtonFace")
             self.status_bar.configure(background="SystemButtonFace", foreground="black")
             self.theme_button.config(text="Темная тема")
+        
+        # Цвет часов обычно меняется только со сменой часа - здесь перекрашиваем сразу
+        if self.formatter.values['hour'] is not None:
+            self.update_clock_color(self.formatter.values['hour'])
+
+# Крупные цифры для терминала: 5 строк, цифра - 3 клетки, разделители - 1
+BIG_GLYPHS = {
+    "0": ("███", "█ █", "█ █", "█ █", "███"),
+    "1": ("  █", "  █", "  █", "  █", "  █"),
+    "2": ("███", "  █", "███", "█  ", "███"),
+    "3": ("███", "  █", "███", "  █", "███"),
+    "4": ("█ █", "█ █", "███", "  █", "  █"),
+    "5": ("███", "█  ", "███", "  █", "███"),
+    "6": ("███", "█  ", "███", "█ █", "███"),
+    "7": ("███", "  █", "  █", "  █", "  █"),
+    "8": ("███", "█ █", "███", "█ █", "███"),
+    "9": ("███", "█ █", "███", "  █", "███"),
+    ":": (" ", "█", " ", "█", " "),
+    ".": (" ", " ", " ", " ", "█"),
+}
+BIG_HEIGHT = 5
+
+
+def big_text(text):
+    """Строки крупного начертания для text (символы между собой - через пробел)"""
+    glyphs = [BIG_GLYPHS[char] for char in text]
+    return [" ".join(glyph[row] for glyph in glyphs) for row in range(BIG_HEIGHT)]
+
+
+def changed_span(old, new):
+    """Границы [начало, конец) участка, которым new отличается от old; при разной длине - до конца new"""
+    if old == new:
+        return None
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = len(new)
+    if len(old) == end:
+        while old[end - 1] == new[end - 1]:
+            end -= 1
+    return start, end
+
+
+class SleepLoop:
+    """Замена циклу событий Tk для TickScheduler в терминале: один отложенный вызов и сон до него"""
+    
+    def __init__(self):
+        self.pending = None
+        self.running = True
+    
+    def after(self, delay_ms, callback):
+        self.pending = (time.perf_counter_ns() + delay_ms * DISPLAY_UNIT_NS, callback)
+        return self.pending
+    
+    def after_cancel(self, after_id):
+        if self.pending is after_id:
+            self.pending = None
+    
+    def run(self):
+        while self.running and self.pending is not None:
+            deadline, callback = self.pending
+            remaining = deadline - time.perf_counter_ns()
+            if remaining > 0:
+                time.sleep(remaining / NS_PER_SECOND)
+                continue
+            self.pending = None
+            callback()
+
+
+class TerminalScreen:
+    """Экран curses, на который уходят только изменившиеся клетки.
+    
+    Для каждой строки хранится последний выведенный текст; put() сравнивает новый
+    текст со старым и перерисовывает лишь участок от первого до последнего отличия.
+    """
+    
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.resize()
+    
+    def resize(self):
+        self.height, self.width = self.stdscr.getmaxyx()
+        self.lines = [" " * self.width for _ in range(self.height)]
+        self.stdscr.erase()
+        self.dirty = True
+    
+    def put(self, row, text, attr=0):
+        if row >= self.height:
+            return
+        text = text[:self.width].ljust(self.width)
+        span = changed_span(self.lines[row], text)
+        if span is None:
+            return
+        self.lines[row] = text
+        self.dirty = True
+        start, end = span
+        try:
+            self.stdscr.addstr(row, start, text[start:end], attr)
+        except curses.error:
+            # Запись в правый нижний угол двигает курсор за экран - символ при этом выведен
+            pass
+
+
+class TerminalClock:
+    """Часы в терминале (curses): те же источник времени, форматирование и планировщик, что у PrecisionClock"""
+    
+    TIME_ROW = 2
+    INFO_ROW = TIME_ROW + BIG_HEIGHT + 1
+    
+    def __init__(self, stdscr, refresh_hz=50, ntp_server=None):
+        self.stdscr = stdscr
+        self.screen = TerminalScreen(stdscr)
+        self.time_source = TimeSource()
+        self.sntp = None
+        if ntp_server:
+            self.sntp = SNTPClient(ntp_server, self.time_source)
+            self.sntp.start()
+        self.formatter = ClockFormatter()
+        self.loop = SleepLoop()
+        self.scheduler = TickScheduler(self.loop, self.update_time, self.time_source, refresh_hz)
+        self.refresh_hz = refresh_hz
+        self.is_paused = False
+        self.last_status_ns = time.perf_counter_ns()
+        
+        curses.curs_set(0)
+        stdscr.nodelay(True)
+        # Курсор скрыт - после вывода его не нужно возвращать на место
+        stdscr.leaveok(True)
+        self.draw_all()
+    
+    def run(self):
+        self.scheduler.start()
+        self.loop.run()
+    
+    def info_rows(self):
+        """(строка экрана, текст) информационных полей"""
+        values = self.formatter.values
+        period_ms = self.scheduler.period_ns / DISPLAY_UNIT_NS
+        precision, sntp = describe_accuracy(self.time_source, self.sntp)
+        row = self.INFO_ROW
+        return (
+            (row, f"  {values['date']}"),
+            (row + 2, f"  Часовой пояс:  {values['tz']}"),
+            (row + 3, f"  Дата (ISO):    {values['date_iso']}"),
+            (row + 4, f"  Полная дата:   {values['date_full']}"),
+            (row + 5, f"  UNIX время:    {values['unix']}"),
+            (row + 6, f"  Обновление:    {period_ms:g} мс ({1000 / period_ms:g} Гц)"),
+            (row + 7, f"  Точность:      {precision}"),
+            (row + 8, f"  SNTP:          {sntp}"),
+        )
+    
+    def draw_all(self):
+        """Полная перерисовка (старт, смена размера окна)"""
+        self.screen.resize()
+        self.screen.put(0, "  Часы высокой точности", curses.A_BOLD)
+        self.formatter = ClockFormatter()
+        self.update_time(None, time.perf_counter_ns(), force=True)
+        self.screen.put(self.screen.height - 1, "  [q] выход  [p] пауза  [+/-] частота", curses.A_DIM)
+    
+    def draw_time(self, text):
+        # Строки крупных цифр сравниваются с выведенными - на экран уходят только сменившиеся клетки
+        for row, line in enumerate(big_text(text)):
+            self.screen.put(self.TIME_ROW + row, "  " + line, curses.A_BOLD)
+    
+    def update_time(self, due_ns, now_ns, force=False):
+        self.handle_keys()
+        if force or not self.is_paused:
+            changed = self.formatter.update(self.time_source.now_ns())
+            if 'time' in changed:
+                self.draw_time(self.formatter.values['time'])
+            
+            # Прочие поля - раз в секунду или при смене даты и пояса
+            elapsed = now_ns - self.last_status_ns
+            if force or elapsed >= NS_PER_SECOND or len(changed) > 2:
+                for row, text in self.info_rows():
+                    self.screen.put(row, text)
+            if elapsed >= NS_PER_SECOND:
+                self.update_status(elapsed)
+        
+        if self.screen.dirty:
+            self.stdscr.refresh()
+            self.screen.dirty = False
+    
+    def update_status(self, elapsed):
+        event = self.time_source.check()
+        if event is not None:
+            self.scheduler.resync()
+            if self.sntp is not None:
+                self.sntp.reset()
+        ticks, _, _, missed = self.scheduler.stats()
+        p50, _, p99, _ = self.scheduler.lag.percentiles()
+        status = (f"  ~{ticks * NS_PER_SECOND / elapsed:.1f} Гц, опоздание p50 "
+                       f"{p50 / DISPLAY_UNIT_NS:.2f} мс, p99 {p99 / DISPLAY_UNIT_NS:.2f} мс, "
+                       f"пропущено {missed}")
+        self.screen.put(self.INFO_ROW + 10, status)
+        self.last_status_ns += elapsed
+    
+    def handle_keys(self):
+        while True:
+            key = self.stdscr.getch()
+            if key == -1:
+                return
+            if key in (ord("q"), ord("Q"), 27):
+                self.loop.running = False
+            elif key in (ord("p"), ord("P"), ord(" ")):
+                self.is_paused = not self.is_paused
+                status = "  Часы на паузе. Время остановлено." if self.is_paused else "  Часы активны."
+                self.screen.put(self.INFO_ROW + 10, status)
+                self.scheduler.stats()
+                self.last_status_ns = time.perf_counter_ns()
+            elif key in (ord("+"), ord("-")):
+                rates = list(REFRESH_RATES_HZ)
+                index = min(range(len(rates)), key=lambda i: abs(rates[i] - self.refresh_hz))
+                index = min(max(index + (1 if key == ord("+") else -1), 0), len(rates) - 1)
+                self.refresh_hz = rates[index]
+                self.scheduler.set_rate(self.refresh_hz)
+            elif key == curses.KEY_RESIZE:
+                self.draw_all()
+
+
+def run_terminal(stdscr, refresh_hz, ntp_server):
+    TerminalClock(stdscr, refresh_hz, ntp_server).run()
+
 
 def main():
     """Основная функция запуска программы"""
+    parser = argparse.ArgumentParser(description="Часы высокой точности")
+    parser.add_argument("--hz", type=float, default=50, help="целевая частота обновления")
+    parser.add_argument("--ntp", metavar="HOST[:PORT]", help="SNTP-сервер для замера смещения")
+    parser.add_argument("--local-ntp", action="store_true",
+                        help="поднять локальный SNTP-сервер-заглушку и сверяться с ним")
+    parser.add_argument("--terminal", action="store_true",
+                        help="часы в терминале (curses) вместо окна Tk")
+    args = parser.parse_args()
+    
+    ntp_server = args.ntp
+    if args.local_ntp:
+        server = SNTPServer()
+        server.start()
+        ntp_server = server.address
+    
+    if args.terminal or tk is None:
+        if curses is None:
+            parser.error("терминальный режим недоступен: нет модуля curses")
+        locale.setlocale(locale.LC_ALL, "")
+        curses.wrapper(run_terminal, args.hz, ntp_server)
+        return
+    
     root = tk.Tk()
     
     # Настройка иконки
@@ -294,7 +1711,7 @@ def main():
     root.grid_columnconfigure(0, weight=1)
     
     # Создание и запуск приложения
-    app = PrecisionClock(root)
+    app = PrecisionClock(root, args.hz, ntp_server)
     
     # Запуск основного цикла
     root.mainloop()
@@ -1,33 +1,3167 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+except ImportError:
+    # Серверы без python3-tk: доступны --headless, --agent и --coordinate
+    tk = None
 import threading
 import time
 import math
 import psutil
+import numpy as np
 import random
 import os
+import sys
+import json
+import signal
+import argparse
+import logging
+import logging.handlers
+import mmap
+import struct
+import platform
+import queue
+import urllib.request
+import urllib.error
+import multiprocessing as mp
 from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+LOGGER_NAME = "pcstresstest"
+
+
+def default_log(message, level=logging.INFO):
+    """Журнал по умолчанию: именованный логгер модуля (потокобезопасен)"""
+    logging.getLogger(LOGGER_NAME).log(level, message)
+
+
+def create_logger(log_file=None, console=False, max_bytes=5 * 1024 * 1024, backups=5):
+    """Логгер с неблокирующей очередью: запись в файл с ротацией (и в консоль) идёт в отдельном потоке"""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    
+    handlers = []
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s"))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+        handlers.append(console_handler)
+    
+    records = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    listener = logging.handlers.QueueListener(records, *handlers)
+    listener.start()
+    return logger, listener
+
+
+def parse_core_list(text):
+    """Разбор списка ядер вида "0,2-5"; пустая строка или "all" - все ядра"""
+    text = text.strip().lower()
+    if not text or text == "all":
+        return None
+    
+    cores = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    
+    return sorted(set(cores)) or None
+
+
+def format_rate(value):
+    """Краткая запись скорости: 1.2M, 350k..."""
+    for unit, scale in (("G", 1e9), ("M", 1e6), ("k", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.1f}{unit}"
+    return f"{value:.0f}"
+
+
+# Нагрузки CPU: имя -> (подпись в интерфейсе, единица работы)
+CPU_WORKLOADS = {
+    "scalar": ("Scalar Python", "it"),
+    "matmul": ("NumPy MatMul", "FLOP"),
+    "fft": ("NumPy FFT", "FLOP"),
+    "transcendental": ("NumPy sin/exp/log", "elem"),
+}
+
+
+def make_cpu_kernel(workload):
+    """Возвращает (шаг нагрузки, объём работы за шаг в единицах CPU_WORKLOADS)"""
+    rng = np.random.default_rng()
+    
+    if workload == "matmul":
+        n = 256
+        a = rng.random((n, n))
+        b = rng.random((n, n))
+        out = np.empty((n, n))
+        return (lambda: np.matmul(a, b, out=out)), 2 * n ** 3
+    
+    if workload == "fft":
+        n = 1 << 16
+        x = rng.random(n) + 1j * rng.random(n)
+        # Стандартная оценка: 5 N log2 N операций на комплексное БПФ
+        return (lambda: np.fft.fft(x)), 5 * n * math.log2(n)
+    
+    if workload == "transcendental":
+        n = 1 << 16
+        x = rng.random(n)
+        out = np.empty(n)
+        
+        def step():
+            np.sin(x, out=out)
+            np.exp(out, out=out)
+            np.log1p(out, out=out)
+        return step, 3 * n
+    
+    def step():
+        for _ in range(1000):
+            math.sqrt(random.random() * 1000)
+            math.sin(random.random() * 3.14)
+            math.log(random.random() + 1)
+    return step, 1000
+
+
+def cpu_worker(index, core, duty, rates, stop_event, workload="scalar", period=0.1):
+    """Процесс-воркер нагрузки CPU (ШИМ: работа duty*period, затем сон)"""
+    if core is not None:
+        try:
+            psutil.Process().cpu_affinity([core])
+        except (AttributeError, psutil.Error, OSError):
+            pass
+    
+    step, step_work = make_cpu_kernel(workload)
+    work_done = 0
+    report_start = time.perf_counter()
+    
+    while not stop_event.is_set():
+        cycle_start = time.perf_counter()
+        busy_until = cycle_start + period * duty[index]
+        
+        # Вычисления для создания нагрузки
+        while time.perf_counter() < busy_until:
+            step()
+            work_done += step_work
+        
+        idle = period - (time.perf_counter() - cycle_start)
+        if idle > 0:
+            stop_event.wait(idle)
+        
+        # Раз в секунду публикуем достигнутую скорость
+        now = time.perf_counter()
+        if now - report_start >= 1.0:
+            rates[index] = work_done / (now - report_start)
+            work_done = 0
+            report_start = now
+    
+    rates[index] = 0.0
+
+
+class CPUStressPool:
+    """Пул процессов нагрузки CPU: по одному воркеру на логическое (или выбранное) ядро"""
+    
+    def __init__(self, target_load, cores=None, workload="scalar", workers=None):
+        self.ctx = mp.get_context("spawn")
+        self.target_load = target_load
+        self.workload = workload
+        self.unit = CPU_WORKLOADS[workload][1]
+        # Без явного списка ядер воркеры не привязываются к ядрам
+        self.cores = cores if cores else [None] * (workers or os.cpu_count() or 1)
+        self.duty = self.ctx.Array('d', [target_load] * len(self.cores), lock=False)
+        self.rates = self.ctx.Array('d', len(self.cores), lock=False)
+        self.stop_event = self.ctx.Event()
+        self.workers = []
+    
+    def start(self):
+        self.stop_event.clear()
+        
+        # Один поток BLAS на воркер, иначе matmul займёт все ядра и скважность потеряет смысл
+        blas_vars = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+        saved_env = {name: os.environ.get(name) for name in blas_vars}
+        os.environ.update({name: "1" for name in blas_vars})
+        
+        try:
+            for index, core in enumerate(self.cores):
+                worker = self.ctx.Process(
+                    target=cpu_worker,
+                    args=(index, core, self.duty, self.rates, self.stop_event, self.workload),
+                    name=f"cpu-worker-{index}",
+                    daemon=True
+                )
+                worker.start()
+                self.workers.append(worker)
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.time()))
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.workers = []
+    
+    def set_duty(self, index, value):
+        self.duty[index] = min(1.0, max(0.0, value))
+    
+    def get_rates(self):
+        return list(self.rates)
+
+
+class LoadController:
+    """ПИД-регулятор скважности воркеров по измеренной загрузке (psutil.cpu_percent(percpu=True))"""
+    
+    def __init__(self, pool, target_load, log=default_log, interval=0.5,
+                 kp=0.3, ki=0.5, kd=0.02, tolerance=0.03, settle_window=3.0):
+        self.pool = pool
+        self.target_load = target_load
+        self.log = log
+        self.interval = interval
+        self.kp, self.ki, self.kd = kp, ki, kd
+        self.tolerance = tolerance
+        self.settle_window = settle_window
+        
+        count = len(pool.cores)
+        self.integral = [0.0] * count
+        self.prev_error = [0.0] * count
+        
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.start_time = None
+        self.band_enter_time = None
+        self.settling_time = None
+        self.error_history = []
+    
+    def start(self):
+        psutil.cpu_percent(percpu=True)  # первый вызов задаёт точку отсчёта
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        
+        summary = self.summary()
+        if summary['settling_time'] is None:
+            self.log(f"Load controller did not settle within ±{self.tolerance * 100:.0f}%")
+        else:
+            self.log(f"Load controller: settled in {summary['settling_time']:.1f}s, "
+                     f"steady-state error mean {summary['steady_state_error'] * 100:+.1f}%, "
+                     f"max {summary['max_error'] * 100:.1f}%")
+        return summary
+    
+    def set_target(self, target_load, restart_settling=False):
+        """Новая цель (фазы сценария); при смене фазы время установления отсчитывается заново"""
+        self.target_load = target_load
+        if restart_settling:
+            self.start_time = time.perf_counter()
+            self.band_enter_time = None
+            self.settling_time = None
+            self.error_history = []
+    
+    def measured_load(self, index, percpu):
+        """Загрузка ядра воркера; для непривязанных воркеров - средняя по всем ядрам"""
+        core = self.pool.cores[index]
+        if core is not None and core < len(percpu):
+            return percpu[core] / 100.0
+        return sum(percpu) / len(percpu) / 100.0
+    
+    def run(self):
+        last = time.perf_counter()
+        
+        while not self.stop_event.wait(self.interval):
+            percpu = psutil.cpu_percent(percpu=True)
+            now = time.perf_counter()
+            dt = now - last
+            last = now
+            if not percpu or dt <= 0:
+                continue
+            
+            errors = []
+            for index in range(len(self.pool.cores)):
+                error = self.target_load - self.measured_load(index, percpu)
+                errors.append(error)
+                
+                # Интеграл с ограничением против насыщения
+                self.integral[index] = max(-1.0, min(1.0, self.integral[index] + error * dt))
+                derivative = (error - self.prev_error[index]) / dt
+                self.prev_error[index] = error
+                
+                duty = (self.target_load + self.kp * error
+                        + self.ki * self.integral[index] + self.kd * derivative)
+                self.pool.set_duty(index, duty)
+            
+            self.track_settling(now, sum(errors) / len(errors))
+    
+    def track_settling(self, now, error):
+        """Учёт времени установления: ошибка должна держаться в допуске settle_window секунд"""
+        self.error_history.append((now - self.start_time, error))
+        if self.settling_time is not None:
+            return
+        
+        if abs(error) > self.tolerance:
+            self.band_enter_time = None
+            return
+        
+        if self.band_enter_time is None:
+            self.band_enter_time = now
+        elif now - self.band_enter_time >= self.settle_window:
+            self.settling_time = self.band_enter_time - self.start_time
+            self.log(f"Load controller settled in {self.settling_time:.1f}s")
+    
+    def summary(self):
+        errors = []
+        if self.settling_time is not None:
+            errors = [e for t, e in self.error_history if t >= self.settling_time]
+        return {
+            'target_load': self.target_load,
+            'settling_time': self.settling_time,
+            'steady_state_error': sum(errors) / len(errors) if errors else None,
+            'max_error': max(abs(e) for e in errors) if errors else None,
+        }
+
+
+# Шаблоны проверки памяти (в стиле memtest)
+MEMTEST_PATTERNS = ("walking_ones", "checkerboard", "address", "random")
+
+
+def memtest_pattern(pattern, first_word, count, cycle, seed):
+    """Ожидаемое содержимое слов uint64 [first_word, first_word + count) для шаблона и цикла"""
+    index = np.arange(first_word, first_word + count, dtype=np.uint64)
+    
+    if pattern == "walking_ones":
+        # Единичный бит сдвигается от слова к слову и от цикла к циклу
+        return np.left_shift(np.uint64(1), (index + np.uint64(cycle)) % np.uint64(64))
+    
+    if pattern == "checkerboard":
+        odd = (index + np.uint64(cycle)) % np.uint64(2) == 1
+        return np.where(odd, np.uint64(0x5555555555555555), np.uint64(0xAAAAAAAAAAAAAAAA))
+    
+    if pattern == "address":
+        # Адрес в адрес; на нечётных циклах - инвертированный
+        addresses = index * np.uint64(8)
+        return ~addresses if cycle % 2 else addresses
+    
+    if pattern == "random":
+        rng = np.random.default_rng([seed, cycle, first_word])
+        return rng.integers(0, np.iinfo(np.uint64).max, size=count, dtype=np.uint64, endpoint=True)
+    
+    raise ValueError(f"Unknown memtest pattern: {pattern}")
+
+
+def memtest_worker(index, base_offset, size_bytes, seed, stop_event, results):
+    """Процесс-воркер проверки памяти: свой кусок общей области, все шаблоны по кругу"""
+    should_stop = stop_event.is_set
+    region = MemoryRegion(size_bytes)
+    base_word = base_offset // 8
+    
+    try:
+        cycle = 0
+        while not should_stop():
+            for pattern in MEMTEST_PATTERNS:
+                started = time.perf_counter()
+                if not region.write_pattern(pattern, cycle, seed, base_word, should_stop):
+                    return
+                written = time.perf_counter()
+                verdict = region.verify_pattern(pattern, cycle, seed, base_word, should_stop)
+                if verdict is None:
+                    return
+                results.put({
+                    'worker': index,
+                    'pattern': pattern,
+                    'cycle': cycle,
+                    'bytes': region.size,
+                    'write_time': written - started,
+                    'verify_time': time.perf_counter() - written,
+                    'mismatches': verdict[0],
+                    'samples': verdict[1],
+                })
+            cycle += 1
+    finally:
+        region.close()
+
+
+class MemTestPool:
+    """Проверка памяти шаблонами, область поделена между процессами-воркерами"""
+    
+    def __init__(self, size_bytes, workers=None, seed=0):
+        self.ctx = mp.get_context("spawn")
+        count = max(1, workers or os.cpu_count() or 1)
+        # Кусок каждого воркера кратен 16 байтам, смещения - логические адреса в общей области
+        slice_bytes = max(16, size_bytes // count // 16 * 16)
+        self.slices = [(i * slice_bytes, slice_bytes) for i in range(count)]
+        self.size = slice_bytes * count
+        self.seed = seed
+        self.results = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.workers = []
+    
+    def start(self):
+        for index, (base, size) in enumerate(self.slices):
+            worker = self.ctx.Process(
+                target=memtest_worker,
+                args=(index, base, size, self.seed, self.stop_event, self.results),
+                name=f"memtest-worker-{index}",
+                daemon=True
+            )
+            worker.start()
+            self.workers.append(worker)
+    
+    def drain(self):
+        """Все накопившиеся результаты проходов без блокировки"""
+        records = []
+        while True:
+            try:
+                records.append(self.results.get_nowait())
+            except queue.Empty:
+                return records
+    
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        for worker in self.workers:
+            worker.join(max(0.0, deadline - time.time()))
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self.workers = []
+        return self.drain()
+
+
+# Размер сегмента памяти в режиме потоковой нагрузки (шаг роста и освобождения)
+RAM_SEGMENT_BYTES = 256 * 1024 * 1024
+
+
+class MemoryRegion:
+    """Область памяти на анонимном mmap с потоковыми проходами чтения, записи и копирования"""
+    
+    def __init__(self, size_bytes, chunk_bytes=64 * 1024 * 1024):
+        # Размер кратен 16 байтам, чтобы область делилась на две половины из uint64
+        self.size = max(16, size_bytes - size_bytes % 16)
+        self.buffer = mmap.mmap(-1, self.size)
+        # Крупные страницы уменьшают число page fault при выделении (только Linux)
+        if hasattr(mmap, 'MADV_HUGEPAGE'):
+            try:
+                self.buffer.madvise(mmap.MADV_HUGEPAGE)
+            except OSError:
+                pass
+        self.data = np.frombuffer(self.buffer, dtype=np.uint64)
+        self.chunk = max(1, chunk_bytes // 8)
+        self.bandwidth = {}  # GB/s по последнему проходу каждого вида
+    
+    def chunks(self, length=None):
+        length = len(self.data) if length is None else length
+        for start in range(0, length, self.chunk):
+            yield start, min(start + self.chunk, length)
+    
+    def timed_pass(self, name, body, bytes_moved, should_stop):
+        """Выполняет проход по кускам; возвращает False, если прерван"""
+        started = time.perf_counter()
+        for start, end in self.chunks():
+            if should_stop():
+                return False
+            body(start, end)
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            self.bandwidth[name] = bytes_moved / elapsed / 1e9
+        return True
+    
+    def commit(self, should_stop=lambda: False, progress=None):
+        """Выделение физических страниц первой записью на скорости записи в память"""
+        started = time.perf_counter()
+        for start, end in self.chunks():
+            if should_stop():
+                return False
+            self.data[start:end].fill(start)
+            if progress:
+                progress(end * 8)
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            self.bandwidth['commit'] = self.size / elapsed / 1e9
+        return True
+    
+    def read_pass(self, should_stop=lambda: False):
+        return self.timed_pass('read', lambda s, e: np.add.reduce(self.data[s:e]), self.size, should_stop)
+    
+    def write_pass(self, value=0, should_stop=lambda: False):
+        return self.timed_pass('write', lambda s, e: self.data[s:e].fill(value), self.size, should_stop)
+    
+    def copy_pass(self, should_stop=lambda: False):
+        """Копирование первой половины во вторую (чтение + запись половины области)"""
+        half = len(self.data) // 2
+        started = time.perf_counter()
+        for start, end in self.chunks(half):
+            if should_stop():
+                return False
+            np.copyto(self.data[half + start:half + end], self.data[start:end])
+        elapsed = time.perf_counter() - started
+        if elapsed > 0:
+            self.bandwidth['copy'] = half * 8 * 2 / elapsed / 1e9
+        return True
+    
+    def write_pattern(self, pattern, cycle, seed, base_word=0, should_stop=lambda: False):
+        for start, end in self.chunks():
+            if should_stop():
+                return False
+            self.data[start:end] = memtest_pattern(pattern, base_word + start, end - start, cycle, seed)
+        return True
+    
+    def verify_pattern(self, pattern, cycle, seed, base_word=0, should_stop=lambda: False, max_samples=16):
+        """Сверка с ожидаемым шаблоном; возвращает (число ошибок, [(смещение, ожидалось, прочитано)]) или None"""
+        mismatches = 0
+        samples = []
+        for start, end in self.chunks():
+            if should_stop():
+                return None
+            expected = memtest_pattern(pattern, base_word + start, end - start, cycle, seed)
+            actual = self.data[start:end]
+            bad = np.flatnonzero(actual != expected)
+            if len(bad):
+                mismatches += len(bad)
+                for word in bad[:max_samples - len(samples)]:
+                    samples.append(((base_word + start + int(word)) * 8, int(expected[word]), int(actual[word])))
+        return mismatches, samples
+    
+    def close(self):
+        # numpy-представление держит буфер mmap, его нужно отпустить первым
+        self.data = None
+        self.buffer.close()
+
+
+class LatencyHistogram:
+    """Гистограмма задержек в наносекундах: логарифмические корзины, 16 на октаву"""
+    
+    BUCKETS_PER_OCTAVE = 16
+    
+    def __init__(self, octaves=40):
+        self.counts = np.zeros(octaves * self.BUCKETS_PER_OCTAVE, dtype=np.int64)
+        self.total = 0
+        self.max = 0
+    
+    def record(self, ns):
+        index = int(math.log2(ns) * self.BUCKETS_PER_OCTAVE) if ns > 1 else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.total += 1
+        if ns > self.max:
+            self.max = ns
+    
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        self.max = max(self.max, other.max)
+    
+    def bucket_upper(self, index):
+        return 2 ** ((index + 1) / self.BUCKETS_PER_OCTAVE)
+    
+    def percentile(self, p):
+        """Верхняя граница корзины, в которую попадает p-й процентиль (нс)"""
+        total = int(self.counts.sum())
+        if not total:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), total * p / 100.0))
+        return min(self.bucket_upper(index), float(self.max))
+
+
+def read_block(fd, buffer, offset):
+    if hasattr(os, 'preadv'):
+        return os.preadv(fd, [buffer], offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    data = os.read(fd, len(buffer))
+    buffer[:len(data)] = data
+    return len(data)
+
+
+def write_block(fd, buffer, offset):
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, buffer, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, buffer)
+
+
+# Размеры блока для дискового теста
+DISK_BLOCK_SIZES = {"4K": 4096, "16K": 16384, "64K": 65536, "256K": 262144, "1M": 1048576}
+
+
+class DiskStress:
+    """Нагрузка на диск: файлы в каталоге, последовательный/случайный доступ, очередь из потоков"""
+    
+    def __init__(self, directory, file_size, block_size=4096, queue_depth=1, workers=1,
+                 access="random", operation="mixed", direct=False, log=default_log):
+        self.directory = directory
+        self.block_size = block_size
+        self.blocks = max(1, file_size // block_size)
+        self.file_size = self.blocks * block_size
+        self.queue_depth = max(1, queue_depth)
+        self.workers = max(1, workers)
+        self.access = access
+        self.operation = operation
+        self.direct = direct
+        self.log = log
+        
+        self.paths = [os.path.join(directory, f"stress_io_{os.getpid()}_{i}.dat") for i in range(self.workers)]
+        self.open_flags = os.O_RDWR | getattr(os, 'O_BINARY', 0)
+        self.fsync_writes = False
+        self.drop_reads = False  # выбрасывать прочитанные блоки из кэша страниц
+        self.uncached = False    # O_DIRECT действует: чтение гарантированно идёт с устройства
+        self.rate_limit = None  # МБ/с на весь тест: None - без ограничения, 0 - пауза
+        self.stop_flag = threading.Event()
+        self.threads = []
+        self.histograms = []
+        self.counters = []  # [операций, байт] на поток
+        self.last_snapshot = None
+    
+    def prepare(self, should_stop=lambda: False):
+        """Создание и заполнение рабочих файлов"""
+        chunk = os.urandom(1024 * 1024)
+        for path in self.paths:
+            with open(path, 'wb') as f:
+                written = 0
+                while written < self.file_size:
+                    if should_stop():
+                        return False
+                    written += f.write(chunk[:min(len(chunk), self.file_size - written)])
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # Обход кэша страниц: O_DIRECT, где он есть и поддерживается ФС; иначе fsync после
+        # записи, а прочитанное выбрасывается из кэша через posix_fadvise (где он есть)
+        if self.direct:
+            if hasattr(os, 'O_DIRECT'):
+                try:
+                    os.close(os.open(self.paths[0], self.open_flags | os.O_DIRECT))
+                    self.open_flags |= os.O_DIRECT
+                    self.uncached = True
+                except OSError:
+                    pass
+            if not self.uncached:
+                self.fsync_writes = True
+                self.drop_reads = hasattr(os, 'posix_fadvise')
+                self.log("O_DIRECT not available here, falling back to fsync after writes"
+                         + (" and dropping read blocks from the page cache" if self.drop_reads else ""),
+                         logging.WARNING)
+                if self.drop_reads:
+                    # Только что записанные файлы целиком в кэше - выбрасываем их до начала чтения
+                    for path in self.paths:
+                        fd = os.open(path, os.O_RDONLY)
+                        try:
+                            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                        finally:
+                            os.close(fd)
+        return True
+    
+    def start(self):
+        self.stop_flag.clear()
+        for worker in range(self.workers):
+            for slot in range(self.queue_depth):
+                histogram = LatencyHistogram()
+                counter = [0, 0]
+                self.histograms.append(histogram)
+                self.counters.append(counter)
+                thread = threading.Thread(
+                    target=self.io_loop,
+                    args=(self.paths[worker], slot, histogram, counter),
+                    daemon=True
+                )
+                thread.start()
+                self.threads.append(thread)
+        self.last_snapshot = (time.perf_counter(), 0, 0)
+    
+    def io_loop(self, path, slot, histogram, counter):
+        fd = os.open(path, self.open_flags)
+        # Буфер из mmap выровнен по странице, как требует O_DIRECT
+        buffer = mmap.mmap(-1, self.block_size)
+        buffer.write(os.urandom(self.block_size))
+        rng = random.Random()
+        block = slot
+        pace = None
+        pace_rate = None
+        
+        try:
+            while not self.stop_flag.is_set():
+                # Ограничение скорости: каждый поток держит свою долю общего лимита
+                rate = self.rate_limit
+                if rate is not None:
+                    if rate <= 0:
+                        self.stop_flag.wait(0.05)
+                        pace = None
+                        continue
+                    now = time.perf_counter()
+                    if pace is None or pace_rate != rate or now - pace > 1.0:
+                        pace, pace_rate = now, rate  # после простоя долг не копим
+                    pace += self.block_size / (rate * 1e6 / len(self.threads))
+                    if pace > now:
+                        self.stop_flag.wait(pace - now)
+                
+                if self.access == "random":
+                    block = rng.randrange(self.blocks)
+                else:
+                    block = (block + self.queue_depth) % self.blocks
+                offset = block * self.block_size
+                is_write = self.operation == "write" or (self.operation == "mixed" and rng.random() < 0.5)
+                
+                started = time.perf_counter_ns()
+                if is_write:
+                    write_block(fd, buffer, offset)
+                    if self.fsync_writes:
+                        os.fsync(fd)
+                else:
+                    read_block(fd, buffer, offset)
+                histogram.record(time.perf_counter_ns() - started)
+                if self.drop_reads and not is_write:
+                    os.posix_fadvise(fd, offset, self.block_size, os.POSIX_FADV_DONTNEED)
+                
+                counter[0] += 1
+                counter[1] += self.block_size
+        finally:
+            os.close(fd)
+            buffer.close()
+    
+    def snapshot(self):
+        """Скорость с прошлого снимка и процентили задержки за весь тест"""
+        now = time.perf_counter()
+        ops = sum(c[0] for c in self.counters)
+        nbytes = sum(c[1] for c in self.counters)
+        last_time, last_ops, last_bytes = self.last_snapshot or (now, ops, nbytes)
+        self.last_snapshot = (now, ops, nbytes)
+        elapsed = now - last_time
+        
+        merged = LatencyHistogram()
+        for histogram in self.histograms:
+            merged.merge(histogram)
+        
+        return {
+            'mbps': (nbytes - last_bytes) / elapsed / 1e6 if elapsed > 0 else 0.0,
+            'iops': (ops - last_ops) / elapsed if elapsed > 0 else 0.0,
+            'total_ops': ops,
+            'p50_us': merged.percentile(50) / 1000,
+            'p99_us': merged.percentile(99) / 1000,
+            'p999_us': merged.percentile(99.9) / 1000,
+            'histogram': merged,
+        }
+    
+    def stop(self):
+        self.stop_flag.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def cache_sweep_sizes(max_bytes, min_bytes=4096, steps_per_octave=2):
+    """Размеры рабочего набора: геометрическая прогрессия от min_bytes до max_bytes (кратны 64 Б)"""
+    sizes = []
+    step = 0
+    while True:
+        size = int(min_bytes * 2 ** (step / steps_per_octave)) // 64 * 64
+        if size > max_bytes:
+            return sizes
+        if not sizes or size != sizes[-1]:
+            sizes.append(size)
+        step += 1
+
+
+def reported_cache_sizes():
+    """Размеры кэшей по данным ОС (только Linux sysfs), для сравнения с найденными границами"""
+    caches = {}
+    base = "/sys/devices/system/cpu/cpu0/cache"
+    try:
+        for entry in sorted(os.listdir(base)):
+            if not entry.startswith("index"):
+                continue
+            with open(os.path.join(base, entry, "level")) as f:
+                level = f.read().strip()
+            with open(os.path.join(base, entry, "type")) as f:
+                kind = f.read().strip()
+            with open(os.path.join(base, entry, "size")) as f:
+                size = f.read().strip()
+            if kind == "Instruction":
+                continue
+            units = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 ** 3}
+            caches[f"L{level}"] = int(size[:-1]) * units[size[-1]] if size[-1] in units else int(size)
+    except (OSError, ValueError):
+        pass
+    return caches
+
+
+def median3(values):
+    """Медианное сглаживание окном 3 (края без изменений)"""
+    values = np.asarray(values, dtype=float)
+    if len(values) < 3:
+        return values
+    smoothed = values.copy()
+    smoothed[1:-1] = np.median(np.stack((values[:-2], values[1:-1], values[2:])), axis=0)
+    return smoothed
+
+
+def detect_cache_boundaries(points, latency_jump=1.3, bandwidth_drop=0.65, transition=2, min_jump_ns=5.0):
+    """Границы уровней кэша: последний размер перед скачком задержки или провалом пропускной способности.
+    
+    Кривые сглаживаются медианой, сравнение идёт с началом текущего плато; переход,
+    растянутый на несколько точек, даёт одну границу. Скачок задержки меньше min_jump_ns
+    считается шумом замера.
+    """
+    if len(points) < 2:
+        return []
+    latency = median3([p['ns_per_access'] for p in points])
+    bandwidth = median3([p['gbps'] for p in points])
+    
+    boundaries = []
+    plateau = 0
+    last_jump = -transition - 1
+    for i in range(1, len(points)):
+        latency_step = latency[i] - latency[plateau]
+        if (latency[i] >= latency[plateau] * latency_jump and latency_step >= min_jump_ns) \
+                or bandwidth[i] <= bandwidth[plateau] * bandwidth_drop:
+            if i - last_jump > transition:
+                boundaries.append({'level': f"L{len(boundaries) + 1}", 'size': points[i - 1]['size']})
+            last_jump = i
+            plateau = i
+    return boundaries
+
+
+class CacheSweep:
+    """Развёртка рабочего набора: задержка (погоня за указателями) и пропускная способность (шаг 64 Б)"""
+    
+    LINE = 64
+    SELF_LOOP_INDEX = 1023
+    
+    def __init__(self, max_bytes, steps=1 << 20, seed=0):
+        self.sizes = cache_sweep_sizes(max_bytes)
+        self.steps = steps
+        self.rng = np.random.default_rng(seed)
+        # Один массив на всю развёртку: меньшие наборы - его префиксы
+        self.data = np.zeros((self.sizes[-1] if self.sizes else self.LINE) // 8, dtype=np.int64)
+        self.words = memoryview(self.data)
+        # Цепочка из одного слова, замкнутая на себя, - тот же цикл с попаданием в L1.
+        # Индекс больше 256: малые int в CPython кэшированы и создаются бесплатно
+        self.self_loop = np.zeros(self.SELF_LOOP_INDEX + 1, dtype=np.int64)
+        self.self_loop[-1] = self.SELF_LOOP_INDEX
+    
+    def chase(self, words, start, steps):
+        """Время (с) steps зависимых чтений: адрес следующего - значение текущего"""
+        index = start
+        started = time.perf_counter()
+        for _ in range(steps):
+            index = words[index]
+        return time.perf_counter() - started
+    
+    def latency(self, size, trials=3):
+        """ns на обращение сверх попадания в L1: одна цепочка по случайному циклу из кэш-линий.
+        
+        Каждое чтение ждёт предыдущего, поэтому обращения не перекрываются и меряется
+        именно задержка. Цикл идёт в интерпретаторе; его цена, замеренная той же цепочкой
+        по одному слову в L1, вычитается. Разница в единицы нс внутри L1/L2 тонет в шуме
+        интерпретатора, задержки L3 и памяти видны надёжно.
+        """
+        lines = size // self.LINE
+        stride = self.LINE // 8
+        order = self.rng.permutation(lines)
+        self.data[order * stride] = np.roll(order, -1) * stride
+        
+        start = int(order[0]) * stride
+        # Прогрев: цепочка проходит набор, чтобы кэш и TLB пришли в устойчивое состояние
+        self.chase(self.words, start, min(lines, self.steps))
+        # Цена цикла плавает вместе с частотой ядра - замеряем её вперемешку с цепочкой
+        self_loop = memoryview(self.self_loop)
+        best = overhead = float('inf')
+        for _ in range(trials):
+            overhead = min(overhead, self.chase(self_loop, self.SELF_LOOP_INDEX, self.steps))
+            best = min(best, self.chase(self.words, start, self.steps))
+        return max(best - overhead, 0.0) / self.steps * 1e9
+    
+    def bandwidth(self, size, trials=3):
+        """GB/s при чтении одного слова из каждой кэш-линии набора"""
+        lines = size // self.LINE
+        repeats = max(1, (128 * 1024 * 1024) // size)
+        # Нулевой шаг по первой оси: один вызов проходит по набору repeats раз
+        view = np.lib.stride_tricks.as_strided(self.data, shape=(repeats, lines), strides=(0, self.LINE), writeable=False)
+        best = float('inf')
+        for _ in range(trials):
+            started = time.perf_counter()
+            np.add.reduce(view, axis=None)
+            best = min(best, time.perf_counter() - started)
+        return repeats * size / best / 1e9
+    
+    def run(self, should_stop=lambda: False, on_point=None):
+        points = []
+        for size in self.sizes:
+            if should_stop():
+                break
+            point = {'size': size, 'ns_per_access': self.latency(size), 'gbps': self.bandwidth(size)}
+            points.append(point)
+            if on_point:
+                on_point(point)
+        return points
+
+
+# Механизмы передачи управления для теста планировщика
+CONTENTION_MECHANISMS = {
+    'pipe': "process pairs over pipes",
+    'semaphore': "process pairs over semaphores",
+    'queue': "thread pairs over queue.Queue",
+    'lock': "threads contending on one lock",
+}
+
+
+def handoff_channel(mechanism, channels):
+    """(send, receive(timeout) -> bool) для конца пары пинг-понг"""
+    inbox, outbox = channels
+    if mechanism == "pipe":
+        return (lambda: outbox.send_bytes(b"x"),
+                lambda timeout: inbox.poll(timeout) and bool(inbox.recv_bytes()))
+    if mechanism == "semaphore":
+        return outbox.release, lambda timeout: inbox.acquire(timeout=timeout)
+    return (lambda: outbox.put(None),
+            lambda timeout: handoff_get(inbox, timeout))
+
+
+def handoff_get(channel, timeout):
+    try:
+        channel.get(timeout=timeout)
+        return True
+    except queue.Empty:
+        return False
+
+
+def pingpong(role, mechanism, channels, ready, start_event, stop_event, results):
+    """Конец пары пинг-понг (процесс или поток). ping замеряет круг, задержка передачи - половина"""
+    send, receive = handoff_channel(mechanism, channels)
+    histogram = LatencyHistogram()
+    rounds = 0
+    ready.release()
+    start_event.wait()
+    
+    if role == "ping":
+        while not stop_event.is_set():
+            started = time.perf_counter_ns()
+            send()
+            if not receive(1.0):
+                break
+            histogram.record((time.perf_counter_ns() - started) // 2)
+            rounds += 1
+        results.put((2 * rounds, histogram))
+    else:
+        while not stop_event.is_set():
+            if receive(0.2):
+                send()
+
+
+def lock_contender(lock, ready, start_event, stop_event, results):
+    """Поток, конкурирующий за общую блокировку: задержка - ожидание захвата"""
+    histogram = LatencyHistogram()
+    acquired = 0
+    ready.release()
+    start_event.wait()
+    while not stop_event.is_set():
+        started = time.perf_counter_ns()
+        with lock:
+            histogram.record(time.perf_counter_ns() - started)
+            acquired += 1
+    results.put((acquired, histogram))
+
+
+class ContentionTest:
+    """Нагрузка на планировщик: пинг-понг и борьба за блокировки при растущем числе потоков/процессов"""
+    
+    def __init__(self, mechanisms=None, max_workers=None, level_seconds=2.0, log=default_log,
+                 should_stop=lambda: False):
+        self.mechanisms = list(mechanisms or CONTENTION_MECHANISMS)
+        self.max_workers = max_workers or max(4, 2 * (os.cpu_count() or 1))
+        self.level_seconds = level_seconds
+        self.log = log
+        self.should_stop = should_stop
+        self.ctx = mp.get_context("spawn")
+    
+    def levels(self):
+        """Число участников: 2, 4, 8... до max_workers (переподписка ядер)"""
+        counts = []
+        workers = 2
+        while workers <= self.max_workers:
+            counts.append(workers)
+            workers *= 2
+        return counts
+    
+    def level_count(self):
+        return len(self.mechanisms) * len(self.levels())
+    
+    def run_level(self, mechanism, workers):
+        processes = mechanism in ("pipe", "semaphore")
+        sync = self.ctx if processes else threading
+        start_event, stop_event = sync.Event(), sync.Event()
+        ready = sync.Semaphore(0)
+        results = self.ctx.Queue() if processes else queue.Queue()
+        
+        participants = []
+        # Process.start() отпускает свои аргументы, а семафоры и каналы пар
+        # должны жить, пока дочерние процессы их не откроют
+        channels_alive = []
+        if mechanism == "lock":
+            lock = threading.Lock()
+            for _ in range(workers):
+                participants.append(threading.Thread(target=lock_contender, daemon=True,
+                                                     args=(lock, ready, start_event, stop_event, results)))
+        else:
+            for _ in range(workers // 2):
+                if mechanism == "pipe":
+                    forward, backward = self.ctx.Pipe(duplex=False), self.ctx.Pipe(duplex=False)
+                    ping_side, pong_side = (backward[0], forward[1]), (forward[0], backward[1])
+                else:
+                    a, b = (sync.Semaphore(0), sync.Semaphore(0)) if processes else (queue.Queue(), queue.Queue())
+                    ping_side, pong_side = (a, b), (b, a)
+                channels_alive.append((ping_side, pong_side))
+                for role, channels in (("ping", ping_side), ("pong", pong_side)):
+                    args = (role, mechanism, channels, ready, start_event, stop_event, results)
+                    participants.append(self.ctx.Process(target=pingpong, args=args, daemon=True) if processes
+                                        else threading.Thread(target=pingpong, args=args, daemon=True))
+        
+        for participant in participants:
+            participant.start()
+        try:
+            # Отсчёт - после запуска всех участников (spawn процессов небыстрый)
+            for _ in participants:
+                if not ready.acquire(timeout=30):
+                    raise RuntimeError(f"{mechanism}: workers did not start")
+            
+            switches = psutil.cpu_stats().ctx_switches
+            started = time.perf_counter()
+            start_event.set()
+            deadline = started + self.level_seconds
+            while time.perf_counter() < deadline and not self.should_stop():
+                time.sleep(0.05)
+            stop_event.set()
+            elapsed = time.perf_counter() - started
+            switches = psutil.cpu_stats().ctx_switches - switches
+            
+            histogram = LatencyHistogram()
+            handoffs = 0
+            reporters = workers if mechanism == "lock" else workers // 2
+            for _ in range(reporters):
+                count, partial = results.get(timeout=10)
+                handoffs += count
+                histogram.merge(partial)
+        finally:
+            stop_event.set()
+            start_event.set()
+            for participant in participants:
+                participant.join(timeout=5)
+                if processes and participant.is_alive():
+                    participant.terminate()
+        
+        return {
+            'mechanism': mechanism,
+            'workers': workers,
+            'handoffs_per_s': handoffs / elapsed,
+            'ctx_switches_per_s': switches / elapsed,
+            'p50_us': histogram.percentile(50) / 1000,
+            'p99_us': histogram.percentile(99) / 1000,
+            'p999_us': histogram.percentile(99.9) / 1000,
+            'max_us': histogram.max / 1000,
+        }
+    
+    def run(self, on_result=None):
+        results = []
+        for mechanism in self.mechanisms:
+            for workers in self.levels():
+                if self.should_stop():
+                    return results
+                result = self.run_level(mechanism, workers)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+        return results
+
+
+# Тесты набора бенчмарков: имя -> (единица, больше - лучше)
+BENCHMARKS = {
+    'single_core': ("op/s", True),
+    'all_core': ("op/s", True),
+    'memory_bandwidth': ("GB/s", True),
+    'memory_load_latency': ("ns", False),
+    'disk_throughput': ("MB/s", True),
+}
+
+
+def summarize(values):
+    """Медиана и разброс по итерациям"""
+    values = sorted(values)
+    if not values:
+        return None
+    median = float(np.median(values))
+    return {
+        'median': median,
+        'min': values[0],
+        'max': values[-1],
+        'stdev': float(np.std(values)),
+        'spread_pct': (values[-1] - values[0]) / median * 100 if median else 0.0,
+        'iterations': len(values),
+    }
+
+
+def load_benchmark_results(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def save_benchmark_result(path, entry):
+    runs = load_benchmark_results(path)
+    runs.append(entry)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(runs, f, indent=1)
+
+
+def find_baseline(runs, baseline):
+    """Базовый прогон: 'last' - последний сохранённый, номер (с 0, отрицательный - с конца) или id"""
+    if not runs or not baseline:
+        return None
+    if baseline == "last":
+        return runs[-1]
+    for run in runs:
+        if run['id'] == baseline:
+            return run
+    try:
+        return runs[int(baseline)]
+    except (ValueError, IndexError):
+        return None
+
+
+def compare_benchmarks(current, baseline, tolerance_pct):
+    """Сравнение медиан с базой; ухудшение больше допуска помечается как регрессия.
+    Замеры, прошедшие через кэш страниц, не сравниваются."""
+    rows = []
+    for name, (unit, higher_is_better) in BENCHMARKS.items():
+        now = current.get(name)
+        before = baseline['metrics'].get(name)
+        if not now or not before or not before['median']:
+            continue
+        if now.get('cached') or before.get('cached'):
+            continue
+        change = (now['median'] - before['median']) / before['median'] * 100
+        worse = -change if higher_is_better else change
+        rows.append({
+            'name': name,
+            'unit': unit,
+            'baseline': before['median'],
+            'current': now['median'],
+            'change_pct': change,
+            'regression': worse > tolerance_pct,
+        })
+    return rows
+
+
+class BenchmarkSuite:
+    """Повторяемый набор бенчмарков: прогрев, затем итерации с медианой и разбросом"""
+    
+    def __init__(self, iterations=5, warmup=1, window=2.0, workload="scalar", disk_dir=".",
+                 log=default_log, should_stop=lambda: False):
+        self.iterations = max(1, iterations)
+        self.warmup = max(0, warmup)
+        self.window = window
+        self.workload = workload
+        self.disk_dir = disk_dir
+        self.log = log
+        self.should_stop = should_stop
+        self.results = {}
+    
+    def estimated_duration(self):
+        # CPU (два теста) и диск меряются окнами по window секунд; плюс запуск воркеров и память
+        return (self.warmup + self.iterations) * self.window * 3 + 30
+    
+    def windows(self, measure):
+        """Значение measure() в конце каждого окна; окна прогрева отбрасываются"""
+        values = []
+        for iteration in range(self.warmup + self.iterations):
+            deadline = time.perf_counter() + self.window
+            while time.perf_counter() < deadline:
+                if self.should_stop():
+                    return values
+                time.sleep(0.05)
+            value = measure()
+            if iteration >= self.warmup:
+                values.append(value)
+        return values
+    
+    def bench_cpu(self, workers=None):
+        """Суммарная скорость воркеров на полной нагрузке (воркеры публикуют её раз в секунду)"""
+        pool = CPUStressPool(1.0, workload=self.workload, workers=workers)
+        pool.start()
+        try:
+            return self.windows(lambda: sum(pool.get_rates()))
+        finally:
+            pool.stop()
+    
+    def bench_memory(self):
+        """Копирование по mmap-области и задержка зависимого чтения вне кэшей"""
+        size = min(1024 ** 3, psutil.virtual_memory().available // 8)
+        bandwidth = []
+        region = MemoryRegion(size)
+        try:
+            if not region.commit(self.should_stop):
+                return [], []
+            for iteration in range(self.warmup + self.iterations):
+                if not region.copy_pass(self.should_stop):
+                    return [], []
+                if iteration >= self.warmup:
+                    bandwidth.append(region.bandwidth['copy'])
+        finally:
+            region.close()
+        
+        latency = []
+        sweep = CacheSweep(min(256 * 1024 * 1024, size))
+        for iteration in range(self.warmup + self.iterations):
+            if self.should_stop():
+                break
+            value = sweep.latency(sweep.sizes[-1])
+            if iteration >= self.warmup:
+                latency.append(value)
+        return bandwidth, latency
+    
+    def bench_disk(self):
+        """Последовательное чтение блоками по 1 МБ в обход кэша страниц.
+        
+        Возвращает (значения, cached): без O_DIRECT чтение может идти из кэша страниц
+        (tmpfs, ФС без O_DIRECT), и такой результат не годится для сравнения с базой.
+        """
+        disk = DiskStress(self.disk_dir, 256 * 1024 * 1024, 1024 * 1024, queue_depth=4,
+                          access="sequential", operation="read", direct=True, log=self.log)
+        try:
+            if not disk.prepare(self.should_stop):
+                return [], False
+            disk.start()
+            return self.windows(lambda: disk.snapshot()['mbps']), not disk.uncached
+        finally:
+            disk.stop()
+    
+    def run(self):
+        for name in ('single_core', 'all_core', 'memory', 'disk_throughput'):
+            if self.should_stop():
+                break
+            self.log(f"Benchmark {name}: {self.warmup} warm-up + {self.iterations} iterations")
+            if name == 'single_core':
+                self.record(name, self.bench_cpu(1))
+            elif name == 'all_core':
+                self.record(name, self.bench_cpu())
+            elif name == 'memory':
+                bandwidth, latency = self.bench_memory()
+                self.record('memory_bandwidth', bandwidth)
+                self.record('memory_load_latency', latency)
+            else:
+                values, cached = self.bench_disk()
+                self.record(name, values, cached)
+        return self.results
+    
+    def record(self, name, values, cached=False):
+        stats = summarize(values)
+        if stats is None:
+            return
+        note = ""
+        if cached:
+            stats['cached'] = True
+            note = " (page cache not bypassed, excluded from baseline comparison)"
+        self.results[name] = stats
+        self.log(f"  {name}: median {stats['median']:.4g} {BENCHMARKS[name][0]}, "
+                 f"spread {stats['spread_pct']:.1f}%{note}")
+
+
+class RingBuffer:
+    """Кольцевой буфер фиксированного размера на массиве numpy: строка на отсчёт"""
+    
+    def __init__(self, capacity, width):
+        # Без заполнения: ОС выделяет страницы по мере записи, а читаются только записанные строки
+        self.data = np.empty((capacity, width))
+        self.capacity = capacity
+        self.count = 0  # всего записано строк
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return min(self.count, self.capacity)
+    
+    def append(self, row):
+        with self.lock:
+            self.data[self.count % self.capacity] = row
+            self.count += 1
+    
+    def latest(self):
+        with self.lock:
+            if not self.count:
+                return None
+            return self.data[(self.count - 1) % self.capacity].copy()
+    
+    def last(self, n=None):
+        """Последние n строк (по умолчанию все) в хронологическом порядке"""
+        with self.lock:
+            return self.tail(n)
+    
+    def tail(self, n=None):
+        """Копия последних n строк; вызывается под self.lock"""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.count % self.capacity
+        if n <= end:
+            return self.data[end - n:end].copy()
+        return np.concatenate((self.data[self.capacity - (n - end):], self.data[:end]))
+    
+    def since(self, count):
+        """Строки, добавленные после того, как всего было записано count (и новый счётчик).
+        Счётчик и строки берутся за один захват блокировки, чтобы окно не сдвинулось между ними"""
+        with self.lock:
+            total = self.count
+            rows = self.tail(max(0, total - count))
+        return rows, total
+
+
+# Частота телеметрии и потолок памяти под её историю (строки float64)
+TELEMETRY_MIN_RATE_HZ = 0.5
+TELEMETRY_MAX_RATE_HZ = 20.0
+TELEMETRY_MAX_BYTES = 64 * 1024 * 1024
+
+# Датчики, которые считаем температурой процессора
+CPU_TEMP_SENSORS = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal', 'cpu-thermal', 'acpitz')
+
+
+class TelemetrySampler:
+    """Фоновый сбор телеметрии (загрузка и частота по ядрам, память, swap, все датчики температуры)"""
+    
+    def __init__(self, rate_hz=10, history_seconds=3600):
+        self.set_rate(rate_hz)
+        self.cores = psutil.cpu_count(logical=True) or 1
+        
+        # Состав колонок определяется один раз при создании
+        self.temp_sensors = []
+        try:
+            for name, entries in (psutil.sensors_temperatures() or {}).items():
+                for i, entry in enumerate(entries):
+                    self.temp_sensors.append((name, i, f"temp:{name}:{entry.label or i}"))
+        except (AttributeError, OSError):
+            pass
+        
+        self.columns = (['time', 'cpu_total']
+                        + [f"cpu{i}" for i in range(self.cores)]
+                        + [f"freq{i}" for i in range(self.cores)]
+                        + ['mem_percent', 'mem_used', 'swap_percent', 'swap_used']
+                        + ['mem_available', 'swap_in', 'load1']
+                        + [column for _, _, column in self.temp_sensors])
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        # История - history_seconds при начальной частоте, но не больше TELEMETRY_MAX_BYTES;
+        # если частоту потом поднять, окно по времени сократится
+        capacity = min(int(history_seconds * self.rate_hz) + 1, TELEMETRY_MAX_BYTES // (8 * len(self.columns)))
+        self.buffer = RingBuffer(capacity, len(self.columns))
+        self.history_seconds = capacity / self.rate_hz
+        
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def set_rate(self, rate_hz):
+        self.rate_hz = min(TELEMETRY_MAX_RATE_HZ, max(TELEMETRY_MIN_RATE_HZ, rate_hz))
+    
+    def start(self):
+        psutil.cpu_percent(percpu=True)  # точка отсчёта для неблокирующих замеров
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+    
+    def run(self):
+        next_due = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                self.buffer.append(self.sample())
+            except Exception:
+                pass
+            
+            # Расписание по дедлайнам, чтобы время сбора не копило дрейф
+            next_due += 1.0 / self.rate_hz
+            delay = next_due - time.perf_counter()
+            if delay < 0:
+                next_due = time.perf_counter()
+                delay = 0
+            self.stop_event.wait(delay)
+    
+    def sample(self):
+        row = np.full(len(self.columns), np.nan)
+        row[0] = time.time()
+        
+        percpu = psutil.cpu_percent(percpu=True)
+        row[1] = sum(percpu) / len(percpu) if percpu else np.nan
+        row[2:2 + len(percpu)] = percpu[:self.cores]
+        
+        offset = 2 + self.cores
+        try:
+            freqs = psutil.cpu_freq(percpu=True) or []
+            row[offset:offset + min(len(freqs), self.cores)] = [f.current for f in freqs[:self.cores]]
+            # Часть систем отдаёт только общую частоту
+            if len(freqs) == 1 and self.cores > 1:
+                row[offset:offset + self.cores] = freqs[0].current
+        except (AttributeError, OSError, NotImplementedError):
+            pass
+        
+        offset += self.cores
+        ram = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        row[offset:offset + 4] = (ram.percent, ram.used, swap.percent, swap.used)
+        # swap_in - счётчик байт с загрузки системы (нарастающий итог)
+        row[offset + 4] = ram.available
+        row[offset + 5] = swap.sin
+        try:
+            row[offset + 6] = os.getloadavg()[0]
+        except (AttributeError, OSError):
+            pass
+        
+        if self.temp_sensors:
+            try:
+                temps = psutil.sensors_temperatures()
+                for column, (name, i, _) in enumerate(self.temp_sensors, start=offset + 7):
+                    entries = temps.get(name, [])
+                    if i < len(entries):
+                        row[column] = entries[i].current
+            except (AttributeError, OSError):
+                pass
+        
+        return row
+    
+    def snapshot(self):
+        """Последний отсчёт в виде словаря {колонка: значение} или None"""
+        row = self.buffer.latest()
+        if row is None:
+            return None
+        return dict(zip(self.columns, row.tolist()))
+    
+    def series(self, prefix, row):
+        return [row[i] for name, i in self.column_index.items() if name.startswith(prefix)]
+    
+    def cpu_temperature(self, row):
+        """Максимум по датчикам процессора (если их нет - по всем датчикам)"""
+        temps = [row[self.column_index[column]] for name, _, column in self.temp_sensors if name in CPU_TEMP_SENSORS]
+        if not temps:
+            temps = [row[self.column_index[column]] for _, _, column in self.temp_sensors]
+        temps = [t for t in temps if not np.isnan(t)]
+        return max(temps) if temps else None
+
+
+class SafetyGovernor:
+    """Страж безопасности: по потоку телеметрии снижает нагрузку или прерывает тест.
+    
+    Работает в своём потоке и опрашивает кольцевой буфер каждые interval секунд, поэтому
+    реагирует за долю секунды даже при полной загрузке воркеров.
+    """
+    
+    def __init__(self, engine, sampler, max_temp=90.0, critical_temp=100.0, min_available_mb=512,
+                 max_swap_in_mbps=20.0, max_load_per_cpu=4.0, interval=0.2, cooldown=3.0,
+                 cpu_step=20, ram_step=10, io_step=25, min_io_mbps=1.0, log=default_log):
+        self.engine = engine
+        self.sampler = sampler
+        self.max_temp = max_temp
+        self.critical_temp = critical_temp
+        self.min_available = min_available_mb * 1024 * 1024
+        self.max_swap_in = max_swap_in_mbps * 1e6
+        self.max_load = max_load_per_cpu * (os.cpu_count() or 1)
+        self.interval = interval
+        self.cooldown = cooldown  # время, за которое снижение нагрузки должно подействовать
+        self.cpu_step = cpu_step
+        self.ram_step = ram_step
+        self.io_step = io_step  # % от текущей скорости диска
+        self.min_io = min_io_mbps
+        self.log = log
+        
+        self.last_action = {}  # метрика -> время последнего снижения
+        self.interventions = []
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        return self.interventions
+    
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            rows = self.recent(1.0)
+            if len(rows):
+                self.check(rows)
+    
+    def recent(self, seconds):
+        """Отсчёты телеметрии за последние seconds секунд"""
+        rows = self.sampler.buffer.last(int(seconds * self.sampler.rate_hz) + 2)
+        times = rows[:, self.sampler.column_index['time']]
+        return rows[times >= time.time() - seconds]
+    
+    def column(self, rows, name):
+        return rows[:, self.sampler.column_index[name]]
+    
+    def check(self, rows):
+        latest = rows[-1]
+        index = self.sampler.column_index
+        
+        temps = [self.sampler.cpu_temperature(row) for row in rows]
+        temps = [t for t in temps if t is not None]
+        if temps and temps[-1] >= self.critical_temp:
+            return self.abort(f"CPU temperature {temps[-1]:.0f}°C reached critical {self.critical_temp:g}°C",
+                              "temperature", temps)
+        if temps and temps[-1] >= self.max_temp:
+            self.throttle(('cpu', 'ram', 'io'), f"CPU temperature {temps[-1]:.0f}°C above {self.max_temp:g}°C", "temperature", temps)
+        
+        available = latest[index['mem_available']]
+        if available < self.min_available / 2:
+            return self.abort(f"available memory {available / 2**20:.0f} MB below {self.min_available / 2**21:.0f} MB",
+                              "mem_available_mb", self.column(rows, 'mem_available') / 2**20)
+        if available < self.min_available:
+            self.throttle(('ram',), f"available memory {available / 2**20:.0f} MB below {self.min_available / 2**20:.0f} MB",
+                          "mem_available_mb", self.column(rows, 'mem_available') / 2**20)
+        
+        swap_in = self.column(rows, 'swap_in')
+        times = self.column(rows, 'time')
+        if len(rows) >= 2 and times[-1] > times[0] and not np.isnan(swap_in).any():
+            rate = (swap_in[-1] - swap_in[0]) / (times[-1] - times[0])
+            if rate > self.max_swap_in:
+                self.throttle(('ram',), f"swap-in {rate / 1e6:.1f} MB/s above {self.max_swap_in / 1e6:g} MB/s",
+                              "swap_in_mb", swap_in / 1e6)
+        
+        load = latest[index['load1']]
+        if load > self.max_load:
+            # Средняя загрузка сглажена за минуту, поэтому и ждём результата дольше
+            self.throttle(('cpu', 'ram', 'io'), f"load average {load:.1f} above {self.max_load:g}", "load1",
+                          self.column(rows, 'load1'), cooldown=60.0)
+    
+    def throttle(self, resources, reason, metric, samples, cooldown=None):
+        """Снижение потолков нагруженных ресурсов; если снижать уже некуда, а условие держится, - прерывание"""
+        cooldown = self.cooldown if cooldown is None else cooldown
+        now = time.perf_counter()
+        if metric in self.last_action and now - self.last_action[metric] < cooldown:
+            return
+        self.last_action[metric] = now
+        
+        engine = self.engine
+        actions = []
+        for resource in resources:
+            cap = self.lower_cap(resource)
+            if cap is None:
+                continue
+            engine.set_cap(resource, cap)
+            unit = " MB/s" if resource == 'io' else "%"
+            actions.append(f"{resource.upper()} capped at {cap:.0f}{unit}")
+        if not actions:
+            return self.abort(f"{reason}, load cannot be reduced further", metric, samples)
+        
+        self.record("throttle", f"{reason}: {', '.join(actions)}", metric, samples)
+    
+    def lower_cap(self, resource):
+        """Следующий потолок ресурса или None, если он не нагружен или снижать его уже некуда"""
+        engine = self.engine
+        if resource not in engine.loaded:
+            return None
+        current = engine.effective_target(resource)
+        if resource == 'io':
+            if current is None:
+                # Диск без ограничения: отсчитываем от достигнутой скорости
+                stats = engine.disk_stats
+                current = stats['mbps'] if stats else 0.0
+            cap = current * (1 - self.io_step / 100.0)
+            return cap if cap >= self.min_io else None
+        if resource == 'ram' and engine.settings['ram_mode'] == "verify":
+            return None  # проверяемый объём памяти на ходу не отдаётся
+        step = self.cpu_step if resource == 'cpu' else self.ram_step
+        return current - step if current > step else None
+    
+    def abort(self, reason, metric, samples):
+        self.record("abort", reason, metric, samples)
+        self.engine.abort(f"safety: {reason}")
+        self.stop_event.set()
+    
+    def record(self, action, reason, metric, samples):
+        samples = [round(float(value), 2) for value in samples]
+        self.interventions.append({
+            'time': round(time.time() - self.engine.start_time, 3),
+            'action': action,
+            'reason': reason,
+            'metric': metric,
+            'samples': samples,
+        })
+        self.log(f"Safety {action}: {reason} (last {metric}: {', '.join(f'{v:g}' for v in samples[-10:])})",
+                 logging.ERROR if action == "abort" else logging.WARNING)
+
+
+RECORDING_MAGIC = b"PCSREC01"
+RECORDING_BLOCK = struct.Struct("<II")  # строк в блоке, резерв
+# Колонки записи сеанса сверх телеметрии: показатели стресс-движка
+RECORDING_EXTRA_COLUMNS = ('work_rate', 'disk_mbps', 'disk_iops', 'ram_gbps')
+
+
+def decimate(times, values, start, end, buckets):
+    """Минимум и максимум values по buckets равным интервалам времени [start, end).
+    
+    Стоимость - один проход numpy по данным окна, без Python-объектов на отсчёт;
+    пустые интервалы дают NaN.
+    """
+    edges = np.searchsorted(times, np.linspace(start, end, buckets + 1))
+    lows = np.full(buckets, np.nan)
+    highs = np.full(buckets, np.nan)
+    filled = edges[1:] > edges[:-1]
+    if filled.any() and len(values):
+        starts = edges[:-1][filled]
+        valid = np.where(np.isnan(values), np.inf, values)
+        lows[filled] = np.minimum.reduceat(valid, starts)
+        valid = np.where(np.isnan(values), -np.inf, values)
+        highs[filled] = np.maximum.reduceat(valid, starts)
+        lows[np.isinf(lows)] = np.nan
+        highs[np.isinf(highs)] = np.nan
+    return lows, highs
+
+
+class DecimatedSeries:
+    """Скользящее окно min/max по корзинам фиксированной длительности.
+    
+    Отсчёты сворачиваются в корзины при поступлении, поэтому отрисовка стоит
+    O(корзин) независимо от частоты опроса и длины истории.
+    """
+    
+    def __init__(self, buckets, width, span):
+        self.buckets = buckets
+        self.width = width
+        self.reset(span)
+    
+    def reset(self, span):
+        self.span = span
+        self.bucket_seconds = span / self.buckets
+        self.lows = np.full((self.buckets, self.width), np.nan)
+        self.highs = np.full((self.buckets, self.width), np.nan)
+        self.newest = None  # номер последней корзины от начала эпохи
+    
+    def advance(self, now):
+        """Сдвиг окна к моменту now: корзины, в которые оно въезжает, очищаются"""
+        bucket = int(now // self.bucket_seconds)
+        if self.newest is None:
+            self.newest = bucket
+        elif bucket > self.newest:
+            gap = min(bucket - self.newest, self.buckets)
+            slots = np.arange(bucket - gap + 1, bucket + 1) % self.buckets
+            self.lows[slots] = np.nan
+            self.highs[slots] = np.nan
+            self.newest = bucket
+    
+    def add(self, times, rows):
+        """Отсчёты в хронологическом порядке: times (n,), rows (n, width)"""
+        if not len(times):
+            return
+        self.advance(times[-1])
+        ids = (times // self.bucket_seconds).astype(np.int64)
+        keep = ids > self.newest - self.buckets
+        ids, rows = ids[keep], rows[keep]
+        if not len(ids):
+            return
+        starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+        slots = ids[starts] % self.buckets
+        # fmin/fmax пропускают NaN (нет данных датчика)
+        self.lows[slots] = np.fmin(self.lows[slots], np.fmin.reduceat(rows, starts, axis=0))
+        self.highs[slots] = np.fmax(self.highs[slots], np.fmax.reduceat(rows, starts, axis=0))
+    
+    def view(self):
+        """Минимумы и максимумы (buckets, width) от старых корзин к новым"""
+        if self.newest is None:
+            return self.lows, self.highs
+        order = np.arange(self.newest + 1, self.newest + 1 + self.buckets) % self.buckets
+        return self.lows[order], self.highs[order]
+
+
+class SessionRecorder:
+    """Запись сеанса в компактный колоночный файл в фоновом потоке.
+    
+    Формат: сигнатура, длина и JSON-заголовок (колонки, метаданные), затем блоки:
+    заголовок блока, колонка времени float64, остальные колонки float32.
+    """
+    
+    def __init__(self, path, sampler, extra=None, extra_columns=(), block_rows=1024,
+                 flush_interval=1.0, metadata=None):
+        self.path = path
+        self.sampler = sampler
+        self.extra = extra  # функция -> {колонка: значение} для показателей движка
+        self.columns = list(sampler.columns) + list(extra_columns)
+        self.block_rows = block_rows
+        self.flush_interval = flush_interval
+        self.metadata = metadata or {}
+        
+        self.pending = []
+        self.pending_rows = 0
+        self.rows_written = 0
+        self.cursor = 0
+        self.file = None
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        self.file = open(self.path, 'wb', buffering=1024 * 1024)
+        header = json.dumps({'columns': self.columns, 'created': time.time(), 'host': platform.node(),
+                             'block_rows': self.block_rows, 'metadata': self.metadata}).encode()
+        header += b" " * (-(len(RECORDING_MAGIC) + 4 + len(header)) % 8)
+        self.file.write(RECORDING_MAGIC + struct.pack("<I", len(header)) + header)
+        self.cursor = self.sampler.buffer.count
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        return self.rows_written
+    
+    def run(self):
+        try:
+            while not self.stop_event.wait(self.flush_interval):
+                self.collect()
+                while self.pending_rows >= self.block_rows:
+                    self.write_block(self.block_rows)
+                self.file.flush()
+            self.collect()
+            while self.pending_rows:
+                self.write_block(min(self.pending_rows, self.block_rows))
+        finally:
+            self.file.close()
+    
+    def collect(self):
+        rows, self.cursor = self.sampler.buffer.since(self.cursor)
+        if not len(rows):
+            return
+        if self.extra:
+            values = self.extra()
+            extra = np.array([values.get(name, np.nan) for name in self.columns[rows.shape[1]:]], dtype=float)
+            rows = np.hstack((rows, np.broadcast_to(extra, (len(rows), len(extra)))))
+        self.pending.append(rows)
+        self.pending_rows += len(rows)
+    
+    def write_block(self, count):
+        rows = np.concatenate(self.pending)
+        block, rest = rows[:count], rows[count:]
+        self.pending = [rest] if len(rest) else []
+        self.pending_rows = len(rest)
+        
+        self.file.write(RECORDING_BLOCK.pack(count, 0))
+        self.file.write(block[:, 0].astype('<f8').tobytes())
+        self.file.write(np.ascontiguousarray(block[:, 1:].T, dtype='<f4').tobytes())
+        self.file.write(b"\0" * (-(count * 4 * (len(self.columns) - 1)) % 8))
+        self.rows_written += count
+
+
+class SessionRecording:
+    """Чтение записи через mmap: колонки блоков - представления numpy без копирования"""
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(RECORDING_MAGIC)] != RECORDING_MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a stress session recording")
+        
+        header_length = struct.unpack_from("<I", self.map, len(RECORDING_MAGIC))[0]
+        offset = len(RECORDING_MAGIC) + 4
+        self.header = json.loads(self.map[offset:offset + header_length])
+        self.columns = self.header['columns']
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+        
+        # Оглавление блоков: смещение и число строк (недописанный хвост отбрасывается)
+        self.blocks = []
+        offset += header_length
+        width = len(self.columns) - 1
+        while offset + RECORDING_BLOCK.size <= len(self.map):
+            rows = RECORDING_BLOCK.unpack_from(self.map, offset)[0]
+            size = RECORDING_BLOCK.size + rows * 8 + rows * 4 * width
+            size += -size % 8
+            if rows == 0 or offset + size > len(self.map):
+                break
+            self.blocks.append((offset + RECORDING_BLOCK.size, rows))
+            offset += size
+        self.rows = sum(rows for _, rows in self.blocks)
+        self.block_starts = np.array([self.block_column(i, 0)[0] for i in range(len(self.blocks))])
+    
+    def close(self):
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # ещё живы представления колонок; отображение закроется вместе с ними
+    
+    def block_column(self, block, index):
+        offset, rows = self.blocks[block]
+        if index == 0:
+            return np.frombuffer(self.map, dtype='<f8', count=rows, offset=offset)
+        return np.frombuffer(self.map, dtype='<f4', count=rows, offset=offset + rows * 8 + (index - 1) * rows * 4)
+    
+    def time_range(self):
+        if not self.blocks:
+            return None, None
+        return float(self.block_starts[0]), float(self.block_column(len(self.blocks) - 1, 0)[-1])
+    
+    def window(self, name, start=None, end=None):
+        """Время и значения колонки на отрезке; читаются только блоки, которые его покрывают"""
+        index = self.column_index[name]
+        first = max(0, int(np.searchsorted(self.block_starts, start, side='right')) - 1) if start is not None else 0
+        last = int(np.searchsorted(self.block_starts, end, side='right')) if end is not None else len(self.blocks)
+        blocks = range(first, max(first, last))
+        if not len(blocks):
+            return np.empty(0), np.empty(0)
+        times = np.concatenate([self.block_column(i, 0) for i in blocks])
+        values = np.concatenate([self.block_column(i, index) for i in blocks]).astype(float)
+        return times, values
+    
+    def downsample(self, name, buckets, start=None, end=None):
+        """Минимум/максимум колонки по buckets интервалам для отрисовки"""
+        first, last = self.time_range()
+        start = first if start is None else start
+        end = last if end is None else end
+        times, values = self.window(name, start, end)
+        return decimate(times, values, start, end, buckets)
+
+
+class LoadProfile:
+    """Сценарий нагрузки из файла: фазы с целевыми CPU %, RAM %, скоростью I/O (МБ/с) и длительностью.
+    
+    Значение цели в фазе: число (постоянно), [от, до] (линейный рост/спад)
+    или {"low": .., "high": .., "period": сек, "duty": 0..1} (прямоугольные всплески).
+    """
+    
+    RESOURCES = ('cpu', 'ram', 'io')
+    LIMITS = {'cpu': 100, 'ram': 90, 'io': None}
+    
+    def __init__(self, spec, name=None):
+        if not isinstance(spec, dict) or not isinstance(spec.get('phases', []), list):
+            raise ValueError("profile must be an object with a list of phases")
+        self.spec = spec
+        self.name = spec.get('name') or name or "profile"
+        self.phases = []
+        
+        start = 0.0
+        for index, phase in enumerate(spec.get('phases', [])):
+            if not isinstance(phase, dict):
+                raise ValueError(f"phase {index + 1}: expected an object")
+            try:
+                duration = float(phase['duration'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"phase {index + 1}: 'duration' in seconds is required")
+            if duration <= 0:
+                raise ValueError(f"phase {index + 1}: duration must be positive")
+            for resource in self.RESOURCES:
+                if resource in phase:
+                    self.check_value(phase[resource], f"phase {index + 1} '{resource}'")
+            self.phases.append(dict(phase, name=phase.get('name', f"phase {index + 1}"), start=start, duration=duration))
+            start += duration
+        
+        if not self.phases:
+            raise ValueError("profile has no phases")
+        self.duration = start
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), os.path.splitext(os.path.basename(path))[0])
+    
+    @staticmethod
+    def check_value(value, where):
+        if isinstance(value, (int, float)):
+            return
+        if isinstance(value, list) and len(value) == 2 and all(isinstance(v, (int, float)) for v in value):
+            return
+        if (isinstance(value, dict) and {'low', 'high', 'period'} <= set(value)
+                and all(isinstance(v, (int, float)) for v in value.values()) and value['period'] > 0):
+            return
+        raise ValueError(f"{where}: expected number, [from, to] or {{low, high, period, duty}}")
+    
+    def uses(self, resource):
+        return any(resource in phase for phase in self.phases)
+    
+    def phase_at(self, t):
+        """Индекс фазы для момента t от начала сценария"""
+        for index, phase in enumerate(self.phases):
+            if t < phase['start'] + phase['duration']:
+                return index
+        return len(self.phases) - 1
+    
+    def targets_at(self, t):
+        """Цели всех ресурсов в момент t (ресурс, не указанный в фазе, - 0)"""
+        phase = self.phases[self.phase_at(t)]
+        local = t - phase['start']
+        targets = {}
+        for resource in self.RESOURCES:
+            value = phase.get(resource, 0)
+            if isinstance(value, list):
+                value = value[0] + (value[1] - value[0]) * min(1.0, local / phase['duration'])
+            elif isinstance(value, dict):
+                position = (local % value['period']) / value['period']
+                value = value['high'] if position < value.get('duty', 0.5) else value['low']
+            limit = self.LIMITS[resource]
+            targets[resource] = max(0.0, min(limit, value) if limit else value)
+        return targets
+    
+    def next_change(self, t):
+        """Ближайший момент смены целей: граница фазы или фронт всплеска (для ровных фаз - конец фазы)"""
+        phase = self.phases[self.phase_at(t)]
+        end = phase['start'] + phase['duration']
+        local = t - phase['start']
+        edges = [end]
+        for resource in self.RESOURCES:
+            value = phase.get(resource)
+            if isinstance(value, list):
+                return min(end, t + 0.1)  # линейный рост пересчитываем каждые 100 мс
+            if isinstance(value, dict):
+                period = value['period']
+                cycle_start = phase['start'] + (local // period) * period
+                for edge in (cycle_start + period * value.get('duty', 0.5), cycle_start + period):
+                    if edge > t:
+                        edges.append(edge)
+        return min(edges)
+
+
+TEST_TYPES = ("cpu_ram", "cpu_only", "ram_only", "disk_io", "cache_sweep", "benchmark", "contention")
+
+# Настройки теста по умолчанию (общие для окна и командной строки)
+DEFAULT_SETTINGS = {
+    'test_type': "cpu_ram",
+    'cpu_load': 70,
+    'ram_load': 50,
+    'duration': 60,
+    'cpu_workload': "scalar",
+    'cpu_cores': None,
+    'ram_mode': "stream",
+    'memtest_seed': 0,
+    'profile': None,  # LoadProfile; если задан, заменяет cpu_load/ram_load/duration
+    'sweep_max_mb': None,  # None - min(2 ГБ, четверть свободной памяти)
+    'record': None,  # путь файла записи сеанса (SessionRecorder) или None
+    'benchmark': {
+        'iterations': 5,
+        'warmup': 1,
+        'results_file': "benchmark_results.json",
+        'baseline': "last",  # 'last', номер или id сохранённого прогона; None - без сравнения
+        'tolerance': 5.0,  # допустимое ухудшение медианы, %
+    },
+    'contention': {
+        'mechanisms': None,  # None - все из CONTENTION_MECHANISMS
+        'max_workers': None,  # None - удвоенное число логических ядер
+    },
+    'safety': {
+        'enabled': True,
+        'max_temp': 90.0,  # °C: выше - снижение нагрузки CPU
+        'critical_temp': 100.0,  # °C: выше - прерывание теста
+        'min_available_mb': 512,  # меньше - освобождение памяти, меньше половины - прерывание
+        'max_swap_in_mbps': 20.0,
+        'max_load_per_cpu': 4.0,
+    },
+    'disk': {
+        'directory': ".",
+        'file_size': 256 * 1024 * 1024,
+        'block_size': 4096,
+        'queue_depth': 4,
+        'workers': 1,
+        'access': "random",
+        'operation': "mixed",
+        'direct': False,
+    },
+}
+
+
+# Допустимые значения строковых настроек (ключ вложенного раздела - через точку)
+SETTINGS_CHOICES = {
+    'test_type': TEST_TYPES,
+    'cpu_workload': tuple(CPU_WORKLOADS),
+    'ram_mode': ("stream", "verify"),
+    'disk.access': ("random", "sequential"),
+    'disk.operation': ("read", "write", "mixed"),
+}
+# Настройки, которые можно сбросить в None, хотя по умолчанию у них есть значение
+NULLABLE_SETTINGS = ('benchmark.baseline',)
+
+
+def is_count(value, minimum=0):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+
+# Настройки со значением None по умолчанию: описание допустимого значения и проверка
+OPTIONAL_SETTINGS = {
+    'cpu_cores': ("a list of non-negative integers",
+                  lambda value: isinstance(value, list) and all(is_count(core) for core in value)),
+    'profile': ("an object", lambda value: isinstance(value, dict)),
+    'sweep_max_mb': ("a positive integer", lambda value: is_count(value, 1)),
+    'record': ("a string", lambda value: isinstance(value, str) and value != ""),
+    'contention.mechanisms': ("a list of " + ", ".join(CONTENTION_MECHANISMS),
+                              lambda value: isinstance(value, list) and all(
+                                  isinstance(name, str) and name in CONTENTION_MECHANISMS for name in value)),
+    'contention.max_workers': ("a positive integer", lambda value: is_count(value, 1)),
+}
+
+
+def validate_settings(data):
+    """Проверка настроек, пришедших извне (JSON агента), по схеме DEFAULT_SETTINGS.
+    
+    Неизвестные ключи, значения вне SETTINGS_CHOICES и неверные типы - ValueError.
+    Ключи, у которых по умолчанию None, принимают None или значение по OPTIONAL_SETTINGS;
+    остальные - только значение того же типа (None - лишь для NULLABLE_SETTINGS).
+    """
+    def check(name, value, default):
+        choices = SETTINGS_CHOICES.get(name)
+        if choices is not None and value not in choices:
+            raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+        if value is None and (default is None or name in NULLABLE_SETTINGS):
+            return
+        if default is None:
+            expected, valid = OPTIONAL_SETTINGS[name]
+            if not valid(value):
+                raise ValueError(f"{name} must be {expected}")
+            return
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, type(default))
+        if not valid:
+            raise ValueError(f"{name} must be {type(default).__name__}, got {type(value).__name__}")
+    
+    if not isinstance(data, dict):
+        raise ValueError("settings must be an object")
+    unknown = sorted(set(data) - set(DEFAULT_SETTINGS))
+    if unknown:
+        raise ValueError(f"unknown settings: {', '.join(unknown)}")
+    for key, value in data.items():
+        default = DEFAULT_SETTINGS[key]
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"{key} must be an object")
+            unknown = sorted(set(value) - set(default))
+            if unknown:
+                raise ValueError(f"unknown {key} settings: {', '.join(unknown)}")
+            for sub, sub_value in value.items():
+                check(f"{key}.{sub}", sub_value, default[sub])
+        else:
+            check(key, value, default)
+    for key, limit in (('cpu_load', LoadProfile.LIMITS['cpu']), ('ram_load', LoadProfile.LIMITS['ram'])):
+        if not 0 <= data.get(key, DEFAULT_SETTINGS[key]) <= limit:
+            raise ValueError(f"{key} must be within 0..{limit}")
+    if data.get('duration', DEFAULT_SETTINGS['duration']) <= 0:
+        raise ValueError("duration must be positive")
+
+
+def per_second(times, values):
+    """Средние по целым секундам (NaN пропускаются); секунды без данных - NaN"""
+    seconds = times.astype(int)
+    valid = ~np.isnan(values)
+    length = seconds.max() + 1 if len(seconds) else 0
+    total = np.bincount(seconds[valid], weights=values[valid], minlength=length)
+    count = np.bincount(seconds[valid], minlength=length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / count
+
+
+def analyze_throttling(freq, load, rate=None, drop=0.1, hold=3, load_band=10.0):
+    """Поиск троттлинга по посекундным рядам: частота упала, а загрузка осталась прежней.
+    
+    freq - средняя частота ядер (МГц), load - общая загрузка (%), rate - скорость работы воркеров.
+    Троттлингом считается падение частоты больше чем на drop от пиковой длиной от hold секунд.
+    """
+    known = ~np.isnan(freq) & ~np.isnan(load)
+    if known.sum() < 2 * hold:
+        return None
+    
+    peak = float(np.percentile(freq[known], 95))
+    tail = freq[known][-max(hold, known.sum() // 3):]
+    sustained = float(np.median(tail))
+    
+    # Участки под постоянной нагрузкой: загрузка не ниже типичной за тест минус load_band
+    typical_load = float(np.median(load[known]))
+    loaded = known & (load >= typical_load - load_band)
+    throttled = loaded & (freq < peak * (1 - drop))
+    
+    intervals = []
+    start = None
+    for second, flag in enumerate(np.append(throttled, False)):
+        if flag and start is None:
+            start = second
+        elif not flag and start is not None:
+            if second - start >= hold:
+                intervals.append({'start': start, 'end': second,
+                                  'mean_mhz': float(np.nanmean(freq[start:second]))})
+            start = None
+    
+    result = {
+        'peak_mhz': peak,
+        'sustained_mhz': sustained,
+        'sustained_ratio': sustained / peak if peak else None,
+        'typical_load': typical_load,
+        'onset': intervals[0]['start'] if intervals else None,
+        'throttled_seconds': sum(i['end'] - i['start'] for i in intervals),
+        'intervals': intervals,
+        'lost_work': None,
+        'lost_pct': None,
+    }
+    
+    # Потерянная работа: недобор скорости в секунды троттлинга против скорости без него
+    if rate is not None and intervals:
+        in_interval = np.zeros(len(freq), dtype=bool)
+        for interval in intervals:
+            in_interval[interval['start']:interval['end']] = True
+        reference = rate[loaded & ~in_interval & ~np.isnan(rate)]
+        measured = rate[in_interval & ~np.isnan(rate)]
+        if len(reference) and len(measured):
+            base = float(np.median(reference))
+            lost = float(np.clip(base - measured, 0, None).sum())
+            expected = base * int((loaded & ~np.isnan(rate)).sum())
+            result['lost_work'] = lost
+            result['lost_pct'] = lost / expected * 100 if expected else None
+    return result
+
+
+def json_rows(array):
+    """Строки массива numpy для JSON (NaN -> null)"""
+    return [[None if value != value else value for value in row] for row in array.tolist()]
+
+
+class StressEngine:
+    """Логика стресс-теста без интерфейса: её запускают и окно PCStressTester, и командная строка"""
+    
+    def __init__(self, settings, log=default_log, sampler=None):
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+        self.settings['disk'] = dict(DEFAULT_SETTINGS['disk'], **settings.get('disk', {}))
+        self.settings['benchmark'] = dict(DEFAULT_SETTINGS['benchmark'], **settings.get('benchmark', {}))
+        self.settings['safety'] = dict(DEFAULT_SETTINGS['safety'], **settings.get('safety', {}))
+        self.settings['contention'] = dict(DEFAULT_SETTINGS['contention'], **settings.get('contention', {}))
+        self.log = log
+        self.sampler = sampler
+        
+        self.is_running = False
+        self.status = "idle"  # running, completed, stopped, failed
+        self.start_time = None
+        self.end_time = None
+        self.thread = None
+        
+        # Текущие цели нагрузки (меняются по фазам сценария)
+        profile = self.settings['profile']
+        if profile:
+            self.targets = profile.targets_at(0.0)
+        else:
+            self.targets = {'cpu': self.settings['cpu_load'], 'ram': self.settings['ram_load'], 'io': None}
+        # Потолки от стража безопасности (поверх целей теста и сценария)
+        self.caps = {'cpu': 100.0, 'ram': 100.0, 'io': None}  # io - МБ/с, None - без потолка
+        self.loaded = []  # ресурсы, которые нагружает тест
+        self.governor = None
+        self.phase_index = None
+        self.phase_started = None
+        self.phase_results = []
+        self.clock_start = None
+        
+        # Текущее состояние подсистем (читается интерфейсом)
+        self.cpu_pool = None
+        self.cpu_controller = None
+        self.ram_bandwidth = {}  # GB/s по последнему проходу каждого вида
+        self.memtest_status = None
+        self.disk_stress = None
+        self.disk_stats = None
+        self.cache_points = []
+        
+        # Итоги для отчёта
+        self.results = {}
+        self.metrics = []  # посекундные замеры пропускной способности
+        self.errors = []
+    
+    @property
+    def duration(self):
+        profile = self.settings['profile']
+        if profile:
+            return profile.duration
+        if self.settings['test_type'] == "benchmark":
+            # Набор идёт до конца; оценка нужна только для индикатора прогресса
+            options = self.settings['benchmark']
+            return BenchmarkSuite(options['iterations'], options['warmup']).estimated_duration()
+        return self.settings['duration']
+    
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time or time.time()) - self.start_time
+    
+    def start(self):
+        self.is_running = True
+        self.status = "running"
+        self.start_time = time.time()
+        self.clock_start = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Досрочная остановка (отчёт получит статус stopped)"""
+        if self.is_running:
+            self.status = "stopped"
+            self.is_running = False
+    
+    def abort(self, reason):
+        """Аварийная остановка (страж безопасности): тест считается проваленным"""
+        if self.is_running:
+            self.errors.append(reason)
+            self.status = "failed"
+            self.is_running = False
+    
+    def effective_target(self, resource):
+        target, cap = self.targets[resource], self.caps[resource]
+        if target is None or cap is None:  # скорость диска без ограничения
+            return cap if target is None else target
+        return min(target, cap)
+    
+    def set_cap(self, resource, value):
+        self.caps[resource] = value
+        controller = self.cpu_controller
+        if resource == 'cpu' and controller:
+            controller.set_target(self.effective_target('cpu') / 100.0)
+        disk = self.disk_stress
+        if resource == 'io' and disk:
+            disk.rate_limit = self.effective_target('io')
+    
+    def wait(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+        return self.is_finished()
+    
+    def is_finished(self):
+        return self.thread is not None and not self.thread.is_alive()
+    
+    def run(self):
+        test_type = self.settings['test_type']
+        profile = self.settings['profile']
+        targets = []
+        if (profile.uses('cpu') if profile else test_type in ["cpu_ram", "cpu_only"]):
+            targets.append(self.cpu_stress)
+            self.loaded.append('cpu')
+        if (profile.uses('ram') if profile else test_type in ["cpu_ram", "ram_only"]):
+            targets.append(self.ram_stress)
+            self.loaded.append('ram')
+        if (profile.uses('io') if profile else test_type == "disk_io"):
+            targets.append(self.disk_io_stress)
+            self.loaded.append('io')
+        if not profile and test_type == "cache_sweep":
+            targets.append(self.cache_sweep)
+        if not profile and test_type == "benchmark":
+            targets.append(self.benchmark)
+        if not profile and test_type == "contention":
+            targets.append(self.contention)
+        # Развёртка кэша, бенчмарки и тест планировщика - разовые измерения: тест заканчивается вместе с ними;
+        # последние два делят время сами и не обрываются по длительности
+        single_shot = not profile and test_type in ("cache_sweep", "benchmark", "contention")
+        until_done = single_shot and test_type != "cache_sweep"
+        
+        recorder = None
+        if self.sampler and self.settings['record']:
+            recorder = SessionRecorder(self.settings['record'], self.sampler, extra=self.recording_values,
+                                       extra_columns=RECORDING_EXTRA_COLUMNS,
+                                       metadata={'settings': settings_to_json(self.settings)})
+            recorder.start()
+            self.log(f"Recording session to {recorder.path}")
+        
+        safety = self.settings['safety']
+        if self.sampler and safety['enabled']:
+            options = {key: value for key, value in safety.items() if key != 'enabled'}
+            self.governor = SafetyGovernor(self, self.sampler, log=self.log, **options)
+            self.governor.start()
+        
+        threads = [threading.Thread(target=self.guarded, args=(target,), daemon=True) for target in targets]
+        for thread in threads:
+            thread.start()
+        
+        # Ожидание завершения теста (с возможностью досрочной остановки);
+        # время фаз считается по монотонным часам, сон - до ближайшей смены целей
+        next_metrics = 1.0
+        while self.is_running:
+            elapsed = time.perf_counter() - self.clock_start
+            if elapsed >= self.duration and not until_done:
+                break
+            if single_shot and not any(thread.is_alive() for thread in threads):
+                break
+            
+            wake = min(elapsed + 0.1, next_metrics)
+            if profile:
+                self.update_phase(elapsed)
+                wake = min(wake, profile.next_change(elapsed))
+            
+            time.sleep(max(0.0, wake - (time.perf_counter() - self.clock_start)))
+            if time.perf_counter() - self.clock_start >= next_metrics:
+                self.record_metrics()
+                next_metrics += 1.0
+        
+        if self.status == "running":
+            self.status = "completed"
+        self.is_running = False
+        
+        if profile and self.phase_index is not None:
+            self.finish_phase(time.perf_counter() - self.clock_start)
+        
+        # Ждем завершения потоков и процессов-воркеров
+        for thread in threads:
+            thread.join(timeout=10)
+        
+        if self.governor:
+            self.results['safety'] = {'caps': dict(self.caps), 'interventions': self.governor.stop()}
+        
+        if 'cpu' in self.results and self.sampler:
+            self.thermal_analysis()
+        
+        if recorder:
+            rows = recorder.stop()
+            self.results['recording'] = {'path': recorder.path, 'rows': rows}
+            self.log(f"Recorded {rows} samples to {recorder.path} ({os.path.getsize(recorder.path) // 1024} KB)")
+        
+        if self.errors and self.status == "completed":
+            self.status = "failed"
+        self.end_time = time.time()
+    
+    def update_phase(self, elapsed):
+        """Смена фазы сценария и применение текущих целей"""
+        profile = self.settings['profile']
+        index = profile.phase_at(elapsed)
+        new_phase = index != self.phase_index
+        if new_phase:
+            if self.phase_index is not None:
+                self.finish_phase(elapsed)
+            self.phase_index = index
+            self.phase_started = elapsed
+            phase = profile.phases[index]
+            self.log(f"Phase {index + 1}/{len(profile.phases)} '{phase['name']}' started ({phase['duration']:g}s)")
+        
+        self.targets = profile.targets_at(elapsed)
+        controller = self.cpu_controller
+        if controller:
+            controller.set_target(self.effective_target('cpu') / 100.0, restart_settling=new_phase)
+        disk = self.disk_stress
+        if disk:
+            disk.rate_limit = self.effective_target('io')
+    
+    def finish_phase(self, elapsed):
+        """Итоги фазы: цели из сценария и достигнутые значения за её интервал"""
+        phase = self.settings['profile'].phases[self.phase_index]
+        start, end = self.phase_started, elapsed
+        window = [m for m in self.metrics if start <= m['time'] < end]
+        
+        def mean(key):
+            values = [m[key] for m in window if key in m]
+            return sum(values) / len(values) if values else None
+        
+        achieved = {'cpu_rate': mean('cpu_rate'), 'disk_mbps': mean('disk_mbps'), 'disk_iops': mean('disk_iops')}
+        if self.sampler:
+            rows = self.sampler.buffer.last()
+            times = rows[:, self.sampler.column_index['time']] - self.start_time
+            rows = rows[(times >= start) & (times < end)]
+            for key, column in (('cpu_percent', 'cpu_total'), ('ram_percent', 'mem_percent')):
+                values = rows[:, self.sampler.column_index[column]]
+                values = values[~np.isnan(values)]
+                achieved[key] = float(values.mean()) if len(values) else None
+        
+        result = {
+            'phase': phase['name'],
+            'index': self.phase_index,
+            'start': round(start, 3),
+            'end': round(end, 3),
+            'targets': {r: phase[r] for r in LoadProfile.RESOURCES if r in phase},
+            'achieved': achieved,
+        }
+        if self.cpu_controller:
+            result['controller'] = self.cpu_controller.summary()
+        self.phase_results.append(result)
+        
+        summary = ", ".join(f"{key} {value:.1f}" for key, value in achieved.items() if value is not None)
+        self.log(f"Phase '{phase['name']}' done: {summary}")
+    
+    def guarded(self, target):
+        try:
+            target()
+        except Exception as e:
+            self.errors.append(f"{target.__name__}: {e}")
+            self.log(f"Error in {target.__name__}: {e}", logging.ERROR)
+    
+    def recording_values(self):
+        """Показатели движка для записи сеанса рядом с телеметрией"""
+        values = {}
+        pool = self.cpu_pool
+        if pool:
+            values['work_rate'] = sum(pool.get_rates())
+        stats = self.disk_stats
+        if self.disk_stress and stats:
+            values['disk_mbps'] = stats['mbps']
+            values['disk_iops'] = stats['iops']
+        if self.ram_bandwidth:
+            values['ram_gbps'] = max(self.ram_bandwidth.values())
+        return values
+    
+    def record_metrics(self):
+        """Посекундный замер достигнутой пропускной способности"""
+        sample = {'time': round(time.time() - self.start_time, 3)}
+        
+        pool = self.cpu_pool
+        if pool:
+            rates = pool.get_rates()
+            sample['cpu_rate'] = sum(rates)
+            sample['cpu_rates'] = rates
+        
+        if self.ram_bandwidth:
+            sample['ram_gbps'] = dict(self.ram_bandwidth)
+        
+        disk = self.disk_stress
+        if disk:
+            stats = disk.snapshot()
+            self.disk_stats = stats
+            sample.update({'disk_mbps': stats['mbps'], 'disk_iops': stats['iops'], 'disk_p99_us': stats['p99_us']})
+        
+        self.metrics.append(sample)
+    
+    def cpu_stress(self):
+        """Создание нагрузки на CPU пулом процессов"""
+        cpu_load = self.effective_target('cpu')
+        cores = self.settings['cpu_cores']
+        pool = CPUStressPool(cpu_load / 100.0, cores, self.settings['cpu_workload'])
+        pool.start()
+        self.cpu_pool = pool
+        
+        if cores:
+            self.log(f"CPU stress test started: {len(pool.workers)} {pool.workload} workers on cores {cores}")
+        else:
+            self.log(f"CPU stress test started: {len(pool.workers)} {pool.workload} workers")
+        
+        # Замкнутый контур: скважность подстраивается под измеренную загрузку
+        controller = LoadController(pool, cpu_load / 100.0, log=self.log)
+        controller.start()
+        self.cpu_controller = controller
+        
+        try:
+            while self.is_running:
+                time.sleep(0.1)
+        finally:
+            self.cpu_controller = None
+            summary = controller.stop()
+            rates = pool.get_rates()
+            workers = len(pool.workers)
+            pool.stop()
+            self.cpu_pool = None
+            self.log(f"CPU workers stopped, last total rate: {format_rate(sum(rates))} {pool.unit}/s")
+            
+            samples = [m['cpu_rate'] for m in self.metrics if 'cpu_rate' in m]
+            self.results['cpu'] = {
+                'workers': workers,
+                'workload': pool.workload,
+                'unit': f"{pool.unit}/s",
+                'mean_rate': sum(samples) / len(samples) if samples else None,
+                'last_rates': rates,
+                'controller': summary,
+            }
+    
+    def ram_target_bytes(self):
+        return int(psutil.virtual_memory().total * (self.effective_target('ram') / 100.0))
+    
+    def ram_stress(self):
+        """Создание нагрузки на RAM: mmap-сегменты под текущую цель и потоковые проходы по ним"""
+        self.log("RAM stress test started")
+        
+        if self.settings['ram_mode'] == "verify":
+            # Проверка шаблонами идёт на объёме, заданном в начале теста
+            self.ram_verify(self.ram_target_bytes())
+            return
+        
+        # Память набирается сегментами, чтобы фазы сценария могли её добавлять и отдавать
+        segments = []
+        # Снижение потолка стражем прерывает текущий проход, чтобы память освободилась сразу
+        cap = self.caps['ram']
+        should_stop = lambda: not self.is_running or self.caps['ram'] != cap
+        passes = 0
+        peak = 0
+        
+        try:
+            while self.is_running:
+                cap = self.caps['ram']
+                target = self.ram_target_bytes()
+                allocated = sum(region.size for region in segments)
+                
+                if allocated + RAM_SEGMENT_BYTES // 2 < target:
+                    started = time.perf_counter()
+                    grown = 0
+                    next_report = allocated + target // 10
+                    while self.is_running and allocated < target:
+                        region = MemoryRegion(min(RAM_SEGMENT_BYTES, target - allocated))
+                        segments.append(region)
+                        if not region.commit(should_stop):
+                            break
+                        allocated += region.size
+                        grown += region.size
+                        if allocated >= next_report and allocated < target:
+                            self.log(f"Allocated {allocated // (1024 * 1024)} MB of RAM")
+                            while next_report <= allocated:
+                                next_report += target // 10
+                    elapsed = time.perf_counter() - started
+                    if elapsed > 0:
+                        self.ram_bandwidth['commit'] = grown / elapsed / 1e9
+                        self.log(f"Committed {allocated // (1024 * 1024)} MB of RAM at {self.ram_bandwidth['commit']:.2f} GB/s")
+                elif allocated - RAM_SEGMENT_BYTES // 2 > target and segments:
+                    while segments and allocated - RAM_SEGMENT_BYTES // 2 > target:
+                        region = segments.pop()
+                        allocated -= region.size
+                        region.close()
+                    self.log(f"Released RAM down to {allocated // (1024 * 1024)} MB")
+                peak = max(peak, allocated)
+                
+                if not segments:
+                    time.sleep(0.1)
+                    continue
+                
+                # Удерживаем память, непрерывно гоняя по ней данные
+                for name, body in (('read', lambda r: r.read_pass(should_stop)),
+                                   ('write', lambda r: r.write_pass(passes, should_stop)),
+                                   ('copy', lambda r: r.copy_pass(should_stop))):
+                    started = time.perf_counter()
+                    if not all(body(region) for region in segments):
+                        break
+                    # Копирование половины сегмента в другую тоже прокачивает весь объём
+                    self.ram_bandwidth[name] = allocated / (time.perf_counter() - started) / 1e9
+                passes += 1
+                
+        finally:
+            # Освобождаем память
+            if self.ram_bandwidth:
+                summary = ", ".join(f"{name} {value:.2f}" for name, value in self.ram_bandwidth.items())
+                self.log(f"RAM bandwidth (GB/s): {summary}")
+            self.log(f"Releasing {sum(r.size for r in segments) // (1024 * 1024)} MB of RAM")
+            self.results['ram'] = {'peak_size': peak, 'passes': passes, 'bandwidth_gbps': dict(self.ram_bandwidth)}
+            for region in segments:
+                region.close()
+    
+    def ram_verify(self, target_bytes):
+        """Проверка памяти шаблонами (walking ones, checkerboard, address, random) в процессах-воркерах"""
+        seed = self.settings['memtest_seed']
+        pool = MemTestPool(target_bytes, seed=seed)
+        pool.start()
+        self.log(f"RAM verify started: {pool.size // (1024 * 1024)} MB across {len(pool.workers)} workers, seed {seed}")
+        
+        total_mismatches = 0
+        verified_bytes = 0
+        verify_time = 0.0
+        bad_samples = []
+        
+        def consume(records):
+            nonlocal total_mismatches, verified_bytes, verify_time
+            for record in records:
+                verified_bytes += record['bytes']
+                verify_time += record['verify_time']
+                total_mismatches += record['mismatches']
+                if record['mismatches']:
+                    self.log(f"MISMATCH worker {record['worker']} pattern {record['pattern']} "
+                             f"cycle {record['cycle']}: {record['mismatches']} words", logging.ERROR)
+                    for offset, expected, actual in record['samples']:
+                        self.log(f"  offset 0x{offset:012x}: expected 0x{expected:016x}, read 0x{actual:016x}", logging.ERROR)
+                        bad_samples.append({'pattern': record['pattern'], 'offset': offset,
+                                            'expected': expected, 'actual': actual})
+            
+            # Пропускная способность проверки: все воркеры работают параллельно
+            throughput = verified_bytes / verify_time * len(pool.slices) / 1e9 if verify_time else 0.0
+            last = records[-1] if records else None
+            self.memtest_status = (f"Verify: {verified_bytes / 1e9:.1f} GB checked at {throughput:.2f} GB/s, "
+                                   f"mismatches {total_mismatches}"
+                                   + (f", last {last['pattern']} cycle {last['cycle']}" if last else ""))
+            return throughput
+        
+        try:
+            while self.is_running:
+                time.sleep(0.2)
+                records = pool.drain()
+                if records:
+                    consume(records)
+        finally:
+            throughput = consume(pool.stop())
+            self.log(self.memtest_status)
+            self.memtest_status = None
+            self.results['memtest'] = {
+                'size': pool.size,
+                'workers': len(pool.slices),
+                'seed': seed,
+                'verified_bytes': verified_bytes,
+                'verify_gbps': throughput,
+                'mismatches': total_mismatches,
+                'samples': bad_samples[:256],
+            }
+            if total_mismatches:
+                self.errors.append(f"memtest: {total_mismatches} mismatched words")
+    
+    def disk_io_stress(self):
+        """Создание нагрузки на диск"""
+        disk = DiskStress(log=self.log, **self.settings['disk'])
+        self.log(f"Disk I/O test: preparing {disk.workers} x {disk.file_size // (1024 * 1024)} MB in {disk.directory}")
+        
+        try:
+            if not disk.prepare(lambda: not self.is_running):
+                return
+            disk.rate_limit = self.effective_target('io')
+            disk.start()
+            self.disk_stress = disk
+            self.log(f"Disk I/O test started: {disk.access} {disk.operation}, block {disk.block_size} B, "
+                     f"QD {disk.queue_depth} x {disk.workers} workers")
+            
+            while self.is_running:
+                time.sleep(0.1)
+        finally:
+            self.disk_stress = None
+            disk.stop()
+            if disk.histograms:
+                stats = disk.snapshot()
+                self.log(f"Disk I/O done: {stats['total_ops']} ops, latency p50 {stats['p50_us']:.0f} us, "
+                         f"p99 {stats['p99_us']:.0f} us, p99.9 {stats['p999_us']:.0f} us")
+                samples = [m['disk_mbps'] for m in self.metrics if 'disk_mbps' in m]
+                iops = [m['disk_iops'] for m in self.metrics if 'disk_iops' in m]
+                self.results['disk'] = {
+                    'total_ops': stats['total_ops'],
+                    'mean_mbps': sum(samples) / len(samples) if samples else None,
+                    'mean_iops': sum(iops) / len(iops) if iops else None,
+                    'p50_us': stats['p50_us'],
+                    'p99_us': stats['p99_us'],
+                    'p999_us': stats['p999_us'],
+                }
+    
+    def cache_sweep(self):
+        """Развёртка рабочего набора от 4 КБ до нескольких ГБ с поиском границ уровней кэша"""
+        max_mb = self.settings['sweep_max_mb']
+        if max_mb:
+            max_bytes = max_mb * 1024 * 1024
+        else:
+            max_bytes = min(2 * 1024 ** 3, psutil.virtual_memory().available // 4)
+        
+        sweep = CacheSweep(max_bytes)
+        self.log(f"Cache sweep started: {len(sweep.sizes)} sizes from 4 KB to {max_bytes // (1024 * 1024)} MB")
+        
+        def on_point(point):
+            self.cache_points.append(point)
+            self.log(f"  {point['size'] // 1024:>9} KB: {point['ns_per_access']:6.2f} ns/load over L1, {point['gbps']:7.2f} GB/s")
+        
+        points = sweep.run(lambda: not self.is_running, on_point)
+        boundaries = detect_cache_boundaries(points)
+        reported = reported_cache_sizes()
+        for boundary in boundaries:
+            self.log(f"Detected {boundary['level']} boundary at ~{boundary['size'] // 1024} KB")
+        if reported:
+            self.log("Reported by OS: " + ", ".join(f"{level} {size // 1024} KB" for level, size in reported.items()))
+        self.results['cache'] = {'points': points, 'boundaries': boundaries, 'reported': reported}
+    
+    def contention(self):
+        """Пинг-понг и борьба за блокировки: переключения контекста, задержка передачи, масштабирование"""
+        options = self.settings['contention']
+        test = ContentionTest(options['mechanisms'], options['max_workers'], log=self.log,
+                              should_stop=lambda: not self.is_running)
+        test.level_seconds = max(1.0, self.settings['duration'] / test.level_count())
+        self.log(f"Contention test: {', '.join(test.mechanisms)} at {test.levels()} workers, "
+                 f"{test.level_seconds:.1f}s per level")
+        
+        def on_result(result):
+            self.log(f"  {result['mechanism']:>9} x{result['workers']:<4} {format_rate(result['handoffs_per_s'])} handoffs/s, "
+                     f"{format_rate(result['ctx_switches_per_s'])} ctx/s, p50 {result['p50_us']:.1f} us, "
+                     f"p99 {result['p99_us']:.1f} us, max {result['max_us']:.0f} us")
+        
+        levels = test.run(on_result)
+        
+        # Масштабирование: пропускная способность на наибольшем уровне относительно наименьшего
+        scaling = {}
+        for mechanism in test.mechanisms:
+            rows = [row for row in levels if row['mechanism'] == mechanism]
+            if len(rows) >= 2 and rows[0]['handoffs_per_s']:
+                scaling[mechanism] = rows[-1]['handoffs_per_s'] / rows[0]['handoffs_per_s']
+                self.log(f"{mechanism}: x{rows[-1]['workers']} workers give {scaling[mechanism]:.2f}x "
+                         f"the throughput of x{rows[0]['workers']}")
+        self.results['contention'] = {'levels': levels, 'scaling': scaling}
+    
+    def benchmark(self):
+        """Набор бенчмарков с сохранением результата и сравнением с базовым прогоном"""
+        options = self.settings['benchmark']
+        suite = BenchmarkSuite(options['iterations'], options['warmup'],
+                               workload=self.settings['cpu_workload'],
+                               disk_dir=self.settings['disk']['directory'],
+                               log=self.log, should_stop=lambda: not self.is_running)
+        metrics = suite.run()
+        if not self.is_running:
+            self.log("Benchmark interrupted, results not saved")
+            return
+        
+        path = options['results_file']
+        runs = load_benchmark_results(path)
+        baseline = find_baseline(runs, options['baseline'])
+        entry = {
+            'id': datetime.now().strftime("%Y%m%d-%H%M%S"),
+            'host': platform.node(),
+            'cpu_count': os.cpu_count(),
+            'workload': self.settings['cpu_workload'],
+            'iterations': suite.iterations,
+            'metrics': metrics,
+        }
+        save_benchmark_result(path, entry)
+        self.log(f"Benchmark run {entry['id']} saved to {path}")
+        
+        result = {'run': entry, 'baseline': None, 'comparison': []}
+        if baseline:
+            if baseline.get('workload') != entry['workload'] or baseline.get('cpu_count') != entry['cpu_count']:
+                self.log(f"Baseline {baseline['id']} was recorded with a different CPU setup", logging.WARNING)
+            rows = compare_benchmarks(metrics, baseline, options['tolerance'])
+            self.log(f"Compared with baseline {baseline['id']} (tolerance {options['tolerance']:g}%):")
+            for row in rows:
+                mark = "REGRESSION" if row['regression'] else "ok"
+                self.log(f"  {row['name']}: {row['baseline']:.4g} -> {row['current']:.4g} {row['unit']} "
+                         f"({row['change_pct']:+.1f}%) {mark}",
+                         logging.ERROR if row['regression'] else logging.INFO)
+            regressions = [row['name'] for row in rows if row['regression']]
+            if regressions:
+                self.errors.append("benchmark regressions: " + ", ".join(regressions))
+            result.update(baseline=baseline['id'], comparison=rows)
+        elif options['baseline']:
+            self.log(f"No baseline '{options['baseline']}' in {path}, nothing to compare")
+        self.results['benchmark'] = result
+    
+    def thermal_analysis(self):
+        """Троттлинг за тест: частота и температура по ядрам рядом с достигнутой скоростью"""
+        sampler = self.sampler
+        index = sampler.column_index
+        rows = sampler.buffer.last()
+        times = rows[:, index['time']] - self.start_time
+        during = (times >= 0) & (times <= self.elapsed())
+        rows, times = rows[during], times[during]
+        if not len(rows):
+            return
+        
+        # Средняя частота по ядрам, для которых есть данные
+        freq_columns = [index[f"freq{i}"] for i in range(sampler.cores)]
+        freqs = rows[:, freq_columns]
+        reported = (~np.isnan(freqs)).sum(axis=1)
+        core_mean = np.where(reported > 0, np.nansum(freqs, axis=1) / np.maximum(reported, 1), np.nan)
+        freq = per_second(times, core_mean)
+        load = per_second(times, rows[:, index['cpu_total']])
+        rate = np.full(len(freq), np.nan)
+        for sample in self.metrics:
+            second = int(sample['time']) - 1  # скорость воркеров - за предыдущую секунду
+            if 'cpu_rate' in sample and 0 <= second < len(rate):
+                rate[second] = sample['cpu_rate']
+        
+        analysis = analyze_throttling(freq, load, rate)
+        if analysis is None:
+            self.log("Throttling analysis: not enough frequency samples")
+            return
+        
+        # По ядрам: пиковая и установившаяся частота, по датчикам: максимум и конец теста
+        cores = []
+        for core, column in enumerate(freq_columns):
+            values = rows[:, column][~np.isnan(rows[:, column])]
+            if len(values):
+                tail = values[-max(1, len(values) // 3):]
+                cores.append({'core': core, 'peak_mhz': float(values.max()), 'sustained_mhz': float(np.median(tail))})
+        sensors = {}
+        for _, _, column in sampler.temp_sensors:
+            values = rows[:, index[column]][~np.isnan(rows[:, index[column]])]
+            if len(values):
+                sensors[column[len("temp:"):]] = {'max': float(values.max()), 'last': float(values[-1])}
+        analysis.update(cores=cores, temperatures=sensors)
+        self.results['thermal'] = analysis
+        
+        self.log(f"CPU clock: peak {analysis['peak_mhz']:.0f} MHz, sustained {analysis['sustained_mhz']:.0f} MHz "
+                 f"(ratio {analysis['sustained_ratio']:.2f})")
+        if analysis['onset'] is None:
+            self.log("No thermal throttling detected")
+        else:
+            lost = (f", lost {analysis['lost_pct']:.1f}% of throughput" if analysis['lost_pct'] is not None else "")
+            self.log(f"Throttling from {analysis['onset']}s, {analysis['throttled_seconds']}s in "
+                     f"{len(analysis['intervals'])} intervals{lost}", logging.WARNING)
+        if sensors:
+            hottest = max(sensors.items(), key=lambda item: item[1]['max'])
+            self.log(f"Hottest sensor: {hottest[0]} {hottest[1]['max']:.0f}°C")
+    
+    def report(self):
+        """Машиночитаемый отчёт: параметры, итоги, посекундные метрики и ряды телеметрии"""
+        profile = self.settings['profile']
+        report = {
+            'status': self.status,
+            'started': datetime.fromtimestamp(self.start_time).isoformat() if self.start_time else None,
+            'elapsed': self.elapsed(),
+            'settings': settings_to_json(self.settings),
+            'errors': self.errors,
+            'results': self.results,
+            'metrics': self.metrics,
+        }
+        if profile:
+            report['profile'] = {'name': profile.name, 'phases': self.phase_results}
+        
+        if self.sampler and self.start_time:
+            buffer = self.sampler.buffer
+            rows = buffer.last()
+            times = rows[:, self.sampler.column_index['time']]
+            # Кольцо переполнено, и начало теста уже вытеснено - в отчёте только хвост прогона
+            truncated = bool(buffer.count > buffer.capacity and len(times) and times[0] > self.start_time)
+            rows = rows[(times >= self.start_time) & (times <= (self.end_time or time.time()))]
+            cpu = rows[:, self.sampler.column_index['cpu_total']]
+            cpu = cpu[~np.isnan(cpu)]
+            report['achieved'] = {
+                'cpu_mean': float(cpu.mean()) if len(cpu) else None,
+                'cpu_max': float(cpu.max()) if len(cpu) else None,
+                'mem_max': float(np.nanmax(rows[:, self.sampler.column_index['mem_percent']])) if len(rows) else None,
+            }
+            report['telemetry'] = {'columns': self.sampler.columns, 'rows': json_rows(rows),
+                                   'truncated': truncated}
+            if self.settings['record']:
+                report['telemetry']['recording'] = self.settings['record']
+        
+        return report
+
+
+def settings_to_json(settings):
+    """Настройки для передачи по сети: сценарий - в виде исходного описания"""
+    profile = settings.get('profile')
+    return dict(settings, profile=profile.spec if profile else None)
+
+
+def settings_from_json(data):
+    profile = data.get('profile')
+    return dict(data, profile=LoadProfile(profile) if profile else None)
+
+
+def confine_path(directory, path, name):
+    """Путь внутри directory; абсолютные пути и выход из каталога (.., ссылки) - ValueError"""
+    root = os.path.realpath(directory)
+    full = os.path.realpath(os.path.join(root, path))
+    escapes = os.path.isabs(path) or '..' in path.replace('\\', '/').split('/')
+    if escapes or full == root or os.path.commonpath([root, full]) != root:
+        raise ValueError(f"{name} must be a relative path inside the agent output directory")
+    return full
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """HTTP API агента: JSON в запросах и ответах"""
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        agent = self.server.agent
+        if url.path == "/status":
+            self.reply(200, agent.status())
+        elif url.path == "/telemetry":
+            try:
+                since = float(query.get('since', ['0'])[0])
+            except ValueError:
+                return self.reply(400, {'error': "since must be a number (UNIX time)"})
+            self.reply(200, agent.telemetry(since))
+        elif url.path == "/report":
+            report = agent.report()
+            self.reply(200 if report else 404, report or {'error': "no test has run yet"})
+        else:
+            self.reply(404, {'error': f"unknown path {url.path}"})
+    
+    def do_POST(self):
+        agent = self.server.agent
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            return self.reply(400, {'error': f"bad JSON: {e}"})
+        
+        if not isinstance(payload, dict):
+            return self.reply(400, {'error': "request body must be a JSON object"})
+        if self.path == "/start":
+            try:
+                code, body = agent.start(payload.get('settings', {}), payload.get('start_at'))
+            except (KeyError, TypeError, ValueError) as e:
+                code, body = 400, {'error': f"invalid settings: {e}"}
+            self.reply(code, body)
+        elif self.path == "/stop":
+            self.reply(200, agent.stop())
+        else:
+            self.reply(404, {'error': f"unknown path {self.path}"})
+    
+    def reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        default_log(f"{self.client_address[0]} {format % args}", logging.DEBUG)
+
+
+class StressAgent:
+    """Агент на узле стенда: запускает StressEngine по командам координатора"""
+    
+    def __init__(self, host="127.0.0.1", port=8765, sample_rate=10, output_dir=".", log=default_log):
+        self.log = log
+        self.output_dir = output_dir  # файлы, которые просит записать координатор, - только здесь
+        self.sampler = TelemetrySampler(rate_hz=sample_rate)
+        self.engine = None
+        self.scheduled = None  # таймер отложенного старта
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), AgentRequestHandler)
+        self.server.agent = self
+        self.address = "%s:%d" % self.server.server_address[:2]
+    
+    def serve_forever(self):
+        self.sampler.start()
+        self.log(f"Agent listening on {self.address}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+            self.sampler.stop()
+            self.server.server_close()
+    
+    def shutdown(self):
+        self.server.shutdown()
+    
+    def start(self, data, start_at=None):
+        """Старт теста сейчас или в момент start_at (time.time() агента) для синхронного запуска узлов"""
+        with self.lock:
+            if self.scheduled or (self.engine and self.engine.is_running):
+                return 409, {'error': "a test is already running"}
+            validate_settings(data)
+            engine = StressEngine(settings_from_json(self.confine_outputs(data)), log=self.log, sampler=self.sampler)
+            self.engine = engine
+            delay = max(0.0, (start_at or 0) - time.time())
+            self.scheduled = threading.Timer(delay, self.launch, args=(engine,))
+            self.scheduled.daemon = True
+            self.scheduled.start()
+        self.log(f"Test {engine.settings['test_type']} scheduled in {delay:.2f}s")
+        return 200, {'scheduled_in': delay}
+    
+    def confine_outputs(self, data):
+        """Запись сеанса и файл результатов бенчмарка - внутри каталога агента: API без авторизации"""
+        data = dict(data)
+        if data.get('record'):
+            data['record'] = confine_path(self.output_dir, data['record'], "record")
+        benchmark = dict(DEFAULT_SETTINGS['benchmark'], **data.get('benchmark', {}))
+        benchmark['results_file'] = confine_path(self.output_dir, benchmark['results_file'], "benchmark.results_file")
+        data['benchmark'] = benchmark
+        return data
+    
+    def launch(self, engine):
+        with self.lock:
+            self.scheduled = None
+            if engine is self.engine:
+                engine.start()
+    
+    def stop(self):
+        with self.lock:
+            if self.scheduled:
+                # Тест ещё не начался - просто отменяем его
+                self.scheduled.cancel()
+                self.scheduled = None
+                self.engine = None
+            engine = self.engine
+        if engine and engine.is_running:
+            engine.stop()
+            self.log("Test stop requested")
+        return self.status()
+    
+    def status(self):
+        engine = self.engine
+        state = {'time': time.time(), 'host': platform.node(), 'cpu_count': os.cpu_count()}
+        if engine is None:
+            return dict(state, status="idle", finished=True)
+        status = "scheduled" if self.scheduled else engine.status
+        return dict(state, status=status, finished=engine.is_finished(), elapsed=engine.elapsed(),
+                    duration=engine.duration, targets=engine.targets, metrics=engine.metrics[-1:], errors=engine.errors)
+    
+    def telemetry(self, since):
+        rows = self.sampler.buffer.last()
+        rows = rows[rows[:, self.sampler.column_index['time']] > since]
+        return {'columns': self.sampler.columns, 'rows': json_rows(rows)}
+    
+    def report(self):
+        engine = self.engine
+        if engine is None or not engine.is_finished():
+            return None
+        return engine.report()
+
+
+def http_json(address, path, payload=None, timeout=5.0):
+    """Запрос к агенту: GET без payload, POST с JSON"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(f"http://{address}{path}", data=data,
+                                     headers={'Content-Type': "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        body = json.load(e) if e.headers.get('Content-Type') == "application/json" else {}
+        raise RuntimeError(f"{address}{path}: HTTP {e.code} {body.get('error', '')}".strip())
+
+
+class Coordinator:
+    """Синхронный запуск теста на нескольких агентах и сводный отчёт"""
+    
+    def __init__(self, agents, settings, log=default_log, start_delay=2.0, poll_interval=1.0):
+        self.agents = agents
+        self.settings = settings
+        self.log = log
+        self.start_delay = start_delay
+        self.poll_interval = poll_interval
+        self.offsets = {}  # сдвиг часов агента относительно координатора, с
+        self.telemetry = {agent: {'columns': None, 'rows': []} for agent in agents}
+        self.since = {}  # время последнего полученного отсчёта по часам агента
+        self.last_status = {}
+    
+    def sync_clocks(self, rounds=5):
+        """Сдвиг часов каждого агента по запросу с наименьшим временем ответа"""
+        for agent in self.agents:
+            best = None
+            for _ in range(rounds):
+                sent = time.time()
+                remote = http_json(agent, "/status")['time']
+                received = time.time()
+                rtt = received - sent
+                if best is None or rtt < best[0]:
+                    best = (rtt, remote - (sent + received) / 2)
+            self.offsets[agent] = best[1]
+            self.log(f"Agent {agent}: clock offset {best[1] * 1000:+.1f} ms, RTT {best[0] * 1000:.1f} ms")
+    
+    def start(self):
+        self.sync_clocks()
+        start_at = time.time() + self.start_delay
+        data = settings_to_json(self.settings)
+        for agent in self.agents:
+            http_json(agent, "/start", {'settings': data, 'start_at': start_at + self.offsets[agent]})
+        self.log(f"Test scheduled on {len(self.agents)} agents in {self.start_delay:g}s")
+        self.since = {agent: start_at + self.offsets[agent] - 1.0 for agent in self.agents}
+    
+    def poll(self):
+        """Опрос состояния и новой телеметрии; True, пока хоть один агент не закончил"""
+        running = False
+        for agent in self.agents:
+            try:
+                status = http_json(agent, "/status")
+                chunk = http_json(agent, f"/telemetry?since={self.since[agent]}")
+            except (OSError, RuntimeError) as e:
+                self.log(f"Agent {agent} unreachable: {e}", logging.WARNING)
+                running = True
+                continue
+            self.last_status[agent] = status
+            stream = self.telemetry[agent]
+            stream['columns'] = chunk['columns']
+            stream['rows'].extend(chunk['rows'])
+            if chunk['rows']:
+                self.since[agent] = chunk['rows'][-1][0]
+            if not status.get('finished'):
+                running = True
+        return running
+    
+    def stop(self):
+        for agent in self.agents:
+            try:
+                http_json(agent, "/stop", {})
+            except (OSError, RuntimeError) as e:
+                self.log(f"Agent {agent}: stop failed: {e}", logging.WARNING)
+    
+    def progress(self):
+        parts = []
+        for agent in self.agents:
+            status = self.last_status.get(agent)
+            if status:
+                parts.append(f"{agent} {status['status']} {status.get('elapsed', 0):.0f}s")
+        return ", ".join(parts)
+    
+    def aggregate(self):
+        """Отчёты агентов и сводка: статусы, суммарная скорость, средняя загрузка по узлам"""
+        reports = {}
+        for agent in self.agents:
+            try:
+                reports[agent] = http_json(agent, "/report", timeout=30)
+            except (OSError, RuntimeError) as e:
+                reports[agent] = {'status': "unreachable", 'errors': [str(e)]}
+        
+        def results(key, field):
+            values = [report['results'][key].get(field) for report in reports.values() if key in report.get('results', {})]
+            return [value for value in values if value is not None]
+        
+        cpu = results('cpu', 'mean_rate')
+        disk = results('disk', 'mean_mbps')
+        statuses = {agent: report['status'] for agent, report in reports.items()}
+        
+        # Телеметрия узлов на общей шкале времени координатора
+        telemetry = {}
+        for agent, stream in self.telemetry.items():
+            rows = np.array(stream['rows'], dtype=float) if stream['rows'] else np.empty((0, 1))
+            if len(rows):
+                rows[:, 0] -= self.offsets.get(agent, 0.0)
+            telemetry[agent] = {'columns': stream['columns'], 'rows': json_rows(rows)}
+        
+        return {
+            'status': "completed" if all(s == "completed" for s in statuses.values()) else "failed",
+            'settings': settings_to_json(self.settings),
+            'clock_offsets': self.offsets,
+            'summary': {
+                'agents': statuses,
+                'cpu_rate_total': sum(cpu) if cpu else None,
+                'disk_mbps_total': sum(disk) if disk else None,
+                'cpu_mean_by_agent': {agent: report.get('achieved', {}).get('cpu_mean') for agent, report in reports.items()},
+                'errors': {agent: report['errors'] for agent, report in reports.items() if report.get('errors')},
+            },
+            'agents': {agent: {key: value for key, value in report.items() if key != 'telemetry'}
+                       for agent, report in reports.items()},
+            'telemetry': telemetry,
+        }
+
 
 class PCStressTester:
-    def __init__(self, root):
+    # Сколько строк держим в окне журнала (полный журнал - в файле)
+    LOG_LINES = 500
+    LOG_BATCH = 200
+    
+    def __init__(self, root, log_file="pcstresstest.log"):
         self.root = root
         self.root.title("PC Stress Tester (Educational)")
-        self.root.geometry("700x550")
+        self.root.geometry("820x900")
         self.root.resizable(True, True)
         
         # Переменные
         self.is_running = False
-        self.test_thread = None
-        self.cpu_load = 0
-        self.ram_load = 0
-        self.test_duration = 60  # секунд по умолчанию
-        self.start_time = None
+        self.engine = None
+        self.cache_window = None
+        
+        # Журнал: рабочие потоки только кладут записи в очередь, окно забирает их пачками
+        self.logger, self.log_listener = create_logger(log_file)
+        self.log_records = queue.SimpleQueue()
+        self.logger.addHandler(logging.handlers.QueueHandler(self.log_records))
+        
+        # Фоновый сбор телеметрии (не блокирует главный поток Tk)
+        self.sampler = TelemetrySampler(rate_hz=10)
+        self.sampler.start()
+        self.charts = LiveCharts(self.root, self.sampler)
         
         # Создание интерфейса
         self.create_widgets()
         
         # Запуск мониторинга
         self.update_system_info()
+        self.update_charts()
+        self.drain_log()
     
     def create_widgets(self):
         # Стили
@@ -58,6 +3192,11 @@ class PCStressTester:
         self.freq_label = ttk.Label(info_frame, text="CPU Freq: -- GHz")
         self.freq_label.grid(row=1, column=1, sticky='w', padx=5, pady=5)
         
+        ttk.Label(info_frame, text="Sampling (Hz):").grid(row=0, column=2, sticky='w', padx=5, pady=5)
+        self.sample_rate_var = tk.StringVar(value="10")
+        ttk.Spinbox(info_frame, from_=1, to=20, textvariable=self.sample_rate_var, width=5,
+                    command=self.update_sample_rate).grid(row=0, column=3, sticky='w', padx=5, pady=5)
+        
         # Фрейм настроек теста
         settings_frame = ttk.LabelFrame(self.root, text="Test Settings", padding=10)
         settings_frame.pack(fill='x', padx=20, pady=10)
@@ -92,6 +3231,91 @@ class PCStressTester:
         ttk.Radiobutton(settings_frame, text="CPU + RAM", variable=self.test_type, value="cpu_ram").grid(row=3, column=1, sticky='w', padx=5)
         ttk.Radiobutton(settings_frame, text="CPU Only", variable=self.test_type, value="cpu_only").grid(row=3, column=2, sticky='w', padx=5)
         ttk.Radiobutton(settings_frame, text="RAM Only", variable=self.test_type, value="ram_only").grid(row=3, column=3, sticky='w', padx=5)
+        ttk.Radiobutton(settings_frame, text="Disk I/O", variable=self.test_type, value="disk_io").grid(row=3, column=4, sticky='w', padx=5)
+        ttk.Radiobutton(settings_frame, text="Cache Sweep", variable=self.test_type, value="cache_sweep").grid(row=3, column=5, sticky='w', padx=5)
+        ttk.Radiobutton(settings_frame, text="Benchmark", variable=self.test_type, value="benchmark").grid(row=3, column=6, sticky='w', padx=5)
+        ttk.Radiobutton(settings_frame, text="Contention", variable=self.test_type, value="contention").grid(row=3, column=7, sticky='w', padx=5)
+        
+        # Вычислительное ядро нагрузки CPU
+        ttk.Label(settings_frame, text="CPU Workload:").grid(row=4, column=0, sticky='w', padx=5, pady=5)
+        self.cpu_workload = tk.StringVar(value="scalar")
+        for column, (name, (label, _unit)) in enumerate(CPU_WORKLOADS.items(), start=1):
+            ttk.Radiobutton(settings_frame, text=label, variable=self.cpu_workload, value=name).grid(row=4, column=column, sticky='w', padx=5)
+        
+        # Ядра для нагрузки CPU
+        ttk.Label(settings_frame, text="CPU Cores:").grid(row=5, column=0, sticky='w', padx=5, pady=5)
+        self.cores_var = tk.StringVar(value="all")
+        ttk.Entry(settings_frame, textvariable=self.cores_var, width=20).grid(row=5, column=1, sticky='w', padx=5, pady=5)
+        ttk.Label(settings_frame, text="(all or e.g. 0,2-5)").grid(row=5, column=2, columnspan=2, sticky='w', padx=5)
+        
+        # Режим нагрузки ОЗУ: потоковые проходы или проверка шаблонами
+        ttk.Label(settings_frame, text="RAM Mode:").grid(row=6, column=0, sticky='w', padx=5, pady=5)
+        self.ram_mode = tk.StringVar(value="stream")
+        ttk.Radiobutton(settings_frame, text="Stream", variable=self.ram_mode, value="stream").grid(row=6, column=1, sticky='w', padx=5)
+        ttk.Radiobutton(settings_frame, text="Verify (patterns)", variable=self.ram_mode, value="verify").grid(row=6, column=2, sticky='w', padx=5)
+        self.seed_var = tk.StringVar(value="0")
+        seed_frame = ttk.Frame(settings_frame)
+        seed_frame.grid(row=6, column=3, columnspan=2, sticky='w', padx=5)
+        ttk.Label(seed_frame, text="Seed:").pack(side='left')
+        ttk.Entry(seed_frame, textvariable=self.seed_var, width=10).pack(side='left', padx=5)
+        
+        # Сценарий нагрузки (если выбран, заменяет ползунки и длительность)
+        ttk.Label(settings_frame, text="Profile:").grid(row=8, column=0, sticky='w', padx=5, pady=5)
+        self.profile_var = tk.StringVar(value="")
+        ttk.Entry(settings_frame, textvariable=self.profile_var, width=30).grid(row=8, column=1, columnspan=2, sticky='w', padx=5, pady=5)
+        ttk.Button(settings_frame, text="Browse...", command=self.choose_profile).grid(row=8, column=3, sticky='w', padx=5)
+        
+        # Набор бенчмарков: с каким прогоном сравнивать и допустимое ухудшение
+        ttk.Label(settings_frame, text="Baseline:").grid(row=9, column=0, sticky='w', padx=5, pady=5)
+        self.baseline_var = tk.StringVar(value="last")
+        ttk.Entry(settings_frame, textvariable=self.baseline_var, width=20).grid(row=9, column=1, sticky='w', padx=5, pady=5)
+        tolerance_frame = ttk.Frame(settings_frame)
+        tolerance_frame.grid(row=9, column=2, columnspan=3, sticky='w', padx=5)
+        ttk.Label(tolerance_frame, text="Tolerance (%):").pack(side='left')
+        self.tolerance_var = tk.StringVar(value="5")
+        ttk.Spinbox(tolerance_frame, from_=0, to=100, textvariable=self.tolerance_var, width=5).pack(side='left', padx=5)
+        
+        # Страж безопасности (пороги - по умолчанию, см. DEFAULT_SETTINGS)
+        self.safety_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(settings_frame, text="Safety governor (throttle/abort on heat, memory pressure, swap)",
+                        variable=self.safety_var).grid(row=10, column=0, columnspan=5, sticky='w', padx=5, pady=5)
+        
+        # Настройки дискового теста
+        disk_frame = ttk.Frame(settings_frame)
+        disk_frame.grid(row=7, column=0, columnspan=5, sticky='w', pady=5)
+        
+        ttk.Label(disk_frame, text="Disk Dir:").grid(row=0, column=0, sticky='w', padx=5)
+        self.disk_dir_var = tk.StringVar(value=os.getcwd())
+        ttk.Entry(disk_frame, textvariable=self.disk_dir_var, width=30).grid(row=0, column=1, columnspan=3, sticky='w', padx=5)
+        ttk.Button(disk_frame, text="Browse...", command=self.choose_disk_dir).grid(row=0, column=4, padx=5)
+        
+        ttk.Label(disk_frame, text="Block:").grid(row=1, column=0, sticky='w', padx=5, pady=5)
+        self.block_size_var = tk.StringVar(value="4K")
+        ttk.Combobox(disk_frame, textvariable=self.block_size_var, values=list(DISK_BLOCK_SIZES),
+                     state='readonly', width=6).grid(row=1, column=1, sticky='w', padx=5)
+        
+        ttk.Label(disk_frame, text="Queue Depth:").grid(row=1, column=2, sticky='w', padx=5)
+        self.queue_depth_var = tk.StringVar(value="4")
+        ttk.Spinbox(disk_frame, from_=1, to=256, textvariable=self.queue_depth_var, width=5).grid(row=1, column=3, sticky='w', padx=5)
+        
+        ttk.Label(disk_frame, text="Workers:").grid(row=1, column=4, sticky='w', padx=5)
+        self.disk_workers_var = tk.StringVar(value="1")
+        ttk.Spinbox(disk_frame, from_=1, to=64, textvariable=self.disk_workers_var, width=5).grid(row=1, column=5, sticky='w', padx=5)
+        
+        ttk.Label(disk_frame, text="File (MB):").grid(row=1, column=6, sticky='w', padx=5)
+        self.disk_file_mb_var = tk.StringVar(value="256")
+        ttk.Spinbox(disk_frame, from_=16, to=65536, textvariable=self.disk_file_mb_var, width=7).grid(row=1, column=7, sticky='w', padx=5)
+        
+        self.disk_access = tk.StringVar(value="random")
+        ttk.Radiobutton(disk_frame, text="Random", variable=self.disk_access, value="random").grid(row=2, column=0, sticky='w', padx=5)
+        ttk.Radiobutton(disk_frame, text="Sequential", variable=self.disk_access, value="sequential").grid(row=2, column=1, sticky='w', padx=5)
+        
+        self.disk_operation = tk.StringVar(value="mixed")
+        ttk.Combobox(disk_frame, textvariable=self.disk_operation, values=["read", "write", "mixed"],
+                     state='readonly', width=7).grid(row=2, column=2, sticky='w', padx=5)
+        
+        self.disk_direct = tk.BooleanVar(value=False)
+        ttk.Checkbutton(disk_frame, text="Bypass page cache (O_DIRECT/fsync)", variable=self.disk_direct).grid(row=2, column=3, columnspan=4, sticky='w', padx=5)
         
         # Привязка событий слайдеров
         self.cpu_slider.configure(command=self.update_cpu_label)
@@ -107,6 +3331,18 @@ class PCStressTester:
         self.progress_bar = ttk.Progressbar(self.progress_frame, length=400, mode='determinate')
         self.progress_bar.pack(pady=5)
         
+        self.rates_label = ttk.Label(self.progress_frame, text="Worker rates: --", wraplength=620, justify='left')
+        self.rates_label.pack(pady=5)
+        
+        self.bandwidth_label = ttk.Label(self.progress_frame, text="RAM bandwidth: --")
+        self.bandwidth_label.pack(pady=5)
+        
+        self.disk_label = ttk.Label(self.progress_frame, text="Disk I/O: --")
+        self.disk_label.pack(pady=5)
+        
+        self.latency_canvas = tk.Canvas(self.progress_frame, height=60, width=600, highlightthickness=0)
+        self.latency_canvas.pack(pady=5)
+        
         # Кнопки управления
         button_frame = ttk.Frame(self.root)
         button_frame.pack(pady=20)
@@ -117,6 +3353,11 @@ class PCStressTester:
         self.stop_button = ttk.Button(button_frame, text="Stop Test", command=self.stop_test, width=20, state='disabled')
         self.stop_button.grid(row=0, column=1, padx=10)
         
+        self.record_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Record session", variable=self.record_var).grid(row=0, column=2, padx=10)
+        ttk.Button(button_frame, text="Replay...", command=self.open_replay, width=12).grid(row=0, column=3, padx=10)
+        ttk.Button(button_frame, text="Live Charts", command=self.charts.open, width=12).grid(row=0, column=4, padx=10)
+        
         # Статус
         self.status_label = ttk.Label(self.root, text="Ready", relief='sunken', anchor='w')
         self.status_label.pack(fill='x', padx=20, pady=10)
@@ -131,6 +3372,8 @@ class PCStressTester:
         scrollbar = ttk.Scrollbar(self.console_text, command=self.console_text.yview)
         scrollbar.pack(side='right', fill='y')
         self.console_text.configure(yscrollcommand=scrollbar.set)
+        self.console_text.tag_configure('error', foreground='red')
+        self.console_text.tag_configure('warning', foreground='darkorange')
         
         # Заполнение информацией
         self.log_message("PC Stress Tester initialized")
@@ -144,212 +3387,922 @@ class PCStressTester:
         self.ram_value_label.config(text=f"{int(float(value))}%")
     
     def update_system_info(self):
+        """Обновление панели по последнему отсчёту фонового сборщика телеметрии"""
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            self.cpu_label.config(text=f"CPU Usage: {cpu_percent:.1f}%")
-            
-            # RAM usage
-            ram = psutil.virtual_memory()
-            self.ram_label.config(text=f"RAM Usage: {ram.percent:.1f}%")
-            
-            # CPU frequency
-            freq = psutil.cpu_freq()
-            if freq:
-                self.freq_label.config(text=f"CPU Freq: {freq.current/1000:.2f} GHz")
-            
-            # CPU temperature (только для Linux)
-            try:
-                temps = psutil.sensors_temperatures()
-                if 'coretemp' in temps:
-                    core_temp = temps['coretemp'][0].current
-                    self.temp_label.config(text=f"CPU Temp: {core_temp:.1f}°C")
-            except:
-                self.temp_label.config(text="CPU Temp: N/A")
+            row = self.sampler.buffer.latest()
+            if row is not None:
+                index = self.sampler.column_index
+                
+                # CPU usage
+                self.cpu_label.config(text=f"CPU Usage: {row[index['cpu_total']]:.1f}%")
+                
+                # RAM usage
+                self.ram_label.config(text=f"RAM Usage: {row[index['mem_percent']]:.1f}%  "
+                                           f"Swap: {row[index['swap_percent']]:.1f}%")
+                
+                # CPU frequency
+                freqs = [f for f in self.sampler.series('freq', row) if not np.isnan(f)]
+                if freqs:
+                    self.freq_label.config(text=f"CPU Freq: {sum(freqs) / len(freqs) / 1000:.2f} GHz "
+                                                f"({min(freqs) / 1000:.2f}-{max(freqs) / 1000:.2f})")
+                
+                # CPU temperature
+                temp = self.sampler.cpu_temperature(row)
+                if temp is not None:
+                    self.temp_label.config(text=f"CPU Temp: {temp:.1f}°C ({len(self.sampler.temp_sensors)} sensors)")
+                else:
+                    self.temp_label.config(text="CPU Temp: N/A")
                 
         except Exception as e:
             self.log_message(f"Error updating system info: {e}")
         
         # Повторяем каждую секунду
-        if not self.is_running:
-            self.root.after(1000, self.update_system_info)
+        self.root.after(1000, self.update_system_info)
+    
+    def update_charts(self):
+        """Телеметрия сворачивается в корзины всегда, рисуется - только при открытом окне графиков"""
+        try:
+            self.charts.poll()
+            self.charts.draw()
+        except Exception as e:
+            self.log_message(f"Error updating charts: {e}")
+        self.root.after(500, self.update_charts)
+    
+    def update_sample_rate(self):
+        try:
+            self.sampler.set_rate(float(self.sample_rate_var.get()))
+        except ValueError:
+            pass
     
     def start_test(self):
         if self.is_running:
             return
         
-        self.cpu_load = int(self.cpu_slider.get())
-        self.ram_load = int(self.ram_slider.get())
-        
         try:
-            self.test_duration = int(self.duration_var.get())
+            test_duration = int(self.duration_var.get())
         except:
-            self.test_duration = 60
+            test_duration = 60
+        
+        if test_duration < 10:
+            test_duration = 10
+        
+        try:
+            cpu_cores = parse_core_list(self.cores_var.get())
+        except ValueError:
+            messagebox.showerror("Invalid cores", "Use 'all' or a list like 0,2-5")
+            return
+        
+        try:
+            memtest_seed = int(self.seed_var.get())
+        except ValueError:
+            memtest_seed = 0
+        
+        try:
+            disk_settings = {
+                'directory': self.disk_dir_var.get(),
+                'file_size': int(self.disk_file_mb_var.get()) * 1024 * 1024,
+                'block_size': DISK_BLOCK_SIZES[self.block_size_var.get()],
+                'queue_depth': int(self.queue_depth_var.get()),
+                'workers': int(self.disk_workers_var.get()),
+                'access': self.disk_access.get(),
+                'operation': self.disk_operation.get(),
+                'direct': self.disk_direct.get(),
+            }
+        except (ValueError, KeyError):
+            messagebox.showerror("Invalid disk settings", "Check block size, queue depth, workers and file size")
+            return
+        profile = None
+        if self.profile_var.get().strip():
+            try:
+                profile = LoadProfile.load(self.profile_var.get().strip())
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Invalid profile", str(e))
+                return
+            test_duration = profile.duration
+        
+        try:
+            tolerance = float(self.tolerance_var.get())
+        except ValueError:
+            tolerance = DEFAULT_SETTINGS['benchmark']['tolerance']
+        
+        uses_disk = profile.uses('io') if profile else self.test_type.get() in ("disk_io", "benchmark")
+        if uses_disk and not os.path.isdir(disk_settings['directory']):
+            messagebox.showerror("Invalid disk settings", "Disk directory does not exist")
+            return
         
-        if self.test_duration < 10:
-            self.test_duration = 10
+        settings = {
+            'test_type': self.test_type.get(),
+            'cpu_load': int(self.cpu_slider.get()),
+            'ram_load': int(self.ram_slider.get()),
+            'duration': test_duration,
+            'cpu_workload': self.cpu_workload.get(),
+            'cpu_cores': cpu_cores,
+            'ram_mode': self.ram_mode.get(),
+            'memtest_seed': memtest_seed,
+            'profile': profile,
+            'disk': disk_settings,
+            'benchmark': {'baseline': self.baseline_var.get().strip() or None, 'tolerance': tolerance},
+            'safety': {'enabled': self.safety_var.get()},
+            'record': f"session_{datetime.now():%Y%m%d_%H%M%S}.pcsr" if self.record_var.get() else None,
+        }
         
         self.is_running = True
-        self.start_time = time.time()
         
         self.start_button.config(state='disabled')
         self.stop_button.config(state='normal')
         
-        self.progress_bar['maximum'] = self.test_duration
-        self.progress_bar['value'] = 0
-        
         # Запуск теста в отдельном потоке
-        self.test_thread = threading.Thread(target=self.run_stress_test, daemon=True)
-        self.test_thread.start()
+        self.engine = StressEngine(settings, log=self.log_message, sampler=self.sampler)
+        self.engine.start()
+        
+        self.progress_bar['maximum'] = self.engine.duration
+        self.progress_bar['value'] = 0
         
-        self.log_message(f"Starting stress test: CPU={self.cpu_load}%, RAM={self.ram_load}%, Duration={self.test_duration}s")
+        if profile:
+            self.log_message(f"Starting load profile '{profile.name}': {len(profile.phases)} phases, Duration={test_duration:g}s")
+        else:
+            self.log_message(f"Starting stress test: CPU={settings['cpu_load']}%, RAM={settings['ram_load']}%, Duration={test_duration}s")
         self.status_label.config(text=f"Test running...")
         
         # Запуск обновления прогресса
         self.update_progress()
     
-    def run_stress_test(self):
-        test_type = self.test_type.get()
+    def choose_profile(self):
+        path = filedialog.askopenfilename(filetypes=[("Load profile", "*.json"), ("All files", "*.*")])
+        if path:
+            self.profile_var.set(path)
+    
+    def open_replay(self):
+        path = filedialog.askopenfilename(title="Open session recording",
+                                          filetypes=[("Session recordings", "*.pcsr"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            recording = SessionRecording(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Cannot open recording", str(e))
+            return
+        ReplayViewer(tk.Toplevel(self.root), recording)
+    
+    def choose_disk_dir(self):
+        directory = filedialog.askdirectory(initialdir=self.disk_dir_var.get())
+        if directory:
+            self.disk_dir_var.set(directory)
+    
+    def draw_latency_histogram(self, histogram):
+        """Гистограмма задержек на холсте (логарифмическая шкала времени)"""
+        canvas = self.latency_canvas
+        canvas.delete('all')
+        used = np.flatnonzero(histogram.counts)
+        if not len(used):
+            return
         
-        if test_type in ["cpu_ram", "cpu_only"]:
-            self.cpu_stress_thread = threading.Thread(target=self.cpu_stress, daemon=True)
-            self.cpu_stress_thread.start()
+        first, last = int(used[0]), int(used[-1]) + 1
+        counts = histogram.counts[first:last]
+        width = int(canvas['width'])
+        height = int(canvas['height']) - 12
+        bar = width / len(counts)
+        peak = counts.max()
+        for i, count in enumerate(counts):
+            if count:
+                top = height - height * count / peak
+                canvas.create_rectangle(i * bar, top, (i + 1) * bar, height, fill='steelblue', width=0)
         
-        if test_type in ["cpu_ram", "ram_only"]:
-            self.ram_stress_thread = threading.Thread(target=self.ram_stress, daemon=True)
-            self.ram_stress_thread.start()
+        canvas.create_text(2, height + 6, text=f"{histogram.bucket_upper(first - 1) / 1000:.0f} us", anchor='w', font=('Arial', 8))
+        canvas.create_text(width - 2, height + 6, text=f"{histogram.bucket_upper(last - 1) / 1000:.0f} us", anchor='e', font=('Arial', 8))
+    
+    def update_progress(self):
+        engine = self.engine
+        if engine is None:
+            return
         
-        # Ожидание завершения теста
-        time.sleep(self.test_duration)
+        # Поток движка завершился: тест окончен или остановлен
+        if engine.is_finished():
+            self.test_completed()
+            return
         
-        if self.is_running:
-            self.root.after(0, self.test_completed)
-    
-    def cpu_stress(self):
-        """Создание нагрузки на CPU"""
-        self.log_message("CPU stress test started")
+        elapsed = engine.elapsed()
+        progress = min(elapsed, engine.duration)
         
-        target_load = self.cpu_load / 100.0
+        self.progress_bar['value'] = progress
+        time_text = f"Time elapsed: {int(elapsed)}s / {engine.duration:g}s"
         
-        while self.is_running:
-            start_time = time.time()
-            
-            # Вычисления для создания нагрузки
-            for _ in range(int(100000 * target_load)):
-                math.sqrt(random.random() * 1000)
-                math.sin(random.random() * 3.14)
-                math.log(random.random() + 1)
-            
-            # Корректировка времени для достижения целевой нагрузки
-            work_time = time.time() - start_time
-            sleep_time = work_time * ((1 - target_load) / target_load) if target_load > 0 else 0.1
-            
-            if sleep_time > 0:
-                time.sleep(sleep_time)
-    
-    def ram_stress(self):
-        """Создание нагрузки на RAM"""
-        self.log_message("RAM stress test started")
+        profile = engine.settings['profile']
+        if profile and engine.phase_index is not None:
+            phase = profile.phases[engine.phase_index]
+            targets = engine.targets
+            time_text += (f"  |  Phase {engine.phase_index + 1}/{len(profile.phases)} '{phase['name']}': "
+                          f"CPU {targets['cpu']:.0f}%, RAM {targets['ram']:.0f}%, I/O {targets['io']:.0f} MB/s")
+        self.time_label.config(text=time_text)
         
-        target_mb = (psutil.virtual_memory().total * (self.ram_load / 100.0)) / (1024 * 1024)
-        chunk_size = 10  # MB за раз
-        data_chunks = []
+        pool = engine.cpu_pool
+        stats = engine.disk_stats
+        self.charts.add_rates(time.time(), sum(pool.get_rates()) if pool else np.nan,
+                              stats['mbps'] if engine.disk_stress and stats else np.nan)
+        if pool:
+            rates = pool.get_rates()
+            per_worker = "  ".join(f"#{i}: {format_rate(r)}" for i, r in enumerate(rates))
+            self.rates_label.config(text=f"Worker rates ({pool.unit}/s), total {format_rate(sum(rates))}: {per_worker}")
         
-        try:
-            while self.is_running and len(data_chunks) * chunk_size < target_mb:
-                # Выделяем память
-                data_chunks.append(bytearray(chunk_size * 1024 * 1024))
-                
-                # Записываем случайные данные
-                for i in range(0, len(data_chunks[-1]), 4096):
-                    data_chunks[-1][i] = random.randint(0, 255)
-                
-                current_mb = len(data_chunks) * chunk_size
-                if current_mb % 100 == 0:
-                    self.log_message(f"Allocated {current_mb} MB of RAM")
-                
-                time.sleep(0.1)
-            
-            # Удерживаем память до конца теста
-            while self.is_running:
-                # Читаем/записываем в память для создания активности
-                if data_chunks:
-                    chunk = random.choice(data_chunks)
-                    if len(chunk) > 0:
-                        chunk[0] = (chunk[0] + 1) % 256
-                time.sleep(0.5)
-                
-        finally:
-            # Освобождаем память
-            self.log_message(f"Releasing {len(data_chunks) * chunk_size} MB of RAM")
-            data_chunks.clear()
+        if engine.memtest_status:
+            self.bandwidth_label.config(text=engine.memtest_status)
+        
+        if engine.disk_stress and stats:
+            self.disk_label.config(text=f"Disk I/O: {stats['mbps']:.1f} MB/s, {stats['iops']:.0f} IOPS, "
+                                        f"p50 {stats['p50_us']:.0f} us, p99 {stats['p99_us']:.0f} us, "
+                                        f"p99.9 {stats['p999_us']:.0f} us")
+            self.draw_latency_histogram(stats['histogram'])
+        
+        if engine.cache_points:
+            self.show_cache_curve(engine.cache_points)
+        
+        if engine.ram_bandwidth and not engine.memtest_status:
+            summary = "  ".join(f"{name}: {value:.2f}" for name, value in engine.ram_bandwidth.items())
+            self.bandwidth_label.config(text=f"RAM bandwidth (GB/s)  {summary}")
+        
+        self.root.after(100, self.update_progress)
     
-    def update_progress(self):
-        if not self.is_running:
+    def show_cache_curve(self, points):
+        """Окно с кривой развёртки кэша: задержка и пропускная способность по размеру набора"""
+        if self.cache_window is None or not self.cache_window.winfo_exists():
+            self.cache_window = tk.Toplevel(self.root)
+            self.cache_window.title("Cache Hierarchy Sweep")
+            self.cache_canvas = tk.Canvas(self.cache_window, width=640, height=360, bg='white')
+            self.cache_canvas.pack(fill='both', expand=True)
+            self.cache_drawn = 0
+        
+        if self.cache_drawn == len(points):
             return
+        self.cache_drawn = len(points)
         
-        elapsed = time.time() - self.start_time
-        progress = min(elapsed, self.test_duration)
+        canvas = self.cache_canvas
+        canvas.delete('all')
+        width, height, margin = 640, 360, 50
+        sizes = np.log2([p['size'] for p in points])
+        latencies = np.log2([max(p['ns_per_access'], 0.01) for p in points])
+        bandwidths = np.array([p['gbps'] for p in points])
         
-        self.progress_bar['value'] = progress
-        self.time_label.config(text=f"Time elapsed: {int(elapsed)}s / {self.test_duration}s")
+        x_min, x_max = np.log2(4096), max(sizes[-1], np.log2(4096) + 1)
+        def x_of(value):
+            return margin + (value - x_min) / (x_max - x_min) * (width - 2 * margin)
+        def scale(values):
+            low, high = values.min(), values.max()
+            span = high - low if high > low else 1.0
+            return [height - margin - (v - low) / span * (height - 2 * margin) for v in values]
         
-        if elapsed >= self.test_duration:
-            self.test_completed()
-        else:
-            self.root.after(100, self.update_progress)
+        canvas.create_rectangle(margin, margin, width - margin, height - margin, outline='gray')
+        for boundary in detect_cache_boundaries(points):
+            x = x_of(np.log2(boundary['size']))
+            canvas.create_line(x, margin, x, height - margin, fill='gray', dash=(4, 2))
+            canvas.create_text(x + 3, margin + 8, text=f"{boundary['level']} ~{boundary['size'] // 1024} KB", anchor='w', font=('Arial', 8))
+        
+        xs = [x_of(v) for v in sizes]
+        for values, color, label in ((latencies, 'firebrick', "ns/access (log)"), (bandwidths, 'steelblue', "GB/s")):
+            ys = scale(values)
+            if len(xs) > 1:
+                canvas.create_line(*[c for xy in zip(xs, ys) for c in xy], fill=color, width=2)
+            for x, y in zip(xs, ys):
+                canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill=color, outline=color)
+        
+        last = points[-1]
+        canvas.create_text(margin, height - margin / 2, anchor='w', font=('Arial', 9),
+                           text=f"Working set: 4 KB .. {last['size'] // 1024} KB (log scale)")
+        canvas.create_text(margin, margin / 2, anchor='w', fill='firebrick', font=('Arial', 9),
+                           text=f"ns/access (last {last['ns_per_access']:.2f})")
+        canvas.create_text(width - margin, margin / 2, anchor='e', fill='steelblue', font=('Arial', 9),
+                           text=f"GB/s (last {last['gbps']:.2f})")
     
     def test_completed(self):
         self.is_running = False
         
+        if self.engine.cache_points:
+            self.show_cache_curve(self.engine.cache_points)
+        
         self.start_button.config(state='normal')
         self.stop_button.config(state='disabled')
         
-        self.status_label.config(text="Test completed")
-        self.log_message("Stress test completed successfully")
-        
-        # Обновляем информацию о системе
-        self.update_system_info()
+        status = self.engine.status
+        if status == "stopped":
+            self.status_label.config(text="Test stopped by user")
+            self.log_message("Stress test stopped by user")
+        elif status == "failed":
+            self.status_label.config(text="Test failed")
+            self.log_message(f"Stress test failed: {'; '.join(self.engine.errors)}")
+        else:
+            self.status_label.config(text="Test completed")
+            self.log_message("Stress test completed successfully")
     
     def stop_test(self):
         if not self.is_running:
             return
         
-        self.is_running = False
-        
-        self.start_button.config(state='normal')
+        # Воркеры завершаются в потоке движка, update_progress дождётся его окончания
+        self.engine.stop()
         self.stop_button.config(state='disabled')
-        
-        self.status_label.config(text="Test stopped by user")
-        self.log_message("Stress test stopped by user")
-        
-        # Ждем завершения потоков
-        if self.test_thread and self.test_thread.is_alive():
-            self.test_thread.join(timeout=2)
+        self.status_label.config(text="Stopping test...")
     
-    def log_message(self, message):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_line = f"[{timestamp}] {message}\n"
+    def log_message(self, message, level=logging.INFO):
+        """Потокобезопасно: запись уходит в очередь, виджет обновляет drain_log"""
+        self.logger.log(level, message)
+    
+    def drain_log(self):
+        """Перенос накопившихся записей журнала в окно одной вставкой"""
+        batch = []
+        try:
+            while len(batch) < self.LOG_BATCH:
+                batch.append(self.log_records.get_nowait())
+        except queue.Empty:
+            pass
         
-        self.console_text.insert('end', log_line)
-        self.console_text.see('end')
+        if batch:
+            chunks = []
+            for record in batch:
+                timestamp = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+                tag = 'error' if record.levelno >= logging.ERROR else 'warning' if record.levelno >= logging.WARNING else ''
+                chunks.extend((f"[{timestamp}] {record.getMessage()}\n", tag))
+            self.console_text.insert('end', *chunks)
+            self.console_text.see('end')
+            
+            # Ограничиваем размер лога
+            lines = int(self.console_text.index('end-1c').split('.')[0])
+            if lines > self.LOG_LINES:
+                self.console_text.delete('1.0', f'{lines - self.LOG_LINES + 1}.0')
         
-        # Ограничиваем размер лога
-        lines = int(self.console_text.index('end-1c').split('.')[0])
-        if lines > 100:
-            self.console_text.delete('1.0', '2.0')
+        # Полная пачка - вероятно, есть ещё: забираем быстрее
+        self.root.after(10 if len(batch) == self.LOG_BATCH else 100, self.drain_log)
     
     def on_closing(self):
         if self.is_running:
             if messagebox.askokcancel("Quit", "Stress test is running. Are you sure you want to quit?"):
                 self.is_running = False
+                self.engine.stop()
+                self.engine.wait(timeout=10)
+                self.sampler.stop()
+                self.log_listener.stop()
                 self.root.destroy()
         else:
+            self.sampler.stop()
+            self.log_listener.stop()
             self.root.destroy()
 
-def main():
+# Коды завершения в режиме командной строки
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ABORTED = 3
+
+
+def draw_envelope(canvas, box, lows, highs, color, tag, low=None, high=None):
+    """Полоса min/max по колонкам пикселей в прямоугольнике box (x0, y0, x1, y1).
+    
+    Один многоугольник на серию (проход по максимумам и обратно по минимумам),
+    поэтому число элементов холста не зависит от длины истории.
+    """
+    x0, y0, x1, y1 = box
+    known = ~np.isnan(lows)
+    if not known.any():
+        return None, None
+    low = float(np.nanmin(lows)) if low is None else low
+    high = float(np.nanmax(highs)) if high is None else high
+    span = high - low if high > low else 1.0
+    
+    xs = x0 + (np.arange(len(lows)) + 0.5) * (x1 - x0) / len(lows)
+    def y_of(values):
+        return y1 - (np.clip(values, low, high) - low) / span * (y1 - y0)
+    
+    # Разрывы в данных (NaN) делят полосу на отдельные участки
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], known.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        top = np.column_stack((xs[start:end], y_of(highs[start:end])))
+        bottom = np.column_stack((xs[start:end], y_of(lows[start:end])))[::-1]
+        points = np.concatenate((top, bottom)).ravel().tolist()
+        if end - start == 1:
+            canvas.create_line(points[0], points[1], points[0], points[3] + 1, fill=color, tags=tag)
+        else:
+            canvas.create_polygon(points, fill=color, outline=color, tags=tag)
+    return low, high
+
+
+class ReplayViewer:
+    """Просмотр записанного сеанса: панели по колонкам, прокрутка и масштаб окна времени"""
+    
+    WINDOWS = {"30 s": 30, "5 min": 300, "30 min": 1800, "2 h": 7200, "All": None}
+    COLORS = ('steelblue', 'seagreen', 'firebrick', 'darkorange', 'purple', 'gray')
+    
+    def __init__(self, root, recording):
+        self.root = root
+        self.recording = recording
+        self.root.title(f"Session replay - {os.path.basename(recording.path)}")
+        self.root.geometry("1000x560")
+        self.first, self.last = recording.time_range()
+        
+        side = ttk.Frame(self.root, padding=5)
+        side.pack(side='left', fill='y')
+        ttk.Label(side, text="Columns:").pack(anchor='w')
+        self.column_list = tk.Listbox(side, selectmode='multiple', exportselection=False, width=24, height=25)
+        for name in recording.columns[1:]:
+            self.column_list.insert('end', name)
+        temps = [name for name in recording.columns if name.startswith('temp:')]
+        for name in ['cpu_total', 'mem_percent', 'work_rate'] + temps[:1]:
+            self.column_list.selection_set(recording.column_index[name] - 1)
+        self.column_list.pack(fill='y', expand=True)
+        self.column_list.bind('<<ListboxSelect>>', lambda event: self.redraw())
+        
+        main = ttk.Frame(self.root, padding=5)
+        main.pack(side='left', fill='both', expand=True)
+        self.canvas = tk.Canvas(main, bg='white', highlightthickness=0)
+        self.canvas.pack(fill='both', expand=True)
+        self.canvas.bind('<Configure>', lambda event: self.redraw())
+        
+        controls = ttk.Frame(main)
+        controls.pack(fill='x', pady=5)
+        ttk.Label(controls, text="Window:").pack(side='left')
+        self.window_var = tk.StringVar(value="All")
+        window_box = ttk.Combobox(controls, textvariable=self.window_var, values=list(self.WINDOWS),
+                                  state='readonly', width=8)
+        window_box.pack(side='left', padx=5)
+        window_box.bind('<<ComboboxSelected>>', lambda event: self.redraw())
+        ttk.Label(controls, text="Position:").pack(side='left', padx=(10, 0))
+        self.position = tk.DoubleVar(value=1.0)
+        ttk.Scale(controls, from_=0.0, to=1.0, variable=self.position,
+                  command=lambda value: self.redraw()).pack(side='left', fill='x', expand=True, padx=5)
+        self.info_label = ttk.Label(main, text="")
+        self.info_label.pack(anchor='w')
+    
+    def visible_range(self):
+        length = self.WINDOWS[self.window_var.get()]
+        total = self.last - self.first
+        if length is None or length >= total:
+            return self.first, self.last
+        start = self.first + (total - length) * self.position.get()
+        return start, start + length
+    
+    def redraw(self):
+        canvas = self.canvas
+        canvas.delete('all')
+        if self.first is None:
+            canvas.create_text(20, 20, anchor='w', text="Recording is empty")
+            return
+        
+        names = [self.column_list.get(i) for i in self.column_list.curselection()]
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        if not names or width < 100 or height < 50:
+            return
+        start, end = self.visible_range()
+        margin_left, margin_right = 60, 10
+        buckets = max(1, width - margin_left - margin_right)
+        pane = height / len(names)
+        
+        for i, name in enumerate(names):
+            box = (margin_left, i * pane + 16, width - margin_right, (i + 1) * pane - 4)
+            canvas.create_rectangle(*box, outline='lightgray')
+            lows, highs = self.recording.downsample(name, buckets, start, end)
+            low, high = draw_envelope(canvas, box, lows, highs, self.COLORS[i % len(self.COLORS)], name)
+            canvas.create_text(box[0], box[1] - 2, anchor='sw', text=name, font=('Arial', 9))
+            if low is not None:
+                canvas.create_text(box[0] - 4, box[1], anchor='ne', text=f"{high:.4g}", font=('Arial', 8))
+                canvas.create_text(box[0] - 4, box[3], anchor='se', text=f"{low:.4g}", font=('Arial', 8))
+        
+        self.info_label.config(
+            text=f"{self.recording.rows} samples, {self.last - self.first:.0f}s recorded; showing "
+                 f"{datetime.fromtimestamp(start):%H:%M:%S} - {datetime.fromtimestamp(end):%H:%M:%S}, "
+                 f"{(end - start) / buckets:.2f}s per pixel")
+
+
+class LiveCharts:
+    """Живые графики из кольцевого буфера телеметрии: тепловая карта загрузки ядер,
+    полосы min/max для CPU/памяти, температуры и скорости работы.
+    
+    Данные сворачиваются в DecimatedSeries при каждом опросе, окно только рисует
+    готовые корзины, поэтому стоимость кадра не растёт ни с историей, ни с частотой.
+    """
+    
+    BUCKETS = 600
+    SPANS = {"1 min": 60, "5 min": 300, "30 min": 1800}
+    MARGIN = 60
+    PANE_HEIGHT = 110
+    
+    def __init__(self, root, sampler):
+        self.root = root
+        self.sampler = sampler
+        index = sampler.column_index
+        self.core_columns = [index[f"cpu{i}"] for i in range(sampler.cores)]
+        temps = [index[column] for name, _, column in sampler.temp_sensors if name in CPU_TEMP_SENSORS]
+        self.temp_columns = temps or [index[column] for _, _, column in sampler.temp_sensors]
+        
+        span = self.SPANS["5 min"]
+        self.cores = DecimatedSeries(self.BUCKETS, sampler.cores, span)
+        self.summary = DecimatedSeries(self.BUCKETS, 3, span)  # cpu_total, mem_percent, температура
+        self.rates = DecimatedSeries(self.BUCKETS, 2, span)  # скорость воркеров, диск МБ/с
+        self.cursor = sampler.buffer.count
+        
+        # Палитра тепловой карты: 0..100% от тёмно-синего к красному, последний цвет - нет данных
+        palette = [f"#{int(255 * min(1, 2 * v)):02x}{int(160 * (1 - abs(2 * v - 1))):02x}{int(255 * max(0, 1 - 2 * v)):02x}"
+                   for v in np.linspace(0, 1, 101)]
+        self.palette = np.array(palette + ["#f4f4f4"])
+        
+        self.window = None
+        self.canvas = None
+        self.image = None
+    
+    def open(self):
+        if self.window is not None and self.window.winfo_exists():
+            self.window.lift()
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title("Live Charts")
+        width = self.BUCKETS + 2 * self.MARGIN
+        self.canvas = tk.Canvas(self.window, width=width, height=4 * self.PANE_HEIGHT + 10, bg='white',
+                                highlightthickness=0)
+        self.canvas.pack()
+        controls = ttk.Frame(self.window, padding=5)
+        controls.pack(fill='x')
+        ttk.Label(controls, text="Window:").pack(side='left')
+        self.span_var = tk.StringVar(value=next(k for k, v in self.SPANS.items() if v == self.cores.span))
+        box = ttk.Combobox(controls, textvariable=self.span_var, values=list(self.SPANS), state='readonly', width=8)
+        box.pack(side='left', padx=5)
+        box.bind('<<ComboboxSelected>>', lambda event: self.set_span(self.SPANS[self.span_var.get()]))
+        self.image = tk.PhotoImage(width=self.BUCKETS, height=self.PANE_HEIGHT - 20)
+    
+    def set_span(self, span):
+        """Новая длина окна: корзины пересобираются один раз из истории буфера"""
+        for series in (self.cores, self.summary, self.rates):
+            series.reset(span)
+        self.cursor = max(0, self.sampler.buffer.count - self.sampler.buffer.capacity)
+        self.poll()
+        self.draw()
+    
+    def poll(self):
+        rows, self.cursor = self.sampler.buffer.since(self.cursor)
+        if not len(rows):
+            return
+        index = self.sampler.column_index
+        times = rows[:, index['time']]
+        self.cores.add(times, rows[:, self.core_columns])
+        temp = (np.fmax.reduce(rows[:, self.temp_columns], axis=1) if self.temp_columns
+                else np.full(len(rows), np.nan))
+        self.summary.add(times, np.column_stack((rows[:, index['cpu_total']], rows[:, index['mem_percent']], temp)))
+    
+    def add_rates(self, now, work_rate, disk_mbps):
+        self.rates.add(np.array([now]), np.array([[work_rate, disk_mbps]], dtype=float))
+    
+    def draw(self):
+        if self.window is None or not self.window.winfo_exists():
+            return
+        now = time.time()
+        for series in (self.cores, self.summary, self.rates):
+            series.advance(now)
+        
+        canvas = self.canvas
+        canvas.delete('chart')
+        x0, x1 = self.MARGIN, self.MARGIN + self.BUCKETS
+        def pane(i):
+            return (x0, i * self.PANE_HEIGHT + 18, x1, (i + 1) * self.PANE_HEIGHT - 2)
+        
+        # Загрузка по ядрам: одна картинка вместо тысяч прямоугольников
+        box = pane(0)
+        _, highs = self.cores.view()
+        self.draw_heatmap(highs.T, box)
+        canvas.create_text(x0, box[1] - 2, anchor='sw', text=f"CPU per core, % (max per {self.cores.bucket_seconds:.1f}s)",
+                           font=('Arial', 9), tags='chart')
+        
+        lows, highs = self.summary.view()
+        box = pane(1)
+        canvas.create_rectangle(*box, outline='lightgray', tags='chart')
+        draw_envelope(canvas, box, lows[:, 0], highs[:, 0], 'steelblue', 'chart', 0, 100)
+        draw_envelope(canvas, box, lows[:, 1], highs[:, 1], 'seagreen', 'chart', 0, 100)
+        canvas.create_text(x0, box[1] - 2, anchor='sw', text="CPU total % (blue), memory % (green)",
+                           font=('Arial', 9), tags='chart')
+        
+        box = pane(2)
+        canvas.create_rectangle(*box, outline='lightgray', tags='chart')
+        low, high = draw_envelope(canvas, box, lows[:, 2], highs[:, 2], 'firebrick', 'chart')
+        self.label_pane(box, "CPU temperature, °C", low, high)
+        
+        lows, highs = self.rates.view()
+        box = pane(3)
+        canvas.create_rectangle(*box, outline='lightgray', tags='chart')
+        low, high = draw_envelope(canvas, box, lows[:, 0], highs[:, 0], 'darkorange', 'chart')
+        self.label_pane(box, "Work rate/s (orange), disk MB/s (purple)", low, high)
+        low, high = draw_envelope(canvas, box, lows[:, 1], highs[:, 1], 'purple', 'chart')
+        if low is not None:
+            canvas.create_text(x1 + 4, box[1], anchor='nw', text=format_rate(high), font=('Arial', 8), tags='chart')
+    
+    def label_pane(self, box, title, low, high):
+        self.canvas.create_text(box[0], box[1] - 2, anchor='sw', text=title, font=('Arial', 9), tags='chart')
+        if low is not None:
+            self.canvas.create_text(box[0] - 4, box[1], anchor='ne', text=format_rate(high), font=('Arial', 8), tags='chart')
+            self.canvas.create_text(box[0] - 4, box[3], anchor='se', text=format_rate(low), font=('Arial', 8), tags='chart')
+    
+    def draw_heatmap(self, values, box):
+        """values (ядра, корзины) в картинку высотой панели: ядра повторяются или объединяются по максимуму"""
+        height = self.image.height()
+        cores = len(values)
+        if cores > height:
+            group = -(-cores // height)
+            padded = np.full((group * -(-cores // group), values.shape[1]), np.nan)
+            padded[:cores] = values
+            values = np.fmax.reduce(padded.reshape(-1, group, values.shape[1]), axis=1)
+        repeat = max(1, height // len(values))
+        
+        colors = np.where(np.isnan(values), len(self.palette) - 1,
+                          np.clip(np.nan_to_num(values), 0, 100).astype(int))
+        lines = ["{" + " ".join(self.palette[row]) + "}" for row in colors]
+        self.image.blank()
+        self.image.put(" ".join(line for line in lines for _ in range(repeat)))
+        self.canvas.create_image(box[0], box[1], anchor='nw', image=self.image, tags='chart')
+
+
+def run_replay(args):
+    """Просмотр записи: окно ReplayViewer или, с --headless, сводка в консоль"""
+    try:
+        recording = SessionRecording(args.replay)
+    except (OSError, ValueError) as e:
+        print(f"Cannot open recording: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    
+    if not args.headless:
+        if tk is None:
+            print("tkinter is not available, use --headless for a console summary", file=sys.stderr)
+            return EXIT_FAILED
+        root = tk.Tk()
+        ReplayViewer(root, recording)
+        root.mainloop()
+        return EXIT_OK
+    
+    first, last = recording.time_range()
+    print(f"{recording.path}: {recording.rows} samples in {len(recording.blocks)} blocks, "
+          f"{(last - first) if first is not None else 0:.0f}s, host {recording.header['host']}")
+    if first is None:
+        return EXIT_OK
+    names = ['cpu_total', 'mem_percent'] + list(RECORDING_EXTRA_COLUMNS)
+    names = [name for name in names if name in recording.column_index]
+    print("time      " + "".join(f"{name:>22}" for name in names))
+    series = [recording.downsample(name, 20) for name in names]
+    for bucket in range(20):
+        moment = first + (last - first) * bucket / 20
+        cells = "".join(f"{lows[bucket]:>10.4g} .. {highs[bucket]:<8.4g}" for lows, highs in series)
+        print(f"{datetime.fromtimestamp(moment):%H:%M:%S}  {cells}")
+    return EXIT_OK
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="PC Stress Tester (Educational). Without --headless the GUI is started.",
+        epilog=f"Exit codes: {EXIT_OK} - passed, {EXIT_FAILED} - failed, {EXIT_ABORTED} - aborted"
+    )
+    parser.add_argument('--headless', action='store_true', help="run without GUI")
+    parser.add_argument('--agent', action='store_true', help="serve the HTTP agent API for a coordinator")
+    parser.add_argument('--bind', default="127.0.0.1", help="agent listen address")
+    parser.add_argument('--port', type=int, default=8765, help="agent listen port")
+    parser.add_argument('--agent-dir', default=".",
+                        help="agent: directory for recordings and benchmark results requested by the coordinator "
+                             "(only relative paths inside it are accepted)")
+    parser.add_argument('--coordinate', metavar="HOST:PORT,...",
+                        help="run the test synchronously on these agents and write an aggregated report")
+    parser.add_argument('--start-delay', type=float, default=2.0, help="coordinated start delay, seconds")
+    parser.add_argument('--type', dest='test_type', choices=TEST_TYPES, default=DEFAULT_SETTINGS['test_type'])
+    parser.add_argument('--cpu', type=int, default=DEFAULT_SETTINGS['cpu_load'], help="CPU load, %%")
+    parser.add_argument('--ram', type=int, default=DEFAULT_SETTINGS['ram_load'], help="RAM load, %% of total")
+    parser.add_argument('--duration', type=int, default=DEFAULT_SETTINGS['duration'], help="seconds")
+    parser.add_argument('--workload', choices=SETTINGS_CHOICES['cpu_workload'], default=DEFAULT_SETTINGS['cpu_workload'])
+    parser.add_argument('--cores', default="all", help="all or e.g. 0,2-5")
+    parser.add_argument('--ram-mode', choices=SETTINGS_CHOICES['ram_mode'], default=DEFAULT_SETTINGS['ram_mode'])
+    parser.add_argument('--seed', type=int, default=DEFAULT_SETTINGS['memtest_seed'], help="seed for random memtest pattern")
+    parser.add_argument('--disk-dir', default=DEFAULT_SETTINGS['disk']['directory'])
+    parser.add_argument('--block-size', choices=list(DISK_BLOCK_SIZES), default="4K")
+    parser.add_argument('--queue-depth', type=int, default=DEFAULT_SETTINGS['disk']['queue_depth'])
+    parser.add_argument('--disk-workers', type=int, default=DEFAULT_SETTINGS['disk']['workers'])
+    parser.add_argument('--file-mb', type=int, default=DEFAULT_SETTINGS['disk']['file_size'] // (1024 * 1024))
+    parser.add_argument('--access', choices=SETTINGS_CHOICES['disk.access'], default=DEFAULT_SETTINGS['disk']['access'])
+    parser.add_argument('--operation', choices=SETTINGS_CHOICES['disk.operation'], default=DEFAULT_SETTINGS['disk']['operation'])
+    parser.add_argument('--direct', action='store_true', help="bypass page cache (O_DIRECT/fsync)")
+    parser.add_argument('--sweep-max-mb', type=int, help="largest working set for cache_sweep, MB")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_SETTINGS['benchmark']['iterations'],
+                        help="benchmark iterations after warm-up")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_SETTINGS['benchmark']['warmup'])
+    parser.add_argument('--results-file', default=DEFAULT_SETTINGS['benchmark']['results_file'],
+                        help="benchmark history file")
+    parser.add_argument('--baseline', default=DEFAULT_SETTINGS['benchmark']['baseline'],
+                        help="benchmark run to compare with: last, index or run id ('' to skip)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_SETTINGS['benchmark']['tolerance'],
+                        help="allowed benchmark regression, %%")
+    parser.add_argument('--mechanisms', help="contention mechanisms, comma-separated: " + ", ".join(CONTENTION_MECHANISMS))
+    parser.add_argument('--max-workers', type=int, help="largest contention level (default 2x logical CPUs)")
+    safety = DEFAULT_SETTINGS['safety']
+    parser.add_argument('--no-safety', action='store_true', help="disable the safety governor")
+    parser.add_argument('--max-temp', type=float, default=safety['max_temp'], help="throttle CPU above this, °C")
+    parser.add_argument('--critical-temp', type=float, default=safety['critical_temp'], help="abort above this, °C")
+    parser.add_argument('--min-available-mb', type=int, default=safety['min_available_mb'],
+                        help="release RAM below this much available memory (abort below half)")
+    parser.add_argument('--max-swap-in', type=float, default=safety['max_swap_in_mbps'], help="swap-in limit, MB/s")
+    parser.add_argument('--max-load', type=float, default=safety['max_load_per_cpu'], help="load average limit per CPU")
+    parser.add_argument('--profile', help="JSON load profile (phases with cpu/ram/io targets and duration)")
+    parser.add_argument('--sample-rate', type=float, default=10, help="telemetry rate, Hz")
+    parser.add_argument('--report', help="write JSON report to this file")
+    parser.add_argument('--record', help="record the session to this binary file")
+    parser.add_argument('--replay', metavar="FILE", help="open a recorded session (with --headless: print a summary)")
+    parser.add_argument('--log-file', default="pcstresstest.log", help="rotating log file ('' to disable)")
+    return parser.parse_args(argv)
+
+
+def parse_mechanisms(text):
+    """Список механизмов теста планировщика; пусто - все"""
+    if not text:
+        return None
+    mechanisms = [name.strip() for name in text.split(',') if name.strip()]
+    unknown = [name for name in mechanisms if name not in CONTENTION_MECHANISMS]
+    if unknown:
+        raise ValueError(f"unknown contention mechanism: {', '.join(unknown)}")
+    return mechanisms
+
+
+def settings_from_args(args):
+    return {
+        'test_type': args.test_type,
+        'cpu_load': min(100, max(1, args.cpu)),
+        'ram_load': min(90, max(1, args.ram)),
+        'duration': max(1, args.duration),
+        'cpu_workload': args.workload,
+        'cpu_cores': parse_core_list(args.cores),
+        'ram_mode': args.ram_mode,
+        'memtest_seed': args.seed,
+        'profile': LoadProfile.load(args.profile) if args.profile else None,
+        'sweep_max_mb': args.sweep_max_mb,
+        'record': args.record,
+        'disk': {
+            'directory': args.disk_dir,
+            'file_size': args.file_mb * 1024 * 1024,
+            'block_size': DISK_BLOCK_SIZES[args.block_size],
+            'queue_depth': args.queue_depth,
+            'workers': args.disk_workers,
+            'access': args.access,
+            'operation': args.operation,
+            'direct': args.direct,
+        },
+        'benchmark': {
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'results_file': args.results_file,
+            'baseline': args.baseline or None,
+            'tolerance': args.tolerance,
+        },
+        'contention': {
+            'mechanisms': parse_mechanisms(args.mechanisms),
+            'max_workers': args.max_workers,
+        },
+        'safety': {
+            'enabled': not args.no_safety,
+            'max_temp': args.max_temp,
+            'critical_temp': args.critical_temp,
+            'min_available_mb': args.min_available_mb,
+            'max_swap_in_mbps': args.max_swap_in,
+            'max_load_per_cpu': args.max_load,
+        },
+    }
+
+
+def run_headless(args):
+    """Тест без окна: параметры из командной строки, итог - код завершения и JSON-отчёт"""
+    _, listener = create_logger(args.log_file, console=True)
+    try:
+        return run_engine_headless(args)
+    finally:
+        listener.stop()
+
+
+def run_engine_headless(args):
+    try:
+        settings = settings_from_args(args)
+    except (OSError, ValueError) as e:
+        default_log(f"Invalid arguments: {e}", logging.ERROR)
+        return EXIT_FAILED
+    
+    duration = settings['profile'].duration if settings['profile'] else settings['duration']
+    # Окно телеметрии в памяти ограничено; весь прогон целиком пишет --record
+    sampler = TelemetrySampler(rate_hz=args.sample_rate)
+    if duration > sampler.history_seconds and not settings['record']:
+        default_log(f"Run is longer than the in-memory telemetry window ({sampler.history_seconds:.0f}s): "
+                    f"the report keeps only the last part, use --record for the full run", logging.WARNING)
+    sampler.start()
+    engine = StressEngine(settings, log=default_log, sampler=sampler)
+    
+    # SIGTERM (остановка конвейера) обрабатываем как досрочную остановку
+    signal.signal(signal.SIGTERM, lambda signum, frame: engine.stop())
+    
+    if settings['profile']:
+        default_log(f"Starting load profile '{settings['profile'].name}': {len(settings['profile'].phases)} phases, "
+                    f"Duration={duration:g}s")
+    else:
+        default_log(f"Starting stress test: type={settings['test_type']}, CPU={settings['cpu_load']}%, "
+                    f"RAM={settings['ram_load']}%, Duration={settings['duration']}s")
+    engine.start()
+    try:
+        # Опрос через sleep: прерванный Ctrl+C join() у потока ненадёжен
+        while not engine.is_finished():
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        default_log("Interrupted, stopping workers...")
+        engine.stop()
+        engine.wait()
+    finally:
+        sampler.stop()
+    
+    report = engine.report()
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        default_log(f"Report written to {args.report}")
+    
+    default_log(f"Stress test {engine.status}", logging.INFO if engine.status == "completed" else logging.ERROR)
+    if engine.status == "completed":
+        return EXIT_OK
+    if engine.status == "stopped":
+        return EXIT_ABORTED
+    return EXIT_FAILED
+
+
+def run_agent(args):
+    _, listener = create_logger(args.log_file, console=True)
+    try:
+        agent = StressAgent(args.bind, args.port, sample_rate=args.sample_rate, output_dir=args.agent_dir)
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=agent.shutdown).start())
+        try:
+            agent.serve_forever()
+        except KeyboardInterrupt:
+            default_log("Agent interrupted, stopping")
+        return EXIT_OK
+    finally:
+        listener.stop()
+
+
+def run_coordinator(args):
+    """Синхронный тест на агентах; код завершения - как у одиночного headless-запуска"""
+    _, listener = create_logger(args.log_file, console=True)
+    try:
+        try:
+            settings = settings_from_args(args)
+        except (OSError, ValueError) as e:
+            default_log(f"Invalid arguments: {e}", logging.ERROR)
+            return EXIT_FAILED
+        
+        agents = [agent.strip() for agent in args.coordinate.split(',') if agent.strip()]
+        coordinator = Coordinator(agents, settings, start_delay=args.start_delay)
+        try:
+            coordinator.start()
+        except (OSError, RuntimeError) as e:
+            default_log(f"Could not start agents: {e}", logging.ERROR)
+            coordinator.stop()
+            return EXIT_FAILED
+        
+        aborted = False
+        signal.signal(signal.SIGTERM, lambda signum, frame: coordinator.stop())
+        try:
+            while coordinator.poll():
+                default_log(coordinator.progress(), logging.DEBUG)
+                time.sleep(coordinator.poll_interval)
+        except KeyboardInterrupt:
+            default_log("Interrupted, stopping agents...")
+            aborted = True
+            coordinator.stop()
+            while coordinator.poll():
+                time.sleep(coordinator.poll_interval)
+        
+        report = coordinator.aggregate()
+        for agent, status in report['summary']['agents'].items():
+            default_log(f"Agent {agent}: {status}", logging.INFO if status == "completed" else logging.ERROR)
+        if report['summary']['cpu_rate_total'] is not None:
+            default_log(f"Total CPU rate: {format_rate(report['summary']['cpu_rate_total'])}/s")
+        if report['summary']['disk_mbps_total'] is not None:
+            default_log(f"Total disk throughput: {report['summary']['disk_mbps_total']:.1f} MB/s")
+        
+        path = args.report or "coordinated_report.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        default_log(f"Aggregated report written to {path}")
+        
+        if aborted:
+            return EXIT_ABORTED
+        return EXIT_OK if report['status'] == "completed" else EXIT_FAILED
+    finally:
+        listener.stop()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.replay:
+        sys.exit(run_replay(args))
+    if args.agent:
+        sys.exit(run_agent(args))
+    if args.coordinate:
+        sys.exit(run_coordinator(args))
+    if args.headless:
+        sys.exit(run_headless(args))
+    if tk is None:
+        print("tkinter is not available: install python3-tk or run with --headless", file=sys.stderr)
+        sys.exit(EXIT_FAILED)
+    
     root = tk.Tk()
-    app = PCStressTester(root)
+    app = PCStressTester(root, log_file=args.log_file or None)
     
     # Обработка закрытия окна
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
@@ -0,0 +1,598 @@
+import calendar
+import csv
+import socket
+import time
+import zoneinfo
+
+import pytest
+
+import Clock
+from Clock import (BIG_HEIGHT, LAG_BUCKET_NS, LAG_RANGE_NS, NS_PER_SECOND, ZONE_HORIZON_S, ClockFormatter,
+                   LapTimer, SNTPClient, SNTPServer, TerminalScreen, TickLagRecorder, TickScheduler, TimeSource,
+                   WorldClock, ZoneOffset, big_text, changed_span, format_duration, next_transition, ns_to_ntp,
+                   ntp_to_ns, zone_state)
+
+MS = 1_000_000
+DAY = 86400 * NS_PER_SECOND
+
+
+@pytest.fixture
+def timezone(monkeypatch):
+    """Часовой пояс процесса на время теста"""
+    def use(name):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+    yield use
+    monkeypatch.undo()
+    time.tzset()
+
+
+# TimeSource / SNTP
+
+class FakeClocks:
+    """Монотонный счётчик и настенные часы, которые тест двигает сам"""
+    
+    def __init__(self):
+        self.perf = 10 * NS_PER_SECOND
+        self.wall_offset = 1_700_000_000 * NS_PER_SECOND
+    
+    def perf_counter_ns(self):
+        return self.perf
+    
+    def time_ns(self):
+        return self.perf + self.wall_offset
+
+
+@pytest.fixture
+def clocks(monkeypatch):
+    fake = FakeClocks()
+    monkeypatch.setattr(Clock.time, "perf_counter_ns", fake.perf_counter_ns)
+    monkeypatch.setattr(Clock.time, "time_ns", fake.time_ns)
+    return fake
+
+
+def test_time_source_follows_counter(clocks):
+    source = TimeSource()
+    assert source.wall_offset_ns == clocks.wall_offset
+    assert source.uncertainty_ns == 1
+    clocks.perf += 123 * MS
+    assert source.now_ns() == clocks.time_ns()
+    assert source.check() is None
+
+
+def test_time_source_detects_step(clocks):
+    source = TimeSource()
+    clocks.perf += NS_PER_SECOND
+    source.check()
+    clocks.wall_offset += 100 * MS  # перевод часов
+    assert source.check() == 'step'
+    assert source.events[-1][1:] == ('step', 100 * MS)
+    assert source.anchors == 2
+    assert source.now_ns() == clocks.time_ns()
+    assert len(source.checks) == 0
+
+
+def test_time_source_detects_slew_and_rate(clocks):
+    source = TimeSource()
+    results = []
+    for _ in range(6):
+        clocks.perf += NS_PER_SECOND
+        clocks.wall_offset += MS  # системные часы подстраиваются на 1 мс/с
+        results.append(source.check())
+    assert results == [None] * 5 + ['slew']
+    assert source.slew_ppm == pytest.approx(1000)
+    assert source.events[-1][1:] == ('slew', 6 * MS)
+    assert source.now_ns() == clocks.time_ns()
+
+
+def test_ntp_timestamp_round_trip():
+    for ns in (0, 1_700_000_000 * NS_PER_SECOND + 123_456_789, NS_PER_SECOND - 1):
+        assert abs(ntp_to_ns(*ns_to_ntp(ns)) - ns) <= 1
+    assert ns_to_ntp(0) == (2_208_988_800, 0)
+    assert ns_to_ntp(NS_PER_SECOND // 2)[1] == 1 << 31
+
+
+def test_sntp_round_trip_measures_server_offset():
+    server = SNTPServer(offset_ns=250 * MS)
+    server.start()
+    try:
+        client = SNTPClient(server.address, TimeSource(), timeout=2.0)
+        for _ in range(4):
+            assert client.poll() is not None
+    finally:
+        server.stop()
+    offset, delay, jitter = client.stats()
+    assert offset == pytest.approx(250 * MS, abs=5 * MS)
+    assert 0 <= delay < 50 * MS
+    assert jitter < 5 * MS
+    assert client.last_error is None
+    client.reset()
+    assert client.stats() is None
+
+
+def test_sntp_timeout_is_reported():
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(("127.0.0.1", 0))
+    try:
+        client = SNTPClient("%s:%d" % silent.getsockname(), TimeSource(), timeout=0.1)
+        assert client.poll() is None
+    finally:
+        silent.close()
+    assert client.last_error
+    assert client.stats() is None
+
+
+# ClockFormatter
+
+def test_formatter_first_update_fills_all_fields(timezone):
+    timezone("UTC")
+    formatter = ClockFormatter()
+    wall = DAY + (3661 * NS_PER_SECOND) + 123_456_789
+    changed = formatter.update(wall)
+    assert set(changed) == set(ClockFormatter.FIELDS)
+    values = formatter.values
+    assert values['time'] == "01:01:01.123"
+    assert values['unix'] == "90061.123"
+    assert values['date_iso'] == "1970-01-02"
+    assert values['tz'] == "UTC"
+    assert values['hour'] == 1
+
+
+def test_formatter_reports_only_changed_fields(timezone):
+    timezone("UTC")
+    formatter = ClockFormatter()
+    wall = DAY + 3599 * NS_PER_SECOND + 998 * MS
+    formatter.update(wall)
+    assert formatter.update(wall + 100) == []
+    assert formatter.update(wall + MS) == ['time', 'unix']
+    # Смена часа
+    changed = formatter.update(wall + 2 * MS)
+    assert sorted(changed) == ['hour', 'time', 'unix']
+    assert formatter.values['time'] == "01:00:00.000"
+
+
+def test_formatter_rolls_over_date_at_midnight(timezone):
+    timezone("UTC")
+    formatter = ClockFormatter()
+    formatter.update(2 * DAY - MS)
+    assert formatter.values['time'] == "23:59:59.999"
+    changed = formatter.update(2 * DAY)
+    assert {'date', 'date_iso', 'date_full', 'hour'} <= set(changed)
+    assert formatter.values['date_iso'] == "1970-01-03"
+    assert formatter.values['time'] == "00:00:00.000"
+
+
+def test_formatter_applies_local_offset(timezone):
+    timezone("Etc/GMT-3")  # UTC+3
+    formatter = ClockFormatter()
+    formatter.update(DAY - NS_PER_SECOND)
+    assert formatter.offset_s == 3 * 3600
+    assert formatter.values['time'] == "02:59:59.000"
+    assert formatter.values['date_iso'] == "1970-01-02"
+    assert formatter.values['unix'] == "86399.000"
+    assert formatter.values['tz'] == "+03"
+
+
+def test_formatter_follows_offset_change(timezone):
+    timezone("UTC")
+    formatter = ClockFormatter()
+    formatter.update(DAY)
+    timezone("Etc/GMT+5")  # UTC-5
+    # Смещение перечитывается не чаще раза в 15 минут
+    formatter.update(DAY + NS_PER_SECOND)
+    assert formatter.values['time'] == "00:00:01.000"
+    changed = formatter.update(DAY + 15 * 60 * NS_PER_SECOND)
+    assert 'tz' in changed and 'date_iso' in changed
+    assert formatter.values['time'] == "19:15:00.000"
+    assert formatter.values['date_iso'] == "1970-01-01"
+
+
+# TickLagRecorder
+
+PERIOD = 10 * MS
+
+
+def record_lags(recorder, lags, skipped=0):
+    for i, lag in enumerate(lags):
+        due = i * PERIOD
+        recorder.record(due, due + lag, skipped)
+
+
+def test_lag_percentiles_from_histogram():
+    recorder = TickLagRecorder()
+    record_lags(recorder, [i * LAG_BUCKET_NS + 1 for i in range(100)])
+    assert recorder.count == 100
+    assert recorder.max_lag == 99 * LAG_BUCKET_NS + 1
+    # Верхняя граница корзины, но не больше максимума
+    assert recorder.percentiles() == [50 * LAG_BUCKET_NS, 90 * LAG_BUCKET_NS,
+                                      99 * LAG_BUCKET_NS, 99 * LAG_BUCKET_NS + 1]
+    assert recorder.percentiles((99, 50)) == [50 * LAG_BUCKET_NS, 99 * LAG_BUCKET_NS]
+
+
+def test_lag_percentiles_empty_and_overflow():
+    recorder = TickLagRecorder()
+    assert recorder.percentiles() == [0, 0, 0, 0]
+    record_lags(recorder, [0] * 9 + [3 * LAG_RANGE_NS])
+    assert recorder.percentiles((50, 99.9)) == [LAG_BUCKET_NS, 3 * LAG_RANGE_NS]
+
+
+def test_lag_counts_missed_ticks_and_stalls():
+    recorder = TickLagRecorder()
+    recorder.record(0, 100, 0)
+    recorder.record(PERIOD, PERIOD + 100, 2)
+    recorder.record(4 * PERIOD, 4 * PERIOD + 100, 1)
+    assert recorder.missed == 3
+    assert recorder.max_stall == 3 * PERIOD
+    assert recorder.stall_at == 4 * PERIOD + 100
+    # После resume() пауза простоем не считается
+    recorder.resume()
+    recorder.record(100 * PERIOD, 100 * PERIOD, 0)
+    assert recorder.max_stall == 3 * PERIOD
+
+
+def test_lag_ring_keeps_latest_ticks():
+    recorder = TickLagRecorder(log_ticks=4)
+    record_lags(recorder, [1, 2, 3, 4, 5, 6])
+    assert list(recorder.recent()) == [(i * PERIOD, i * PERIOD + i + 1, 0) for i in range(2, 6)]
+
+
+def test_lag_export_csv(tmp_path):
+    recorder = TickLagRecorder()
+    record_lags(recorder, [1500, 2500], skipped=1)
+    path = tmp_path / "lag.csv"
+    recorder.export_csv(str(path), wall_offset_ns=NS_PER_SECOND)
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["due_unix_ns", "run_unix_ns", "lag_us", "missed"],
+                    [str(NS_PER_SECOND), str(NS_PER_SECOND + 1500), "1.5", "1"],
+                    [str(NS_PER_SECOND + PERIOD), str(NS_PER_SECOND + PERIOD + 2500), "2.5", "1"]]
+
+
+def test_lag_reset():
+    recorder = TickLagRecorder()
+    record_lags(recorder, [LAG_BUCKET_NS] * 5, skipped=1)
+    recorder.reset()
+    assert (recorder.count, recorder.missed, recorder.max_lag, recorder.max_stall) == (0, 0, 0, 0)
+    assert not any(recorder.histogram)
+    assert list(recorder.recent()) == []
+
+
+# TickScheduler
+
+class FakeRoot:
+    """Таймеры Tk без цикла событий: вызываются вручную"""
+    
+    def __init__(self):
+        self.pending = {}
+        self.last_id = 0
+    
+    def after(self, delay_ms, callback):
+        self.last_id += 1
+        self.pending[self.last_id] = callback
+        return self.last_id
+    
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+    
+    def fire(self):
+        assert len(self.pending) == 1
+        _, callback = self.pending.popitem()
+        callback()
+
+
+class FixedSource:
+    wall_offset_ns = 0
+
+
+def scheduler_with(counter, callback, refresh_hz=100):
+    root = FakeRoot()
+    scheduler = TickScheduler(root, callback, FixedSource(), refresh_hz)
+    scheduler.start()
+    return root, scheduler
+
+
+def test_scheduler_ticks_on_period_grid(counter):
+    ticks = []
+    root, scheduler = scheduler_with(counter, lambda due, now: ticks.append(due))
+    first = scheduler.due_ns
+    assert first % PERIOD == 0 and first > counter.now
+    counter.now = first + 100
+    root.fire()
+    counter.now = first + 3 * PERIOD + 100  # два тика пропущено
+    root.fire()
+    assert ticks == [first, first + PERIOD]
+    assert scheduler.due_ns == first + 4 * PERIOD
+    assert scheduler.stats()[3] == 2
+
+
+def test_scheduler_rearms_after_callback_error(counter):
+    calls = []
+    
+    def callback(due, now):
+        calls.append(due)
+        if len(calls) == 1:
+            raise RuntimeError("display failed")
+    
+    root, scheduler = scheduler_with(counter, callback)
+    first = scheduler.due_ns
+    counter.now = first
+    with pytest.raises(RuntimeError, match="display failed"):
+        root.fire()
+    assert len(root.pending) == 1
+    assert scheduler.due_ns == first + PERIOD
+    counter.now = first + PERIOD
+    root.fire()
+    assert calls == [first, first + PERIOD]
+
+
+def test_scheduler_callback_stop_and_restart_win(counter):
+    root, scheduler = scheduler_with(counter, lambda due, now: scheduler.stop())
+    counter.now = scheduler.due_ns
+    root.fire()
+    assert root.pending == {}
+    
+    def restart(due, now):
+        scheduler.set_rate(50)
+        raise RuntimeError("after restart")
+    
+    root, scheduler = scheduler_with(counter, restart)
+    counter.now = scheduler.due_ns
+    with pytest.raises(RuntimeError):
+        root.fire()
+    assert len(root.pending) == 1
+    assert scheduler.period_ns == 2 * PERIOD
+
+
+# LapTimer
+
+class FakeCounter:
+    def __init__(self):
+        self.now = 1_000_000
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    fake = FakeCounter()
+    monkeypatch.setattr(Clock.time, "perf_counter_ns", fake)
+    return fake
+
+
+def test_laps_and_splits_skip_pauses(counter):
+    timer = LapTimer()
+    timer.start()
+    counter.now += 100
+    assert timer.lap() == 100
+    counter.now += 300
+    assert timer.lap() == 300
+    timer.stop()
+    counter.now += 1000  # пауза в круг не входит
+    assert timer.elapsed_ns() == 400
+    timer.start()
+    counter.now += 200
+    assert timer.elapsed_ns() == 600
+    assert timer.lap() == 200
+    assert list(timer.laps) == [100, 300, 200]
+    assert list(timer.splits) == [100, 400, 600]
+
+
+def test_lap_statistics(counter):
+    timer = LapTimer()
+    timer.start()
+    for duration in (100, 300, 200):
+        counter.now += duration
+        timer.lap()
+    assert (timer.min_ns, timer.max_ns) == (100, 300)
+    assert timer.mean == pytest.approx(200)
+    assert timer.stddev() == pytest.approx(100)
+
+
+def test_lap_stddev_needs_two_laps(counter):
+    timer = LapTimer()
+    assert timer.stddev() == 0.0
+    timer.start()
+    counter.now += 50
+    timer.lap()
+    assert timer.stddev() == 0.0
+
+
+def test_start_and_stop_are_idempotent(counter):
+    timer = LapTimer()
+    timer.start()
+    counter.now += 100
+    timer.start()
+    counter.now += 100
+    timer.stop()
+    timer.stop()
+    assert timer.elapsed_ns() == 200
+
+
+def test_lap_timer_reset(counter):
+    timer = LapTimer()
+    timer.start()
+    counter.now += 100
+    timer.lap()
+    timer.reset()
+    assert not timer.running
+    assert timer.elapsed_ns() == 0
+    assert len(timer.laps) == len(timer.splits) == 0
+    assert timer.min_ns is None and timer.mean == 0.0
+
+
+def test_lap_export_csv(counter, tmp_path):
+    timer = LapTimer()
+    timer.start()
+    for duration in (100, 250):
+        counter.now += duration
+        timer.lap()
+    path = tmp_path / "laps.csv"
+    timer.export_csv(str(path))
+    with open(path, newline="") as f:
+        assert list(csv.reader(f)) == [["lap", "lap_ns", "split_ns"], ["1", "100", "100"], ["2", "250", "350"]]
+
+
+def test_format_duration():
+    assert format_duration(0) == "0:00:00.000"
+    assert format_duration(3661 * NS_PER_SECOND + 5 * MS) == "1:01:01.005"
+    assert format_duration(59 * NS_PER_SECOND + 999_999_999, digits=1) == "0:00:59.9"
+
+
+# WorldClock
+
+def test_world_clock_skips_unknown_zones():
+    world = WorldClock(("Europe/London", "Mars/Olympus_Mons", "Asia/Tokyo"))
+    assert [zone.name for zone in world.zones] == ["Europe/London", "Asia/Tokyo"]
+    assert world.missing == ["Mars/Olympus_Mons"]
+    assert world.update(DAY) == [0, 1]
+    assert world.times == ["01:00:00", "09:00:00"]
+
+
+def utc(*fields):
+    return calendar.timegm(fields + (0,) * (6 - len(fields)))
+
+
+@pytest.mark.parametrize("name, before, after, offsets", [
+    ("Europe/London", utc(2024, 3, 1), utc(2024, 3, 31, 1), (0, 3600)),
+    ("Europe/London", utc(2024, 8, 1), utc(2024, 10, 27, 1), (3600, 0)),
+    ("America/New_York", utc(2024, 1, 15), utc(2024, 3, 10, 7), (-5 * 3600, -4 * 3600)),
+    ("America/New_York", utc(2024, 7, 4), utc(2024, 11, 3, 6), (-4 * 3600, -5 * 3600)),
+    ("Australia/Sydney", utc(2024, 2, 1), utc(2024, 4, 6, 16), (11 * 3600, 10 * 3600)),
+    ("Australia/Sydney", utc(2024, 6, 1), utc(2024, 10, 5, 16), (10 * 3600, 11 * 3600)),
+    ("Pacific/Chatham", utc(2024, 1, 1), utc(2024, 4, 6, 14), (13 * 3600 + 2700, 12 * 3600 + 2700)),
+    ("Pacific/Chatham", utc(2024, 5, 1), utc(2024, 9, 28, 14), (12 * 3600 + 2700, 13 * 3600 + 2700)),
+])
+def test_next_transition_finds_dst_change(name, before, after, offsets):
+    zone = zoneinfo.ZoneInfo(name)
+    state = zone_state(zone, before)
+    assert state[0] == offsets[0]
+    assert next_transition(zone, before, state) == after
+    assert zone_state(zone, after - 1) == state
+    assert zone_state(zone, after)[0] == offsets[1]
+
+
+def test_next_transition_without_dst_stops_at_horizon():
+    zone = zoneinfo.ZoneInfo("Asia/Tokyo")
+    start = utc(2024, 1, 1)
+    assert next_transition(zone, start, zone_state(zone, start)) == start + ZONE_HORIZON_S
+
+
+def test_zone_offset_label_and_validity():
+    zone = ZoneOffset("Pacific/Chatham")
+    zone.refresh(utc(2024, 1, 1))
+    assert zone.city == "Chatham"
+    assert zone.label == "UTC+13:45 +1345"
+    assert zone.until_s == utc(2024, 4, 6, 14)
+    zone = ZoneOffset("America/St_Johns")
+    zone.refresh(utc(2024, 1, 1))
+    assert zone.label == "UTC-03:30 NST"
+
+
+def test_world_clock_caches_offset_until_transition(monkeypatch):
+    world = WorldClock(("America/New_York", "Europe/London"))
+    refreshes = []
+    original = ZoneOffset.refresh
+    
+    def counting(zone, utc_s):
+        refreshes.append((zone.name, utc_s))
+        original(zone, utc_s)
+    
+    monkeypatch.setattr(ZoneOffset, "refresh", counting)
+    change = utc(2024, 3, 10, 7)
+    start = change - 3
+    assert world.update(start * NS_PER_SECOND) == [0, 1]
+    assert world.update(start * NS_PER_SECOND + 500 * MS) is None
+    assert world.update((start + 1) * NS_PER_SECOND) == []
+    assert world.times[0] == "01:59:58"
+    assert len(refreshes) == 2  # на тиках внутри действия смещения поясов не перечитываем
+    
+    world.update((change - 1) * NS_PER_SECOND)
+    assert world.times[0] == "01:59:59"
+    # Переход: смещение и подпись обновились, дата пояса отмечена изменившейся
+    assert world.update(change * NS_PER_SECOND) == [0]
+    assert world.times[0] == "03:00:00"
+    assert world.zones[0].label == "UTC-04:00 EDT"
+    assert world.zones[0].until_s == utc(2024, 11, 3, 6)
+    assert refreshes[-1] == ("America/New_York", change)
+    assert len(refreshes) == 3
+    assert world.times[1] == "07:00:00"
+
+
+def test_world_clock_shares_text_between_equal_offsets():
+    world = WorldClock(("Europe/Paris", "Europe/Berlin", "Asia/Tokyo"))
+    world.update(utc(2024, 12, 31, 23, 30) * NS_PER_SECOND)
+    assert world.times[0] is world.times[1]
+    assert world.times == ["00:30:00", "00:30:00", "08:30:00"]
+    assert world.dates == ["Ср 01.01", "Ср 01.01", "Ср 01.01"]
+
+
+# Терминальный режим
+
+def test_changed_span():
+    assert changed_span("12:00:00", "12:00:00") is None
+    assert changed_span("12:00:00", "12:00:01") == (7, 8)
+    assert changed_span("12:00:09", "12:00:10") == (6, 8)
+    assert changed_span("abcdef", "aXcdeY") == (1, 6)
+    # Длина изменилась - перерисовывается всё от первого отличия
+    assert changed_span("9.5 ms", "10.5 ms") == (0, 7)
+    assert changed_span("10 ms", "10 ms ") == (5, 6)
+    assert changed_span("10 ms ", "10 ms") == (5, 5)
+
+
+def test_big_text():
+    lines = big_text("1:2")
+    assert len(lines) == BIG_HEIGHT
+    assert lines == ["  █   ███",
+                     "  █ █   █",
+                     "  █   ███",
+                     "  █ █ █  ",
+                     "  █   ███"]
+    assert big_text("") == [""] * BIG_HEIGHT
+    # Смена одной цифры меняет в крупных строках только её столбцы
+    spans = {changed_span(old, new) for old, new in zip(big_text("12:00"), big_text("12:01"))}
+    assert spans - {None} and all(14 <= start < end <= 17 for start, end in spans - {None})
+
+
+class FakeScreen:
+    """stdscr curses: размер и журнал вызовов addstr"""
+    
+    def __init__(self, height, width):
+        self.size = (height, width)
+        self.writes = []
+    
+    def getmaxyx(self):
+        return self.size
+    
+    def erase(self):
+        self.writes.append('erase')
+    
+    def addstr(self, row, column, text, attr=0):
+        self.writes.append((row, column, text))
+
+
+def test_terminal_screen_writes_only_changes():
+    stdscr = FakeScreen(3, 10)
+    screen = TerminalScreen(stdscr)
+    stdscr.writes.clear()
+    screen.put(0, "12:00:00")
+    assert stdscr.writes == [(0, 0, "12:00:00")]
+    screen.put(0, "12:00:00")
+    screen.put(0, "12:00:07")
+    screen.put(5, "off screen")
+    assert stdscr.writes[1:] == [(0, 7, "7")]
+    screen.put(1, "a much longer line")
+    assert stdscr.writes[-1] == (1, 0, "a much lon")
+    assert screen.lines[1] == "a much lon"
+
+
+def test_terminal_screen_resize_redraws_everything():
+    stdscr = FakeScreen(3, 10)
+    screen = TerminalScreen(stdscr)
+    screen.put(0, "12:00:00")
+    stdscr.size = (3, 14)
+    screen.resize()
+    assert screen.lines == [" " * 14] * 3
+    stdscr.writes.clear()
+    screen.put(0, "12:00:00")
+    assert stdscr.writes == [(0, 0, "12:00:00")]
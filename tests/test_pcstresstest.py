@@ -0,0 +1,640 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pcstresstest import (MEMTEST_PATTERNS, Coordinator, DecimatedSeries, LoadProfile, MemoryRegion, RingBuffer,
+                          SafetyGovernor, SessionRecorder, SessionRecording, StressAgent, StressEngine,
+                          analyze_throttling, compare_benchmarks, decimate, detect_cache_boundaries, find_baseline,
+                          http_json, load_benchmark_results, memtest_pattern, save_benchmark_result, summarize,
+                          validate_settings)
+
+
+def profile(*phases):
+    return LoadProfile({'phases': list(phases)})
+
+
+# memtest
+
+@pytest.fixture
+def region():
+    """Область в 100 слов с кусками по 8 слов, чтобы проверка шла через границы кусков"""
+    memory = MemoryRegion(800, chunk_bytes=64)
+    yield memory
+    memory.close()
+
+
+def test_memtest_patterns():
+    ones = memtest_pattern("walking_ones", 62, 4, 0, 0)
+    assert ones.tolist() == [1 << 62, 1 << 63, 1, 2]
+    assert memtest_pattern("walking_ones", 0, 1, 5, 0).tolist() == [1 << 5]
+    board = memtest_pattern("checkerboard", 0, 2, 0, 0)
+    assert board.tolist() == [0xAAAAAAAAAAAAAAAA, 0x5555555555555555]
+    assert memtest_pattern("checkerboard", 0, 2, 1, 0).tolist() == board.tolist()[::-1]
+    assert memtest_pattern("address", 10, 2, 0, 0).tolist() == [80, 88]
+    assert memtest_pattern("address", 10, 2, 1, 0).tolist() == [~80 & (2**64 - 1), ~88 & (2**64 - 1)]
+    random = memtest_pattern("random", 0, 64, 0, 7)
+    assert random.tolist() == memtest_pattern("random", 0, 64, 0, 7).tolist()
+    assert random.tolist() != memtest_pattern("random", 0, 64, 0, 8).tolist()
+    assert random.tolist() != memtest_pattern("random", 0, 64, 1, 7).tolist()
+    with pytest.raises(ValueError, match="Unknown memtest pattern"):
+        memtest_pattern("zeros", 0, 1, 0, 0)
+
+
+@pytest.mark.parametrize("pattern", MEMTEST_PATTERNS)
+def test_memtest_clean_pass(region, pattern):
+    for cycle in range(2):
+        assert region.write_pattern(pattern, cycle, seed=3, base_word=1000)
+        assert region.verify_pattern(pattern, cycle, seed=3, base_word=1000) == (0, [])
+
+
+@pytest.mark.parametrize("pattern", MEMTEST_PATTERNS)
+def test_memtest_detects_bit_flip(region, pattern):
+    region.write_pattern(pattern, 1, seed=3, base_word=1000)
+    expected = int(region.data[37])
+    region.data[37] ^= np.uint64(1 << 17)
+    mismatches, samples = region.verify_pattern(pattern, 1, seed=3, base_word=1000)
+    assert mismatches == 1
+    assert samples == [((1000 + 37) * 8, expected, expected ^ (1 << 17))]
+    # Другой цикл - другой шаблон: старое содержимое уже не совпадает
+    assert region.verify_pattern(pattern, 2, seed=3, base_word=1000)[0] > 0
+
+
+def test_memtest_limits_samples(region):
+    region.write_pattern("checkerboard", 0, seed=0)
+    region.data[:20] = 0
+    mismatches, samples = region.verify_pattern("checkerboard", 0, seed=0, max_samples=16)
+    assert mismatches == 20
+    assert [offset for offset, _, _ in samples] == [word * 8 for word in range(16)]
+
+
+def test_memtest_stops_on_request(region):
+    assert region.write_pattern("address", 0, 0, should_stop=lambda: True) is False
+    assert region.verify_pattern("address", 0, 0, should_stop=lambda: True) is None
+
+
+# detect_cache_boundaries
+
+def sweep_points(latency, gbps=None):
+    sizes = [16 * 1024 << i for i in range(len(latency))]
+    gbps = gbps or [100.0] * len(latency)
+    return [{'size': size, 'ns_per_access': ns, 'gbps': bw} for size, ns, bw in zip(sizes, latency, gbps)]
+
+
+def test_cache_boundaries_at_latency_steps():
+    points = sweep_points([0.5, 0.5, 0.5, 8, 8, 8, 8, 30, 30, 30, 100, 100, 100])
+    boundaries = detect_cache_boundaries(points)
+    assert boundaries == [{'level': "L1", 'size': points[2]['size']},
+                          {'level': "L2", 'size': points[6]['size']},
+                          {'level': "L3", 'size': points[9]['size']}]
+
+
+def test_cache_boundaries_ignore_noise():
+    assert detect_cache_boundaries(sweep_points([1, 1, 40, 1, 1, 1])) == []
+    # Кратный, но меньше min_jump_ns скачок - шум замера
+    assert detect_cache_boundaries(sweep_points([0.1, 0.1, 0.1, 2, 2, 2])) == []
+    assert detect_cache_boundaries(sweep_points([1])) == []
+
+
+def test_cache_boundaries_merge_gradual_transition():
+    points = sweep_points([1, 1, 1, 10, 20, 40, 40, 40, 40])
+    assert detect_cache_boundaries(points) == [{'level': "L1", 'size': points[2]['size']}]
+
+
+def test_cache_boundaries_from_bandwidth_drop():
+    points = sweep_points([1] * 6, gbps=[100, 100, 100, 50, 50, 50])
+    assert detect_cache_boundaries(points) == [{'level': "L1", 'size': points[2]['size']}]
+
+
+# Бенчмарки: summarize / compare_benchmarks / find_baseline
+
+def test_summarize():
+    stats = summarize([12.0, 10.0, 11.0, 9.0, 13.0])
+    assert stats == {'median': 11.0, 'min': 9.0, 'max': 13.0, 'stdev': pytest.approx(2 ** 0.5),
+                     'spread_pct': pytest.approx(4 / 11 * 100), 'iterations': 5}
+    assert summarize([]) is None
+    assert summarize([0.0, 0.0])['spread_pct'] == 0.0
+
+
+def run(metrics, run_id="r"):
+    return {'id': run_id, 'metrics': {name: summarize(values) for name, values in metrics.items()}}
+
+
+def test_compare_flags_regressions_by_direction():
+    baseline = run({'single_core': [100.0], 'memory_load_latency': [80.0], 'memory_bandwidth': [20.0]})
+    current = run({'single_core': [90.0], 'memory_load_latency': [90.0], 'memory_bandwidth': [20.5]})
+    rows = {row['name']: row for row in compare_benchmarks(current['metrics'], baseline, tolerance_pct=5.0)}
+    assert set(rows) == {'single_core', 'memory_load_latency', 'memory_bandwidth'}
+    assert rows['single_core']['change_pct'] == pytest.approx(-10.0)
+    assert rows['single_core']['regression']
+    # Для задержки хуже - больше
+    assert rows['memory_load_latency']['change_pct'] == pytest.approx(12.5)
+    assert rows['memory_load_latency']['regression']
+    assert not rows['memory_bandwidth']['regression']
+    assert rows['memory_bandwidth']['unit'] == "GB/s"
+    
+    faster = run({'single_core': [120.0], 'memory_load_latency': [60.0]})
+    assert not any(row['regression'] for row in compare_benchmarks(faster['metrics'], baseline, 5.0))
+
+
+def test_compare_skips_missing_zero_and_cached_metrics():
+    baseline = run({'single_core': [0.0], 'all_core': [100.0], 'disk_throughput': [500.0]})
+    current = run({'single_core': [10.0], 'disk_throughput': [100.0], 'memory_bandwidth': [10.0]})
+    rows = compare_benchmarks(current['metrics'], baseline, 5.0)
+    assert [row['name'] for row in rows] == ['disk_throughput']
+    assert rows[0]['regression']
+    current['metrics']['disk_throughput']['cached'] = True
+    assert compare_benchmarks(current['metrics'], baseline, 5.0) == []
+    current['metrics']['disk_throughput']['cached'] = False
+    baseline['metrics']['disk_throughput']['cached'] = True
+    assert compare_benchmarks(current['metrics'], baseline, 5.0) == []
+
+
+def test_find_baseline():
+    runs = [{'id': "a"}, {'id': "b"}, {'id': "c"}]
+    assert find_baseline(runs, "last") is runs[-1]
+    assert find_baseline(runs, "b") is runs[1]
+    assert find_baseline(runs, "0") is runs[0]
+    assert find_baseline(runs, "-2") is runs[1]
+    assert find_baseline(runs, "7") is None
+    assert find_baseline(runs, "nope") is None
+    assert find_baseline(runs, None) is None
+    assert find_baseline([], "last") is None
+
+
+def test_benchmark_results_file_round_trip(tmp_path):
+    path = str(tmp_path / "results.json")
+    assert load_benchmark_results(path) == []
+    save_benchmark_result(path, {'id': "a"})
+    save_benchmark_result(path, {'id': "b"})
+    assert [entry['id'] for entry in load_benchmark_results(path)] == ["a", "b"]
+
+
+# SafetyGovernor
+
+class FakeEngine:
+    """Цели, потолки и набор нагруженных ресурсов без запуска нагрузки"""
+    
+    effective_target = StressEngine.effective_target
+    set_cap = StressEngine.set_cap
+    
+    def __init__(self, loaded, cpu=0, ram=0, io=None, ram_mode="stream", disk_mbps=None):
+        self.loaded = loaded
+        self.targets = {'cpu': cpu, 'ram': ram, 'io': io}
+        self.caps = {'cpu': 100.0, 'ram': 100.0, 'io': None}
+        self.settings = {'ram_mode': ram_mode}
+        self.disk_stats = {'mbps': disk_mbps} if disk_mbps is not None else None
+        self.cpu_controller = None
+        self.disk_stress = None
+        self.start_time = time.time()
+        self.aborted = None
+    
+    def abort(self, reason):
+        self.aborted = reason
+
+
+TELEMETRY_COLUMNS = ('time', 'mem_available', 'swap_in', 'load1', 'temp')
+
+
+def governor_for(engine, **options):
+    sampler = SimpleNamespace(column_index={name: i for i, name in enumerate(TELEMETRY_COLUMNS)},
+                              cpu_temperature=lambda row: row[4])
+    options.setdefault('cooldown', 0.0)
+    return SafetyGovernor(engine, sampler, max_temp=90, critical_temp=100, min_available_mb=512,
+                          max_load_per_cpu=1000, log=lambda *args: None, **options)
+
+
+def telemetry(temp=50.0, available_mb=4096, swap_in=(0.0, 0.0), load=0.0):
+    now = time.time()
+    return np.array([[now - 1, available_mb * 2**20, swap_in[0], load, temp],
+                     [now, available_mb * 2**20, swap_in[1], load, temp]])
+
+
+def test_governor_throttles_cpu_before_aborting():
+    engine = FakeEngine(['cpu'], cpu=50)
+    governor = governor_for(engine)
+    governor.check(telemetry(temp=95))
+    assert engine.caps['cpu'] == 30
+    governor.check(telemetry(temp=95))
+    assert engine.caps['cpu'] == 10 and engine.aborted is None
+    governor.check(telemetry(temp=95))
+    assert engine.aborted == "safety: CPU temperature 95°C above 90°C, load cannot be reduced further"
+    assert [event['action'] for event in governor.interventions] == ["throttle", "throttle", "abort"]
+    assert governor.interventions[0]['reason'] == "CPU temperature 95°C above 90°C: CPU capped at 30%"
+
+
+def test_governor_throttles_ram_only_run_on_temperature():
+    # Тест памяти без нагрузки CPU: перегрев снижает долю памяти, а не прерывает тест
+    engine = FakeEngine(['ram'], cpu=0, ram=50)
+    governor = governor_for(engine)
+    governor.check(telemetry(temp=95))
+    assert engine.aborted is None
+    assert engine.caps == {'cpu': 100.0, 'ram': 40, 'io': None}
+
+
+def test_governor_throttles_every_loaded_resource():
+    engine = FakeEngine(['cpu', 'ram', 'io'], cpu=10, ram=50, disk_mbps=200.0)
+    governor = governor_for(engine)
+    governor.check(telemetry(temp=95))
+    # CPU уже ниже шага - снижаются память и диск (от достигнутой скорости)
+    assert engine.caps == {'cpu': 100.0, 'ram': 40, 'io': 150.0}
+    assert engine.effective_target('io') == 150.0
+    assert governor.interventions[-1]['reason'].endswith("RAM capped at 40%, IO capped at 150 MB/s")
+
+
+def test_governor_aborts_when_nothing_can_be_reduced():
+    engine = FakeEngine(['ram', 'io'], ram=50, io=0.5, ram_mode="verify")
+    governor_for(engine).check(telemetry(temp=95))
+    assert engine.aborted.endswith("load cannot be reduced further")
+
+
+def test_governor_memory_triggers():
+    engine = FakeEngine(['cpu', 'ram'], cpu=80, ram=50)
+    governor = governor_for(engine)
+    governor.check(telemetry(available_mb=400))
+    # Память снижается только за счёт памяти
+    assert engine.caps == {'cpu': 100.0, 'ram': 40, 'io': None}
+    governor.check(telemetry(swap_in=(0.0, 50e6)))
+    assert engine.caps['ram'] == 30
+    governor.check(telemetry(available_mb=200))
+    assert engine.aborted.startswith("safety: available memory 200 MB below 256 MB")
+
+
+def test_governor_critical_temperature_aborts_at_once():
+    engine = FakeEngine(['cpu'], cpu=80)
+    governor_for(engine).check(telemetry(temp=101))
+    assert engine.caps['cpu'] == 100.0
+    assert engine.aborted == "safety: CPU temperature 101°C reached critical 100°C"
+
+
+def test_governor_waits_for_cooldown():
+    engine = FakeEngine(['cpu'], cpu=80)
+    governor = governor_for(engine, cooldown=60.0)
+    governor.check(telemetry(temp=95))
+    governor.check(telemetry(temp=95))
+    assert engine.caps['cpu'] == 60
+    assert len(governor.interventions) == 1
+
+
+# LoadProfile
+
+def test_profile_phases_are_laid_out_back_to_back():
+    p = profile({'duration': 10, 'cpu': 50}, {'name': "peak", 'duration': 5, 'ram': 30})
+    assert [phase['start'] for phase in p.phases] == [0.0, 10.0]
+    assert [phase['name'] for phase in p.phases] == ["phase 1", "peak"]
+    assert p.duration == 15.0
+    assert p.uses('cpu') and p.uses('ram') and not p.uses('io')
+
+
+def test_profile_phase_at_clamps_to_last_phase():
+    p = profile({'duration': 10}, {'duration': 5})
+    assert p.phase_at(0) == 0
+    assert p.phase_at(9.99) == 0
+    assert p.phase_at(10) == 1
+    assert p.phase_at(100) == 1
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({'phases': []}, "no phases"),
+    ({'phases': [{'cpu': 50}]}, "'duration' in seconds is required"),
+    ({'phases': [{'duration': "long"}]}, "'duration' in seconds is required"),
+    ({'phases': [{'duration': 0}]}, "duration must be positive"),
+    ({'phases': [{'duration': 5, 'cpu': "high"}]}, "phase 1 'cpu'"),
+    ({'phases': [{'duration': 5, 'ram': [10, 20, 30]}]}, "phase 1 'ram'"),
+    ({'phases': [{'duration': 5, 'io': {'low': 0, 'high': 10}}]}, "phase 1 'io'"),
+    ({'phases': [{'duration': 5}, {'duration': 5, 'cpu': {'low': 0, 'high': 10, 'period': 0}}]}, "phase 2 'cpu'"),
+])
+def test_profile_rejects_invalid_schedule(spec, message):
+    with pytest.raises(ValueError, match=message):
+        LoadProfile(spec)
+
+
+def test_profile_constant_targets_and_unset_resources():
+    p = profile({'duration': 10, 'cpu': 40, 'io': 25})
+    assert p.targets_at(3) == {'cpu': 40, 'ram': 0, 'io': 25}
+
+
+def test_profile_ramp_interpolates_within_phase():
+    p = profile({'duration': 10, 'cpu': 10}, {'duration': 10, 'cpu': [0, 100], 'ram': [80, 20]})
+    assert p.targets_at(10)['cpu'] == pytest.approx(0)
+    assert p.targets_at(15)['cpu'] == pytest.approx(50)
+    assert p.targets_at(17.5)['ram'] == pytest.approx(35)
+    # После конца сценария держится конечное значение
+    assert p.targets_at(30)['cpu'] == pytest.approx(100)
+
+
+def test_profile_targets_are_clamped_to_limits():
+    p = profile({'duration': 10, 'cpu': [-20, 150], 'ram': 100, 'io': 5000})
+    assert p.targets_at(0)['cpu'] == 0.0
+    assert p.targets_at(10)['cpu'] == 100
+    assert p.targets_at(0)['ram'] == LoadProfile.LIMITS['ram']
+    assert p.targets_at(0)['io'] == 5000  # у диска верхнего предела нет
+
+
+def test_profile_burst_switches_on_duty_cycle():
+    p = profile({'duration': 5}, {'duration': 20, 'cpu': {'low': 10, 'high': 80, 'period': 4, 'duty': 0.25}})
+    # Период отсчитывается от начала фазы
+    assert [p.targets_at(5 + t)['cpu'] for t in (0, 0.9, 1.0, 3.9, 4.0, 5.5)] == [80, 80, 10, 10, 80, 10]
+
+
+def test_profile_burst_default_duty_is_half():
+    p = profile({'duration': 10, 'ram': {'low': 0, 'high': 50, 'period': 2}})
+    assert [p.targets_at(t)['ram'] for t in (0.5, 1.5, 2.5)] == [50, 0, 50]
+
+
+def test_profile_next_change():
+    p = profile({'duration': 10, 'cpu': 50},
+                {'duration': 10, 'cpu': {'low': 0, 'high': 100, 'period': 4, 'duty': 0.25}},
+                {'duration': 10, 'cpu': [0, 100]})
+    assert p.next_change(3) == 10
+    assert p.next_change(10) == 11
+    assert p.next_change(11.5) == 14
+    assert p.next_change(19) == 20
+    assert p.next_change(25) == pytest.approx(25.1)
+    assert p.next_change(29.95) == 30
+
+
+def test_profile_load_names_profile_after_file(tmp_path):
+    path = tmp_path / "warmup.json"
+    path.write_text('{"phases": [{"duration": 30, "cpu": 20}]}', encoding='utf-8')
+    p = LoadProfile.load(str(path))
+    assert p.name == "warmup"
+    assert p.duration == 30.0
+
+
+# analyze_throttling
+
+def test_throttling_needs_enough_samples():
+    assert analyze_throttling(np.full(5, 3000.0), np.full(5, 100.0), hold=3) is None
+    freq = np.array([3000.0] * 4 + [np.nan] * 10)
+    assert analyze_throttling(freq, np.full(14, 100.0), hold=3) is None
+
+
+def test_throttling_detects_sustained_frequency_drop():
+    freq = np.array([3000.0] * 10 + [2000.0] * 10)
+    load = np.full(20, 100.0)
+    rate = np.array([100.0] * 10 + [60.0] * 10)
+    result = analyze_throttling(freq, load, rate)
+    assert result['peak_mhz'] == 3000.0
+    assert result['sustained_mhz'] == 2000.0
+    assert result['sustained_ratio'] == pytest.approx(2 / 3)
+    assert result['onset'] == 10
+    assert result['throttled_seconds'] == 10
+    assert result['intervals'] == [{'start': 10, 'end': 20, 'mean_mhz': 2000.0}]
+    assert result['lost_work'] == pytest.approx(400.0)
+    assert result['lost_pct'] == pytest.approx(20.0)
+
+
+def test_throttling_ignores_short_dips():
+    freq = np.full(20, 3000.0)
+    freq[5:7] = 1500.0
+    result = analyze_throttling(freq, np.full(20, 100.0), hold=3)
+    assert result['onset'] is None
+    assert result['intervals'] == []
+    assert result['lost_work'] is None
+
+
+def test_throttling_ignores_drop_with_load():
+    # Частота упала вместе с нагрузкой - это простой, а не троттлинг
+    freq = np.array([3000.0] * 10 + [1200.0] * 10)
+    load = np.array([100.0] * 10 + [20.0] * 10)
+    result = analyze_throttling(freq, load)
+    assert result['throttled_seconds'] == 0
+    assert result['typical_load'] == 60.0
+
+
+def test_throttling_skips_missing_samples():
+    freq = np.array([3000.0] * 10 + [np.nan] * 3 + [2000.0] * 10)
+    load = np.full(23, 100.0)
+    result = analyze_throttling(freq, load)
+    assert result['intervals'] == [{'start': 13, 'end': 23, 'mean_mhz': 2000.0}]
+
+
+# decimate / DecimatedSeries
+
+def test_decimate_min_max_per_bucket():
+    times = np.arange(10.0)
+    lows, highs = decimate(times, times * 2, 0, 10, 5)
+    assert lows.tolist() == [0, 4, 8, 12, 16]
+    assert highs.tolist() == [2, 6, 10, 14, 18]
+
+
+def test_decimate_empty_buckets_and_nan_values():
+    times = np.array([0.0, 1.0, 8.0, 9.0])
+    values = np.array([np.nan, 5.0, np.nan, np.nan])
+    lows, highs = decimate(times, values, 0, 10, 5)
+    assert lows[0] == highs[0] == 5.0
+    assert np.isnan(lows[1:]).all() and np.isnan(highs[1:]).all()
+
+
+def test_decimate_window_outside_data():
+    lows, highs = decimate(np.arange(5.0), np.arange(5.0), 100, 110, 4)
+    assert np.isnan(lows).all() and np.isnan(highs).all()
+    lows, highs = decimate(np.array([]), np.array([]), 0, 10, 4)
+    assert np.isnan(lows).all()
+
+
+def test_series_folds_samples_into_buckets():
+    series = DecimatedSeries(buckets=4, width=2, span=4.0)
+    series.add(np.array([0.5, 1.2, 1.8]), np.array([[1.0, 10.0], [3.0, np.nan], [2.0, 30.0]]))
+    lows, highs = series.view()
+    assert lows.shape == highs.shape == (4, 2)
+    # Новейшая корзина - последняя строка
+    assert np.isnan(lows[:2]).all()
+    assert lows[2].tolist() == [1.0, 10.0] and highs[2].tolist() == [1.0, 10.0]
+    assert lows[3].tolist() == [2.0, 30.0] and highs[3].tolist() == [3.0, 30.0]
+
+
+def test_series_merges_into_existing_bucket():
+    series = DecimatedSeries(buckets=4, width=1, span=4.0)
+    series.add(np.array([1.1]), np.array([[5.0]]))
+    series.add(np.array([1.5]), np.array([[2.0]]))
+    series.add(np.array([1.9]), np.array([[9.0]]))
+    lows, highs = series.view()
+    assert lows[-1, 0] == 2.0 and highs[-1, 0] == 9.0
+
+
+def test_series_window_slides_and_drops_old_samples():
+    series = DecimatedSeries(buckets=4, width=1, span=4.0)
+    series.add(np.array([0.5, 1.5, 2.5, 3.5]), np.array([[0.0], [1.0], [2.0], [3.0]]))
+    series.add(np.array([5.5]), np.array([[5.0]]))
+    lows, _ = series.view()
+    # Корзины 0 и 1 выехали из окна, корзина 4 пуста
+    assert lows[:2, 0].tolist() == [2.0, 3.0]
+    assert np.isnan(lows[2, 0]) and lows[3, 0] == 5.0
+    
+    # Отсчёты старше окна отбрасываются, разрыв длиннее окна очищает всё
+    series.add(np.array([0.5, 20.5]), np.array([[7.0], [8.0]]))
+    lows, highs = series.view()
+    assert np.isnan(lows[:3]).all()
+    assert lows[3, 0] == highs[3, 0] == 8.0
+
+
+def test_series_reset_changes_span():
+    series = DecimatedSeries(buckets=10, width=1, span=10.0)
+    series.add(np.array([3.0]), np.array([[1.0]]))
+    series.reset(60.0)
+    assert series.bucket_seconds == 6.0
+    lows, _ = series.view()
+    assert np.isnan(lows).all()
+
+
+# SessionRecorder / SessionRecording
+
+@pytest.fixture
+def recording(tmp_path):
+    """Запись 10 отсчётов блоками по 4 строки; колонки движка - work_rate и пустая disk_mbps"""
+    sampler = SimpleNamespace(columns=['time', 'cpu_total', 'mem_percent'], buffer=RingBuffer(64, 3))
+    path = tmp_path / "session.rec"
+    recorder = SessionRecorder(str(path), sampler, extra=lambda: {'work_rate': 42.0},
+                               extra_columns=('work_rate', 'disk_mbps'), block_rows=4, flush_interval=0.01,
+                               metadata={'settings': {'test_type': "cpu_only"}})
+    sampler.buffer.append([999.0, 1.0, 1.0])  # до старта - не пишется
+    recorder.start()
+    for i in range(10):
+        sampler.buffer.append([1_700_000_000.0 + i * 0.1, i, i / 2])
+    assert recorder.stop() == 10
+    return path
+
+
+def test_recording_round_trip(recording):
+    session = SessionRecording(str(recording))
+    try:
+        assert session.columns == ['time', 'cpu_total', 'mem_percent', 'work_rate', 'disk_mbps']
+        assert session.header['metadata'] == {'settings': {'test_type': "cpu_only"}}
+        assert session.rows == 10
+        assert [rows for _, rows in session.blocks] == [4, 4, 2]
+        first, last = session.time_range()
+        assert (first, last) == (1_700_000_000.0, 1_700_000_000.0 + 0.9)
+        
+        times, values = session.window('cpu_total')
+        # Время хранится в float64 без потерь, значения - в float32
+        assert times.tolist() == [1_700_000_000.0 + i * 0.1 for i in range(10)]
+        assert values.tolist() == list(range(10))
+        assert session.window('mem_percent')[1].tolist() == [i / 2 for i in range(10)]
+        assert (session.window('work_rate')[1] == 42.0).all()
+        assert np.isnan(session.window('disk_mbps')[1]).all()
+    finally:
+        session.close()
+
+
+def test_recording_window_reads_covering_blocks(recording):
+    session = SessionRecording(str(recording))
+    times, _ = session.window('cpu_total', 1_700_000_000.45, 1_700_000_000.55)
+    assert times[0] <= 1_700_000_000.45 and times[-1] >= 1_700_000_000.55
+    assert len(times) == 4  # только второй блок
+    lows, highs = session.downsample('cpu_total', 2)
+    assert lows.tolist() == [0, 5] and highs.tolist() == [4, 9]
+    session.close()
+
+
+@pytest.mark.parametrize("cut", [1, 8, 20, 50])
+def test_recording_drops_truncated_last_block(recording, cut):
+    data = recording.read_bytes()
+    recording.write_bytes(data[:-cut])
+    session = SessionRecording(str(recording))
+    assert session.rows == 8
+    assert session.time_range()[1] == 1_700_000_000.0 + 0.7
+    session.close()
+
+
+def test_recording_rejects_foreign_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"not a recording at all")
+    with pytest.raises(ValueError, match="not a stress session recording"):
+        SessionRecording(str(path))
+
+
+# validate_settings / StressAgent / Coordinator
+
+@pytest.mark.parametrize("settings, message", [
+    ([], "settings must be an object"),
+    ({'cpu': 50}, "unknown settings: cpu"),
+    ({'test_type': "gpu"}, "test_type must be one of"),
+    ({'cpu_load': "50"}, "cpu_load must be int"),
+    ({'cpu_load': True}, "cpu_load must be int"),
+    ({'cpu_load': 101}, r"cpu_load must be within 0\.\.100"),
+    ({'ram_load': 95}, r"ram_load must be within 0\.\.90"),
+    ({'duration': 0}, "duration must be positive"),
+    ({'disk': []}, "disk must be an object"),
+    ({'disk': {'size': 1}}, "unknown disk settings: size"),
+    ({'disk': {'access': "zigzag"}}, "disk.access must be one of"),
+    ({'safety': {'enabled': 1}}, "safety.enabled must be bool"),
+    ({'benchmark': {'iterations': None}}, "benchmark.iterations must be int"),
+    ({'profile': [1, 2]}, "profile must be an object"),
+    ({'profile': "abc"}, "profile must be an object"),
+    ({'cpu_cores': [0, -1]}, "cpu_cores must be a list of non-negative integers"),
+    ({'cpu_cores': "0-3"}, "cpu_cores must be a list of non-negative integers"),
+    ({'sweep_max_mb': 0}, "sweep_max_mb must be a positive integer"),
+    ({'record': True}, "record must be a string"),
+    ({'contention': {'mechanisms': ["spinlock"]}}, "contention.mechanisms must be a list of"),
+])
+def test_validate_settings_rejects(settings, message):
+    with pytest.raises(ValueError, match=message):
+        validate_settings(settings)
+
+
+def test_validate_settings_accepts_valid_and_null_values():
+    validate_settings({})
+    validate_settings({'test_type': "disk_io", 'cpu_load': 12.5, 'ram_load': 90, 'cpu_cores': [0, 1], 'profile': None,
+                       'record': "run.rec", 'sweep_max_mb': 64, 'benchmark': {'baseline': None},
+                       'contention': {'mechanisms': ["lock"], 'max_workers': 2}})
+
+
+@pytest.fixture
+def agents(tmp_path):
+    """Два агента на свободных портах localhost"""
+    started = []
+    for _ in range(2):
+        agent = StressAgent(port=0, sample_rate=20, output_dir=str(tmp_path), log=lambda *args: None)
+        threading.Thread(target=agent.serve_forever, daemon=True).start()
+        started.append(agent)
+    yield started
+    for agent in started:
+        agent.shutdown()
+
+
+def test_agent_rejects_bad_requests(agents):
+    address = agents[0].address
+    with pytest.raises(RuntimeError, match="HTTP 400 since must be a number"):
+        http_json(address, "/telemetry?since=yesterday")
+    with pytest.raises(RuntimeError, match="HTTP 400 invalid settings: profile must be an object"):
+        http_json(address, "/start", {'settings': {'profile': [1, 2]}})
+    with pytest.raises(RuntimeError, match="HTTP 400 invalid settings: record must be a relative path"):
+        http_json(address, "/start", {'settings': {'record': "/tmp/agent.rec"}})
+    with pytest.raises(RuntimeError, match="HTTP 400 invalid settings: benchmark.results_file must be a relative"):
+        http_json(address, "/start", {'settings': {'benchmark': {'results_file': "../results.json"}}})
+    with pytest.raises(RuntimeError, match="HTTP 400 request body must be a JSON object"):
+        http_json(address, "/start", [1])
+    assert http_json(address, "/status")['status'] == "idle"
+    with pytest.raises(RuntimeError, match="HTTP 404"):
+        http_json(address, "/report")
+
+
+def test_coordinator_merges_agent_results(agents):
+    settings = {'test_type': "cpu_only", 'cpu_load': 20, 'duration': 3, 'cpu_cores': [0],
+                'safety': {'enabled': False}}
+    coordinator = Coordinator([agent.address for agent in agents], settings, log=lambda *args: None,
+                              start_delay=0.5, poll_interval=0.2)
+    coordinator.start()
+    deadline = time.time() + 60
+    while coordinator.poll():
+        assert time.time() < deadline, coordinator.progress()
+        time.sleep(coordinator.poll_interval)
+    report = coordinator.aggregate()
+    
+    addresses = [agent.address for agent in agents]
+    assert report['status'] == "completed"
+    assert report['summary']['agents'] == {address: "completed" for address in addresses}
+    assert set(report['clock_offsets']) == set(addresses)
+    rates = [report['agents'][address]['results']['cpu']['mean_rate'] for address in addresses]
+    # Воркеры запускаются через spawn, и первые секунды скорость может быть нулевой
+    assert all(rate is not None and rate >= 0 for rate in rates)
+    assert report['summary']['cpu_rate_total'] == pytest.approx(sum(rates))
+    assert report['summary']['errors'] == {}
+    for address in addresses:
+        telemetry = report['telemetry'][address]
+        assert telemetry['columns'][0] == "time"
+        assert len(telemetry['rows']) > 0